@@ -0,0 +1,182 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from clients import get_project_client
+
+
+AGENT_THREAD_POOL_ENABLED      = os.getenv("AGENT_THREAD_POOL_ENABLED", "true").lower() != "false"
+AGENT_THREAD_POOL_SIZE         = int(os.getenv("AGENT_THREAD_POOL_SIZE", "4"))
+AGENT_THREAD_MAX_AGE_SEC       = float(os.getenv("AGENT_THREAD_MAX_AGE_SEC", "1800"))
+AGENT_THREAD_CLEANUP_BATCH     = int(os.getenv("AGENT_THREAD_CLEANUP_BATCH", "20"))
+AGENT_THREAD_CLEANUP_INTERVAL_SEC = float(os.getenv("AGENT_THREAD_CLEANUP_INTERVAL_SEC", "2"))
+AGENT_THREAD_CLEANUP_WORKERS   = int(os.getenv("AGENT_THREAD_CLEANUP_WORKERS", "4"))
+AGENT_THREAD_DELETE_ATTEMPTS   = 3
+
+
+class AgentThreadPool:
+    """
+    Hands out pre-created, never-used agent threads and deletes used ones.
+
+    A background maintenance thread keeps `size` fresh threads ready and
+    deletes released threads in batches, so neither create nor delete sits
+    on the request path. Threads are never reused: a released thread may
+    still hold messages or a cancelled run, so it is always deleted and
+    replaced by a fresh one. Pooled threads older than `max_age` are retired
+    unused. Thread ids are plain strings, so the sync and async request
+    paths share one pool.
+    """
+
+    def __init__(
+        self,
+        project_factory: Callable = get_project_client,
+        size: int = AGENT_THREAD_POOL_SIZE,
+        max_age: float = AGENT_THREAD_MAX_AGE_SEC,
+        batch: int = AGENT_THREAD_CLEANUP_BATCH,
+        interval: float = AGENT_THREAD_CLEANUP_INTERVAL_SEC,
+        workers: int = AGENT_THREAD_CLEANUP_WORKERS,
+    ):
+        self._project = project_factory
+        self.size = size
+        self.max_age = max_age
+        self.batch = batch
+        self.interval = interval
+        self._fresh: deque = deque()    # (thread_id, created_at)
+        self._retired: deque = deque()  # (thread_id, attempts)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agent-thread-maint")
+        self._worker: Optional[threading.Thread] = None
+        self.counters: Dict[str, int] = {
+            "acquired": 0, "hits": 0, "misses": 0, "created": 0, "create_failures": 0,
+            "expired": 0, "deleted": 0, "delete_failures": 0, "abandoned": 0,
+        }
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[key] += n
+
+    def start(self) -> None:
+        """Start the maintenance thread (idempotent); it fills the pool right away."""
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="agent-thread-pool", daemon=True)
+                    self._worker.start()
+
+    # -- request path -------------------------------------------------
+    def acquire(self) -> Optional[str]:
+        """A fresh thread id, or None on a miss (the caller creates one inline)."""
+        self.start()
+        now = time.monotonic()
+        thread_id = None
+        with self._lock:
+            self.counters["acquired"] += 1
+            while self._fresh:
+                tid, created_at = self._fresh.popleft()
+                if now - created_at <= self.max_age:
+                    thread_id = tid
+                    break
+                self.counters["expired"] += 1
+                self._retired.append((tid, 0))
+            self.counters["hits" if thread_id else "misses"] += 1
+        self._wake.set()  # refill behind us
+        return thread_id
+
+    def release(self, thread_id: str) -> None:
+        """Queue a used thread for background deletion."""
+        if not thread_id:
+            return
+        with self._lock:
+            self._retired.append((thread_id, 0))
+            backlog = len(self._retired)
+        if backlog >= self.batch:
+            self._wake.set()
+
+    # -- background ---------------------------------------------------
+    def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                self._refill()
+                self._cleanup()
+            except Exception as e:
+                logging.warning(f"Agent thread pool maintenance failed: {e}")
+            self._wake.wait(self.interval)
+
+    def _create(self, _=None) -> None:
+        try:
+            tid = self._project().agents.threads.create().id
+        except Exception as e:
+            self._count("create_failures")
+            logging.warning(f"Pre-creating agent thread failed: {e}")
+            return  # retried next cycle
+        with self._lock:
+            self._fresh.append((tid, time.monotonic()))
+            self.counters["created"] += 1
+
+    def _refill(self) -> None:
+        missing = self.size - len(self._fresh)
+        if missing > 0:
+            list(self._executor.map(self._create, range(missing)))
+
+    def _delete(self, item) -> None:
+        tid, attempts = item
+        try:
+            self._project().agents.threads.delete(tid)
+        except Exception as e:
+            if attempts + 1 < AGENT_THREAD_DELETE_ATTEMPTS:
+                with self._lock:
+                    self._retired.append((tid, attempts + 1))
+                self._count("delete_failures")
+            else:
+                self._count("abandoned")
+                logging.warning(f"Giving up deleting agent thread {tid}: {e}")
+            return
+        self._count("deleted")
+
+    def _cleanup(self) -> None:
+        with self._lock:
+            items = [self._retired.popleft() for _ in range(min(self.batch, len(self._retired)))]
+        if items:
+            list(self._executor.map(self._delete, items))
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Delete every retired thread now (shutdown, benchmarks). True when the backlog is empty."""
+        deadline = time.monotonic() + timeout
+        while self._retired and time.monotonic() < deadline:
+            self._cleanup()
+        return not self._retired
+
+    def stats(self) -> Dict:
+        with self._lock:
+            out = dict(self.counters)
+            out["pool_size"] = len(self._fresh)
+            out["cleanup_backlog"] = len(self._retired)
+        out["hit_rate"] = round(out["hits"] / out["acquired"], 3) if out["acquired"] else None
+        return out
+
+
+_pool: Optional[AgentThreadPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_thread_pool() -> Optional[AgentThreadPool]:
+    """The process-wide pool, or None when AGENT_THREAD_POOL_ENABLED is false."""
+    global _pool
+    if not AGENT_THREAD_POOL_ENABLED:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = AgentThreadPool()
+    return _pool
+
+
+def pool_stats() -> Dict:
+    """Stats of the pool if one has been created; never creates it."""
+    return _pool.stats() if _pool is not None else {}
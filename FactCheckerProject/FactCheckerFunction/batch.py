@@ -0,0 +1,72 @@
+import os
+import logging
+import threading
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from cache import normalize_claim
+
+
+BATCH_MAX_CLAIMS      = int(os.getenv("BATCH_MAX_CLAIMS", "500"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+# In-flight pipeline runs allowed per provider across all batches in this worker,
+# so that concurrent batches together stay inside the provider's rate limit.
+PROVIDER_CONCURRENCY = {
+    "bing":     int(os.getenv("BING_MAX_CONCURRENCY", "4")),
+    "newsdata": int(os.getenv("NEWSDATA_MAX_CONCURRENCY", "2")),
+}
+
+_provider_slots: Dict[str, threading.BoundedSemaphore] = {
+    name: threading.BoundedSemaphore(n) for name, n in PROVIDER_CONCURRENCY.items()
+}
+
+# Routes that call several providers hold a slot of each (always taken in this order)
+ROUTE_PROVIDERS = {
+    "bing":     ("bing",),
+    "newsdata": ("newsdata",),
+    "unified":  ("bing", "newsdata"),
+}
+
+
+def run_batch(
+    claims: List[str],
+    provider: str,
+    classify: Callable[[str], Dict],
+    concurrency: int = BATCH_MAX_CONCURRENCY,
+) -> Dict:
+    """
+    Fact-check `claims` with `classify(claim)`:
+      1) Collapse claims that normalize to the same text.
+      2) Run the unique ones on at most `concurrency` threads, further
+         limited by the shared slot count of every provider the route calls.
+      3) Return one result per input claim, in input order; a failing
+         claim gets {"error": ...} instead of failing the whole batch.
+    """
+    if len(claims) > BATCH_MAX_CLAIMS:
+        raise ValueError(f"At most {BATCH_MAX_CLAIMS} claims per batch.")
+
+    unique: Dict[str, str] = {}      # normalized -> first original spelling
+    for claim in claims:
+        unique.setdefault(normalize_claim(claim), claim)
+
+    slots = [_provider_slots[p] for p in ROUTE_PROVIDERS.get(provider, (provider,)) if p in _provider_slots]
+
+    def _one(claim: str) -> Dict:
+        try:
+            with ExitStack() as held:
+                for slot in slots:
+                    held.enter_context(slot)
+                return classify(claim)
+        except Exception as e:
+            logging.warning(f"batch claim failed: {e}")
+            return {"error": str(e)}
+
+    workers = max(1, min(concurrency, BATCH_MAX_CONCURRENCY, len(unique) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        futures = {norm: pool.submit(_one, claim) for norm, claim in unique.items()}
+        by_norm = {norm: f.result() for norm, f in futures.items()}
+
+    results = [dict(by_norm[normalize_claim(claim)], query=claim) for claim in claims]
+    return {"results": results, "unique": len(unique)}
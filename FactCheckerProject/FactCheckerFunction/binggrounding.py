@@ -1,16 +1,26 @@
 import os, json, requests, time
+import asyncio
 import logging
 import time
 from urllib.parse import urlparse
-from azure.ai.projects import AIProjectClient
-from azure.identity import DefaultAzureCredential
 from azure.ai.agents.models import ListSortOrder, RunStatus, MessageRole, MessageTextContent
 
-from factcheck_llm import classify_with_citations
+import telemetry
+import deadline
+from factcheck_llm import classify_with_citations, classify_with_citations_async
+from clients import get_project_client, get_agent, get_async_project_client, get_async_agent
+from agentthreads import get_thread_pool
+from ranking import EVIDENCE_CANDIDATES, rank_evidence
 
 AZURE_OPENAI_PROJECT_ENDPOINT   = os.getenv("AZURE_OPENAI_PROJECT_ENDPOINT")
 AZURE_OPENAI_ASSISTANT_ID    = os.getenv("AZURE_OPENAI_ASSISTANT_ID")
 
+# Adaptive run polling: start fast, back off geometrically, give up at the deadline
+AGENT_RUN_TIMEOUT_SEC    = float(os.getenv("AGENT_RUN_TIMEOUT_SEC", "20"))
+AGENT_POLL_INITIAL_SEC   = float(os.getenv("AGENT_POLL_INITIAL_SEC", "0.05"))
+AGENT_POLL_MAX_SEC       = float(os.getenv("AGENT_POLL_MAX_SEC", "1.0"))
+AGENT_POLL_BACKOFF       = 1.5
+
 TERMINAL_STATUSES = {
     RunStatus.COMPLETED,
     RunStatus.FAILED,
@@ -98,7 +108,6 @@ def _collect_articles_from_message_sdk(message) -> list[dict]:
     all_articles: list[dict] = []
 
     for item in content_items:
-        logging.info(f'item:{item}')
         # Direct SDK-type check: you reported this class name in your env
         if isinstance(item, MessageTextContent):
             all_articles.extend(_articles_from_text_content(item))
@@ -107,7 +116,6 @@ def _collect_articles_from_message_sdk(message) -> list[dict]:
             # e.g., MessageImageFileContent, MessageToolCallContent, etc.
             logging.debug(f"Skipping non-text content item: {type(item)}")
 
-    logging.info(f'all:{all_articles}')
     return all_articles
 
 
@@ -123,58 +131,239 @@ def _dedupe_and_limit(articles: list[dict], max_allowed: int = 4) -> list[dict]:
     return unique[:max_allowed]
 
 
-def get_response_and_classify(query: str):
+def _cancel_run(project, thread_id: str, run) -> None:
+    try:
+        project.agents.runs.cancel(thread_id=thread_id, run_id=run.id)
+    except Exception as e:
+        logging.warning(f"Failed to cancel run {run.id}: {e}")
+
+
+def _wait_for_run(project, thread_id: str, run, timeout: float = AGENT_RUN_TIMEOUT_SEC):
     """
-    End-to-end flow using SDK object properties directly (no dict coercion):
-      1) Create thread, post user message, run agent.
-      2) Iterate messages; for each assistant message, collect citations
-         from MessageTextContent annotations.
-      3) Dedupe & cap evidence.
-      4) Call classify_with_citations(query, articles).
+    Poll the run with geometric backoff until it reaches a terminal status
+    or `timeout` elapses. A run still going at the deadline, or waiting
+    for tool outputs (REQUIRES_ACTION), is cancelled and returned as-is,
+    so the caller never reads a half-written thread.
+    """
+    until = time.monotonic() + timeout
+    interval = AGENT_POLL_INITIAL_SEC
+    polls = 0
+    while run.status not in TERMINAL_STATUSES:
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            logging.warning(f"Run {run.id} still {run.status} after {timeout}s; cancelling")
+            _cancel_run(project, thread_id, run)
+            return run
+        time.sleep(min(interval, remaining))
+        interval = min(interval * AGENT_POLL_BACKOFF, AGENT_POLL_MAX_SEC)
+        run = project.agents.runs.get(thread_id=thread_id, run_id=run.id)
+        polls += 1
+        telemetry.incr("polls")
+    logging.info(f"Run status: {run.status} after {polls} polls")
+    if run.status == RunStatus.REQUIRES_ACTION:
+        # no tool outputs are ever submitted; cancel so the run does not hold the thread until it expires
+        _cancel_run(project, thread_id, run)
+    return run
+
+
+def _run_timeout():
     """
-    project = AIProjectClient(
-        credential=DefaultAzureCredential(),
-        endpoint=AZURE_OPENAI_PROJECT_ENDPOINT
-    )
-
-    agent = project.agents.get_agent(AZURE_OPENAI_ASSISTANT_ID)
-    thread = project.agents.threads.create()
-    logging.info(f"Created thread: {thread.id}")
-
-    project.agents.messages.create(
-        thread_id=thread.id,
-        role="user",
-        content=query
-    )
-
-    run = project.agents.runs.create_and_process(thread_id=thread.id, agent_id=agent.id, instructions="generate annotations as required")
-    logging.info(f"Run status: {run.status}")
-    counter = 0
-
-    while run.status not in TERMINAL_STATUSES and counter < 10:
-        time.sleep(0.8)
-        run = project.agents.runs.get(thread_id=thread.id, run_id=run.id)
-        logging.info(f"Run status: {run.status}")
-        counter+=1
+    AGENT_RUN_TIMEOUT_SEC cut to what the request deadline leaves before
+    classification, or None (request marked degraded) when no run fits.
+    """
+    if not deadline.allows(reserve=deadline.classify_reserve()):
+        deadline.degrade("bing: agent run skipped")
+        return None
+    return deadline.budget(AGENT_RUN_TIMEOUT_SEC, reserve=deadline.classify_reserve())
+
 
+def _run_incomplete(run, timeout: float) -> list[dict]:
+    """No evidence from a run that did not complete; the request is marked degraded so its verdict is not cached."""
     if run.status == RunStatus.FAILED:
         logging.error(f"Run failed: {run.last_error}")
-        return classify_with_citations(query, articles=[])
+        deadline.degrade("bing: agent run failed")
+    else:
+        logging.warning(f"Run ended as {run.status}; continuing without agent evidence.")
+        deadline.degrade("bing: agent run cut short" if timeout < AGENT_RUN_TIMEOUT_SEC
+                         else f"bing: agent run ended as {run.status}")
+    return []
+
+
+def get_bing_articles(query: str) -> list[dict]:
+    """
+    Retrieval half of the Bing flow:
+      1) Create thread, post user message, run agent (bounded by
+         AGENT_RUN_TIMEOUT_SEC and the request deadline).
+      2) Iterate messages; for each assistant message, collect citations
+         from MessageTextContent annotations.
+      3) Dedupe, rank against the claim & cap evidence.
+    Returns [] when the run does not complete.
+    The thread comes from the agent thread pool and is deleted in the background afterwards.
+    """
+    project = get_project_client()
+    agent = get_agent()
+    pool = get_thread_pool()
+    with telemetry.stage("agent.thread_create") as st:
+        thread_id = pool.acquire() if pool else None
+        st["pooled"] = thread_id is not None
+        if thread_id is None:
+            thread_id = project.agents.threads.create().id
+            logging.info(f"Created thread: {thread_id}")
+    try:
+        return _articles_from_thread(project, agent, thread_id, query)
+    finally:
+        if pool:
+            pool.release(thread_id)
+
+
+def _articles_from_thread(project, agent, thread_id: str, query: str) -> list[dict]:
+    timeout = _run_timeout()
+    if timeout is None:
+        return []
+    with telemetry.stage("agent.message_create"):
+        project.agents.messages.create(
+            thread_id=thread_id,
+            role="user",
+            content=query
+        )
+
+    with telemetry.stage("agent.run_create"):
+        run = project.agents.runs.create(thread_id=thread_id, agent_id=agent.id, instructions="generate annotations as required")
+    with telemetry.stage("agent.run_poll", polls=0) as st:
+        run = _wait_for_run(project, thread_id, run, timeout)
+        st["status"] = str(run.status)
+
+    if run.status != RunStatus.COMPLETED:
+        return _run_incomplete(run, timeout)
 
     # Read messages in ASC order and collect citations
-    msg_iter = project.agents.messages.list(thread_id=thread.id, order=ListSortOrder.ASCENDING)
+    with telemetry.stage("agent.messages_list") as st:
+        msg_iter = project.agents.messages.list(thread_id=thread_id, order=ListSortOrder.ASCENDING)
+
+        all_articles: list[dict] = []
+        for msg in msg_iter:
+            try:
+                telemetry.log_payload("Agent message", msg)
+                all_articles.extend(_collect_articles_from_message_sdk(msg))
+            except Exception as e:
+                logging.warning(f"Failed to parse SDK message {getattr(msg, 'id', '')}: {e}")
+        st["citations"] = len(all_articles)
+
+    with telemetry.stage("rank", candidates=len(all_articles)) as st:
+        candidates = _dedupe_and_limit(all_articles, max_allowed=EVIDENCE_CANDIDATES)
+        articles = rank_evidence(query, candidates, k=4)
+        st["citations"] = len(articles)
 
-    all_articles: list[dict] = []
-    for msg in msg_iter:
-        try:
-            logging.info(f'msg:{msg}')
-            all_articles.extend(_collect_articles_from_message_sdk(msg))
-        except Exception as e:
-            logging.warning(f"Failed to parse SDK message {getattr(msg, 'id', '')}: {e}")
+    if len(articles) < 2:
+        logging.info("Fewer than 2 citations found; classifier may return 'Unclear' based on evidence.")
+    return articles
 
-    articles = _dedupe_and_limit(all_articles, max_allowed=4)
+
+def get_response_and_classify(query: str):
+    """
+    End-to-end flow using SDK object properties directly (no dict coercion):
+      1) get_bing_articles(query): agent run + citation extraction.
+      2) Call classify_with_citations(query, articles).
+    """
+    return classify_with_citations(query, get_bing_articles(query))
+
+
+# -----------------------------
+# Async variants (azure.ai.projects.aio); polling waits with asyncio.sleep
+# -----------------------------
+async def _cancel_run_async(project, thread_id: str, run) -> None:
+    try:
+        await project.agents.runs.cancel(thread_id=thread_id, run_id=run.id)
+    except Exception as e:
+        logging.warning(f"Failed to cancel run {run.id}: {e}")
+
+
+async def _wait_for_run_async(project, thread_id: str, run, timeout: float = AGENT_RUN_TIMEOUT_SEC):
+    """_wait_for_run for the async project client."""
+    until = time.monotonic() + timeout
+    interval = AGENT_POLL_INITIAL_SEC
+    polls = 0
+    try:
+        while run.status not in TERMINAL_STATUSES:
+            remaining = until - time.monotonic()
+            if remaining <= 0:
+                logging.warning(f"Run {run.id} still {run.status} after {timeout}s; cancelling")
+                await _cancel_run_async(project, thread_id, run)
+                return run
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * AGENT_POLL_BACKOFF, AGENT_POLL_MAX_SEC)
+            run = await project.agents.runs.get(thread_id=thread_id, run_id=run.id)
+            polls += 1
+            telemetry.incr("polls")
+    except asyncio.CancelledError:
+        # lost a hedge race or hit the verdict deadline; the run would otherwise keep the thread busy
+        await asyncio.shield(_cancel_run_async(project, thread_id, run))
+        raise
+    logging.info(f"Run status: {run.status} after {polls} polls")
+    if run.status == RunStatus.REQUIRES_ACTION:
+        # no tool outputs are ever submitted; cancel so the run does not hold the thread until it expires
+        await _cancel_run_async(project, thread_id, run)
+    return run
+
+
+async def get_bing_articles_async(query: str) -> list[dict]:
+    """get_bing_articles on the async agents client; same steps, result and thread pool."""
+    project = get_async_project_client()
+    agent = await get_async_agent()
+    pool = get_thread_pool()
+    with telemetry.stage("agent.thread_create") as st:
+        thread_id = pool.acquire() if pool else None
+        st["pooled"] = thread_id is not None
+        if thread_id is None:
+            thread_id = (await project.agents.threads.create()).id
+            logging.info(f"Created thread: {thread_id}")
+    try:
+        return await _articles_from_thread_async(project, agent, thread_id, query)
+    finally:
+        if pool:
+            pool.release(thread_id)
+
+
+async def _articles_from_thread_async(project, agent, thread_id: str, query: str) -> list[dict]:
+    timeout = _run_timeout()
+    if timeout is None:
+        return []
+    with telemetry.stage("agent.message_create"):
+        await project.agents.messages.create(
+            thread_id=thread_id,
+            role="user",
+            content=query
+        )
+
+    with telemetry.stage("agent.run_create"):
+        run = await project.agents.runs.create(thread_id=thread_id, agent_id=agent.id, instructions="generate annotations as required")
+    with telemetry.stage("agent.run_poll", polls=0) as st:
+        run = await _wait_for_run_async(project, thread_id, run, timeout)
+        st["status"] = str(run.status)
+
+    if run.status != RunStatus.COMPLETED:
+        return _run_incomplete(run, timeout)
+
+    with telemetry.stage("agent.messages_list") as st:
+        all_articles: list[dict] = []
+        async for msg in project.agents.messages.list(thread_id=thread_id, order=ListSortOrder.ASCENDING):
+            try:
+                telemetry.log_payload("Agent message", msg)
+                all_articles.extend(_collect_articles_from_message_sdk(msg))
+            except Exception as e:
+                logging.warning(f"Failed to parse SDK message {getattr(msg, 'id', '')}: {e}")
+        st["citations"] = len(all_articles)
+
+    with telemetry.stage("rank", candidates=len(all_articles)) as st:
+        candidates = _dedupe_and_limit(all_articles, max_allowed=EVIDENCE_CANDIDATES)
+        articles = await asyncio.to_thread(rank_evidence, query, candidates, k=4)  # NumPy; off the event loop
+        st["citations"] = len(articles)
 
     if len(articles) < 2:
         logging.info("Fewer than 2 citations found; classifier may return 'Unclear' based on evidence.")
+    return articles
+
 
-    return classify_with_citations(query, articles)
\ No newline at end of file
+async def get_response_and_classify_async(query: str):
+    """get_response_and_classify without blocking the event loop."""
+    return await classify_with_citations_async(query, await get_bing_articles_async(query))
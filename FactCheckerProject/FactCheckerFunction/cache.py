@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import unquote
+
+
+VERDICT_CACHE_ENABLED  = os.getenv("VERDICT_CACHE_ENABLED", "true").lower() != "false"
+VERDICT_CACHE_TTL_SEC  = int(os.getenv("VERDICT_CACHE_TTL_SEC", "3600"))
+VERDICT_CACHE_SIZE     = int(os.getenv("VERDICT_CACHE_SIZE", "2048"))
+VERDICT_CACHE_PATH     = os.getenv("VERDICT_CACHE_PATH",
+                                   os.path.join(tempfile.gettempdir(), "factcheck_verdicts.sqlite"))
+
+# Retrieval caches are per provider, memory only and size bounded
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "512"))
+RETRIEVAL_CACHE_TTL_SEC = {
+    "newsdata": int(os.getenv("NEWSDATA_CACHE_TTL_SEC", "900")),
+    "guardian": int(os.getenv("GUARDIAN_CACHE_TTL_SEC", "1800")),
+    "newsapi":  int(os.getenv("NEWSAPI_CACHE_TTL_SEC", "900")),
+}
+_SECRET_PARAMS = {"apikey", "api-key", "apiKey"}
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU with a per-entry expiry."""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: Optional[float] = None, expires_at: Optional[float] = None) -> None:
+        if expires_at is None:
+            expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SqliteCache:
+    """
+    JSON values in a local SQLite file. WAL mode lets every worker
+    process on the host read and write the same file.
+    """
+
+    def __init__(self, path: str, ttl: float = 3600, table: str = "cache"):
+        self.path = path
+        self.ttl = ttl
+        self.table = table
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                     "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_entry(self, key: str):
+        """Return (value, expires_at) or None."""
+        row = self._conn().execute(
+            f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def get(self, key: str):
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def set(self, key: str, value, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        conn = self._conn()
+        conn.execute(f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                     (key, json.dumps(value), expires_at))
+        conn.commit()
+
+    def keys(self, prefix: str = ""):
+        """Unexpired keys starting with `prefix`."""
+        rows = self._conn().execute(
+            f"SELECT key FROM {self.table} WHERE key >= ? AND key < ? AND expires_at > ?",
+            (prefix, prefix + "\uffff", time.time()))
+        return [r[0] for r in rows]
+
+    def purge_expired(self) -> int:
+        conn = self._conn()
+        cur = conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+        conn.commit()
+        return cur.rowcount
+
+
+class TieredCache:
+    """In-memory LRU in front of a shared SQLite file; disk hits are promoted."""
+
+    def __init__(self, memory: LRUCache, disk: Optional[SqliteCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str):
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        entry = self.disk.get_entry(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        self.memory.set(key, value, expires_at=expires_at)
+        return value
+
+    def set(self, key: str, value, ttl: Optional[float] = None) -> None:
+        self.memory.set(key, value, ttl=ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl=ttl)
+
+
+# -----------------------------
+# Verdict cache
+# -----------------------------
+_PUNCT = re.compile(r"[^\w\s]", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_claim(text: str) -> str:
+    """
+    Canonical form of a claim: URL-unquoted, NFKC, lower-cased,
+    punctuation stripped and whitespace collapsed.
+    """
+    text = unicodedata.normalize("NFKC", unquote(text or ""))
+    text = _PUNCT.sub(" ", text.lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+def verdict_key(claim: str, route: str, frm: Optional[str] = None, to: Optional[str] = None) -> str:
+    return f"{route}|{frm or ''}|{to or ''}|{normalize_claim(claim)}"
+
+
+_verdicts: Optional[TieredCache] = None
+_init_lock = threading.Lock()
+
+
+def get_verdict_cache() -> TieredCache:
+    global _verdicts
+    if _verdicts is None:
+        with _init_lock:
+            if _verdicts is None:
+                memory = LRUCache(max_size=VERDICT_CACHE_SIZE, ttl=VERDICT_CACHE_TTL_SEC)
+                try:
+                    disk = SqliteCache(VERDICT_CACHE_PATH, ttl=VERDICT_CACHE_TTL_SEC, table="verdicts")
+                except sqlite3.Error:
+                    disk = None  # read-only filesystem etc.; memory tier still works
+                _verdicts = TieredCache(memory, disk)
+    return _verdicts
+
+
+# -----------------------------
+# Retrieval cache
+# -----------------------------
+_retrieval: dict = {}
+
+
+def retrieval_key(params: dict) -> str:
+    """Stable key for a provider request; API keys are left out."""
+    return json.dumps({k: v for k, v in params.items() if k not in _SECRET_PARAMS},
+                      sort_keys=True, default=str)
+
+
+def get_retrieval_cache(provider: str) -> LRUCache:
+    c = _retrieval.get(provider)
+    if c is None:
+        with _init_lock:
+            c = _retrieval.get(provider)
+            if c is None:
+                c = LRUCache(max_size=RETRIEVAL_CACHE_SIZE, ttl=RETRIEVAL_CACHE_TTL_SEC.get(provider, 900))
+                _retrieval[provider] = c
+    return c
@@ -0,0 +1,324 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import TYPE_CHECKING, Callable, Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# The OpenAI and Azure SDKs are imported by the factories that need them, so a
+# worker only pays for the stack its first route actually uses.
+if TYPE_CHECKING:
+    import aiohttp
+    from openai import AzureOpenAI, AsyncAzureOpenAI
+    from azure.ai.projects import AIProjectClient
+    from azure.ai.projects.aio import AIProjectClient as AsyncAIProjectClient
+
+
+AZURE_OPENAI_ENDPOINT         = os.getenv("AZURE_OPENAI_ENDPOINT")
+AZURE_OPENAI_API_KEY          = os.getenv("AZURE_OPENAI_API_KEY")
+AZURE_OPENAI_API_VERSION      = os.getenv("AZURE_OPENAI_API_VERSION", "2024-12-01-preview")
+AZURE_OPENAI_PROJECT_ENDPOINT = os.getenv("AZURE_OPENAI_PROJECT_ENDPOINT")
+AZURE_OPENAI_ASSISTANT_ID     = os.getenv("AZURE_OPENAI_ASSISTANT_ID")
+
+# Keep-alive pool sizing for outbound news API calls
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "8"))
+HTTP_POOL_MAXSIZE     = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+
+# Refresh AAD tokens this many seconds before they expire
+TOKEN_REFRESH_MARGIN_SEC = int(os.getenv("AAD_TOKEN_REFRESH_MARGIN_SEC", "300"))
+
+
+# -----------------------------
+# Registry
+# -----------------------------
+_lock = threading.RLock()
+_registry: Dict[str, object] = {}
+
+
+def _get_or_create(name: str, factory: Callable[[], object]):
+    """
+    Return the process-wide instance registered under `name`,
+    building it with `factory` on first use.
+    """
+    obj = _registry.get(name)
+    if obj is not None:
+        return obj
+    with _lock:
+        obj = _registry.get(name)
+        if obj is None:
+            obj = factory()
+            _registry[name] = obj
+            logging.info(f"Initialized shared client: {name}")
+        return obj
+
+
+def register(name: str, obj) -> None:
+    """Install a pre-built client (e.g. one pointed at a local stand-in)."""
+    with _lock:
+        _registry[name] = obj
+
+
+def reset(name: str = None) -> None:
+    """Drop one (or every) cached client so the next call rebuilds it."""
+    with _lock:
+        if name is None:
+            _registry.clear()
+        else:
+            _registry.pop(name, None)
+
+
+# -----------------------------
+# Credentials
+# -----------------------------
+class CachedTokenCredential:
+    """
+    Wraps a TokenCredential and keeps one AccessToken per scope set,
+    fetching a new one only when the cached token is close to expiry.
+    """
+
+    def __init__(self, inner, refresh_margin_sec: int = TOKEN_REFRESH_MARGIN_SEC):
+        self._inner = inner
+        self._margin = refresh_margin_sec
+        self._tokens: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def get_token(self, *scopes, **kwargs):
+        key = (scopes, kwargs.get("tenant_id"), kwargs.get("claims"))
+        tok = self._tokens.get(key)
+        if tok is not None and tok.expires_on - self._margin > time.time():
+            return tok
+        with self._lock:
+            tok = self._tokens.get(key)
+            if tok is None or tok.expires_on - self._margin <= time.time():
+                tok = self._inner.get_token(*scopes, **kwargs)
+                self._tokens[key] = tok
+            return tok
+
+    def close(self):
+        close = getattr(self._inner, "close", None)
+        if close:
+            close()
+
+
+def _build_credential() -> CachedTokenCredential:
+    from azure.identity import DefaultAzureCredential
+    return CachedTokenCredential(DefaultAzureCredential())
+
+
+def get_credential() -> CachedTokenCredential:
+    return _get_or_create("credential", _build_credential)
+
+
+# -----------------------------
+# Clients
+# -----------------------------
+def _build_http_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Shared keep-alive session for NewsData, Guardian and NewsAPI calls."""
+    return _get_or_create("http", _build_http_session)
+
+
+def _build_openai_client() -> "AzureOpenAI":
+    from openai import AzureOpenAI
+    return AzureOpenAI(
+        api_version=AZURE_OPENAI_API_VERSION,
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        api_key=AZURE_OPENAI_API_KEY,
+    )
+
+
+def get_openai_client() -> "AzureOpenAI":
+    return _get_or_create("openai", _build_openai_client)
+
+
+def _build_project_client() -> "AIProjectClient":
+    from azure.ai.projects import AIProjectClient
+    return AIProjectClient(
+        credential=get_credential(),
+        endpoint=AZURE_OPENAI_PROJECT_ENDPOINT,
+    )
+
+
+def get_project_client() -> "AIProjectClient":
+    return _get_or_create("project", _build_project_client)
+
+
+def get_agent():
+    """Agent handle, looked up once per worker instead of once per request."""
+    return _get_or_create("agent", lambda: get_project_client().agents.get_agent(AZURE_OPENAI_ASSISTANT_ID))
+
+
+# -----------------------------
+# Async clients (used by the async routes; bound to the worker's event loop)
+# -----------------------------
+class AsyncCachedTokenCredential:
+    """CachedTokenCredential for azure.identity.aio credentials."""
+
+    def __init__(self, inner, refresh_margin_sec: int = TOKEN_REFRESH_MARGIN_SEC):
+        self._inner = inner
+        self._margin = refresh_margin_sec
+        self._tokens: Dict[Tuple, object] = {}
+        self._lock = asyncio.Lock()
+
+    async def get_token(self, *scopes, **kwargs):
+        key = (scopes, kwargs.get("tenant_id"), kwargs.get("claims"))
+        tok = self._tokens.get(key)
+        if tok is not None and tok.expires_on - self._margin > time.time():
+            return tok
+        async with self._lock:
+            tok = self._tokens.get(key)
+            if tok is None or tok.expires_on - self._margin <= time.time():
+                tok = await self._inner.get_token(*scopes, **kwargs)
+                self._tokens[key] = tok
+            return tok
+
+    async def close(self):
+        await self._inner.close()
+
+
+def _build_async_credential() -> AsyncCachedTokenCredential:
+    from azure.identity.aio import DefaultAzureCredential
+    return AsyncCachedTokenCredential(DefaultAzureCredential())
+
+
+def get_async_credential() -> AsyncCachedTokenCredential:
+    return _get_or_create("async_credential", _build_async_credential)
+
+
+def _build_async_http_session() -> "aiohttp.ClientSession":
+    import aiohttp
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=HTTP_POOL_MAXSIZE * HTTP_POOL_CONNECTIONS,
+                                                                limit_per_host=HTTP_POOL_MAXSIZE))
+
+
+def get_async_http_session() -> "aiohttp.ClientSession":
+    """Shared aiohttp session (keep-alive pool) for the async news provider calls."""
+    return _get_or_create("async_http", _build_async_http_session)
+
+
+async def http_get(url: str, params: Dict = None, timeout: float = 20):
+    """
+    GET through the shared aiohttp session. The body is read before the
+    connection is released, so `await r.json()` works on the returned response.
+    """
+    import aiohttp
+    session = get_async_http_session()
+    async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as r:
+        await r.read()
+        return r
+
+
+def _build_async_openai_client() -> "AsyncAzureOpenAI":
+    from openai import AsyncAzureOpenAI
+    return AsyncAzureOpenAI(
+        api_version=AZURE_OPENAI_API_VERSION,
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        api_key=AZURE_OPENAI_API_KEY,
+    )
+
+
+def get_async_openai_client() -> "AsyncAzureOpenAI":
+    return _get_or_create("async_openai", _build_async_openai_client)
+
+
+def _build_async_project_client() -> "AsyncAIProjectClient":
+    from azure.ai.projects.aio import AIProjectClient
+    return AIProjectClient(
+        credential=get_async_credential(),
+        endpoint=AZURE_OPENAI_PROJECT_ENDPOINT,
+    )
+
+
+def get_async_project_client() -> "AsyncAIProjectClient":
+    return _get_or_create("async_project", _build_async_project_client)
+
+
+async def get_async_agent():
+    """get_agent() for the async routes; concurrent first calls may both look it up."""
+    agent = _registry.get("async_agent")
+    if agent is None:
+        agent = await get_async_project_client().agents.get_agent(AZURE_OPENAI_ASSISTANT_ID)
+        register("async_agent", agent)
+    return agent
+
+
+async def close_async() -> None:
+    """Close and drop the shared async clients (worker shutdown, benchmarks)."""
+    with _lock:
+        objs = [_registry.pop(name, None) for name in ("async_http", "async_openai", "async_project", "async_credential")]
+        _registry.pop("async_agent", None)
+    for obj in objs:
+        if obj is not None:
+            await obj.close()
+
+
+# -----------------------------
+# Warm-up
+# -----------------------------
+def _uses_agents(routes) -> bool:
+    """True when any of `routes` runs Bing grounding (the unified route races it)."""
+    return "bing" in routes or "unified" in routes
+
+
+def warm_up(routes=("bing", "newsdata")) -> Dict[str, float]:
+    """
+    Build the clients the given routes need and fetch their first AAD token,
+    so the first real request does not pay for it. Returns seconds per step;
+    a step that fails is logged and skipped.
+    """
+    steps = {"http": get_http_session}
+    if AZURE_OPENAI_ENDPOINT and AZURE_OPENAI_API_KEY:
+        steps["openai"] = get_openai_client
+    if _uses_agents(routes) and AZURE_OPENAI_PROJECT_ENDPOINT:
+        steps["credential"] = lambda: get_credential().get_token("https://ai.azure.com/.default")
+        steps["project"] = get_project_client
+        if AZURE_OPENAI_ASSISTANT_ID:
+            steps["agent"] = get_agent
+    timings = {}
+    for name, step in steps.items():
+        t0 = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logging.warning(f"Warm-up step {name} failed: {e}")
+            continue
+        timings[name] = round(time.perf_counter() - t0, 3)
+    return timings
+
+
+async def warm_up_async(routes=("bing", "newsdata")) -> Dict[str, float]:
+    """warm_up() for the async clients the HTTP routes use; call it on the worker's event loop."""
+    async def _token():
+        await get_async_credential().get_token("https://ai.azure.com/.default")
+
+    async def _sync(fn):
+        fn()
+
+    steps = {"async_http": lambda: _sync(get_async_http_session)}
+    if AZURE_OPENAI_ENDPOINT and AZURE_OPENAI_API_KEY:
+        steps["async_openai"] = lambda: _sync(get_async_openai_client)
+    if _uses_agents(routes) and AZURE_OPENAI_PROJECT_ENDPOINT:
+        steps["async_credential"] = _token
+        steps["async_project"] = lambda: _sync(get_async_project_client)
+        if AZURE_OPENAI_ASSISTANT_ID:
+            steps["async_agent"] = get_async_agent
+    timings = {}
+    for name, step in steps.items():
+        t0 = time.perf_counter()
+        try:
+            await step()
+        except Exception as e:
+            logging.warning(f"Warm-up step {name} failed: {e}")
+            continue
+        timings[name] = round(time.perf_counter() - t0, 3)
+    return timings
@@ -0,0 +1,131 @@
+import os
+import time
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import List, Optional
+
+import requests
+
+
+# Whole-request budget for the HTTP routes; a request body may ask for less (or,
+# up to REQUEST_DEADLINE_MAX_SEC, more) with "deadline_sec".
+REQUEST_DEADLINE_SEC     = float(os.getenv("REQUEST_DEADLINE_SEC", "30"))
+REQUEST_DEADLINE_MAX_SEC = float(os.getenv("REQUEST_DEADLINE_MAX_SEC", "120"))
+# Retrieval leaves this share of the request budget, at most CLASSIFY_RESERVE_SEC, for
+# classification, so short deadlines still get some retrieval
+CLASSIFY_RESERVE_FRACTION = float(os.getenv("DEADLINE_CLASSIFY_RESERVE_FRACTION", "0.3"))
+CLASSIFY_RESERVE_SEC     = float(os.getenv("DEADLINE_CLASSIFY_RESERVE_SEC", "6"))
+# Kept back from every stage for building and sending the response
+RESPONSE_RESERVE_SEC     = float(os.getenv("DEADLINE_RESPONSE_RESERVE_SEC", "0.5"))
+# A call with less time than this left is not started
+MIN_CALL_SEC             = float(os.getenv("DEADLINE_MIN_CALL_SEC", "0.5"))
+
+# Monotonic time the current request must answer by, its whole budget, and what it skipped
+# to get there. The list is shared (not copied) by threads and tasks started from the request.
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+_seconds: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_budget", default=None)
+_degraded: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("request_degraded", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Too little of the request budget is left to start the call."""
+
+
+def requested(body: dict) -> float:
+    """Budget for a request: body["deadline_sec"] when valid (capped), else REQUEST_DEADLINE_SEC."""
+    try:
+        value = float(body.get("deadline_sec") or 0)
+    except (TypeError, ValueError):
+        value = 0
+    return min(value, REQUEST_DEADLINE_MAX_SEC) if value > 0 else REQUEST_DEADLINE_SEC
+
+
+@contextmanager
+def tracking():
+    """
+    Collect degradations for the block without setting a deadline (batch and
+    job items); inside an existing scope the request's list is reused.
+    """
+    if _degraded.get() is not None:
+        yield _degraded.get()
+        return
+    degraded: List[str] = []
+    token = _degraded.set(degraded)
+    try:
+        yield degraded
+    finally:
+        _degraded.reset(token)
+
+
+@contextmanager
+def scope(seconds: float):
+    """Run the block under a deadline `seconds` from now; yields the list of degradations."""
+    degraded: List[str] = []
+    t_deadline = _deadline.set(time.monotonic() + seconds)
+    t_seconds = _seconds.set(seconds)
+    t_degraded = _degraded.set(degraded)
+    try:
+        yield degraded
+    finally:
+        _degraded.reset(t_degraded)
+        _seconds.reset(t_seconds)
+        _deadline.reset(t_deadline)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request, or None outside a deadline scope."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def classify_reserve() -> float:
+    """Time retrieval leaves for classification: CLASSIFY_RESERVE_FRACTION of the request budget, capped."""
+    seconds = _seconds.get()
+    if seconds is None:
+        return CLASSIFY_RESERVE_SEC
+    return min(CLASSIFY_RESERVE_SEC, CLASSIFY_RESERVE_FRACTION * seconds)
+
+
+def budget(cap: float, reserve: float = 0.0) -> float:
+    """`cap`, cut to what is left of the deadline after `reserve` and the response reserve."""
+    left = remaining()
+    if left is None:
+        return cap
+    return max(0.0, min(cap, left - reserve - RESPONSE_RESERVE_SEC))
+
+
+def timeout(cap: float, reserve: float = 0.0) -> float:
+    """budget() for a call that is about to start; raises DeadlineExceeded if it is under MIN_CALL_SEC."""
+    t = budget(cap, reserve)
+    if t < MIN_CALL_SEC:
+        raise DeadlineExceeded(f"{t:.2f}s left of the request deadline")
+    return t
+
+
+def allows(seconds: float = MIN_CALL_SEC, reserve: float = 0.0) -> bool:
+    """True when `seconds` of optional work still fit (always, outside a deadline scope)."""
+    return budget(float("inf"), reserve) >= seconds
+
+
+def ran_out(e: BaseException, reserve: float = 0.0) -> bool:
+    """True when `e` is a timeout and the deadline (minus `reserve`) is what cut it short."""
+    return isinstance(e, (TimeoutError, requests.Timeout)) and not allows(reserve=reserve)
+
+
+def degrade(reason: str) -> None:
+    """
+    Record work skipped or cut short for the deadline, or evidence a provider
+    failed to return; the response is marked degraded and not cached.
+    """
+    degraded = _degraded.get()
+    if degraded is None:
+        return
+    if reason not in degraded:
+        degraded.append(reason)
+    left = remaining()
+    logging.info(f"degraded: {reason}" + (f" ({left:.2f}s left)" if left is not None else ""))
+
+
+def degraded() -> List[str]:
+    return list(_degraded.get() or [])
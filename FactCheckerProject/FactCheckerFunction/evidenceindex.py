@@ -0,0 +1,266 @@
+import os
+import re
+import time
+import queue
+import logging
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import unquote, urlparse
+
+import telemetry
+
+
+EVIDENCE_INDEX_ENABLED  = os.getenv("EVIDENCE_INDEX_ENABLED", "true").lower() != "false"
+EVIDENCE_INDEX_PATH     = os.getenv("EVIDENCE_INDEX_PATH",
+                                    os.path.join(tempfile.gettempdir(), "factcheck_evidence.sqlite"))
+EVIDENCE_INDEX_TTL_SEC  = int(os.getenv("EVIDENCE_INDEX_TTL_SEC", str(3 * 24 * 3600)))
+# Providers are skipped when the index alone returns at least this many relevant articles
+EVIDENCE_INDEX_MIN_HITS = int(os.getenv("EVIDENCE_INDEX_MIN_HITS", "6"))
+EVIDENCE_INDEX_MAX_HITS = int(os.getenv("EVIDENCE_INDEX_MAX_HITS", "20"))
+# Fraction of the query's terms an article must contain to count as relevant
+EVIDENCE_INDEX_MIN_OVERLAP = float(os.getenv("EVIDENCE_INDEX_MIN_OVERLAP", "0.5"))
+EVIDENCE_INDEX_EXPIRY_SCHEDULE = os.getenv("EVIDENCE_INDEX_EXPIRY_SCHEDULE", "0 */30 * * * *")
+
+MAX_QUERY_TERMS = 12
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT, snippet TEXT, source TEXT,
+    domain TEXT, published TEXT,
+    provider TEXT, trusted INTEGER NOT NULL DEFAULT 0,
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_published ON articles(published);
+CREATE INDEX IF NOT EXISTS articles_domain ON articles(domain);
+CREATE INDEX IF NOT EXISTS articles_ingested ON articles(ingested_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, snippet, content='articles', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, title, snippet) VALUES (new.id, new.title, new.snippet);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, snippet) VALUES ('delete', old.id, old.title, old.snippet);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, snippet) VALUES ('delete', old.id, old.title, old.snippet);
+    INSERT INTO articles_fts(rowid, title, snippet) VALUES (new.id, new.title, new.snippet);
+END;
+"""
+
+_UPSERT = """
+INSERT INTO articles (url, title, snippet, source, domain, published, provider, trusted, ingested_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(url) DO UPDATE SET
+    title = excluded.title, snippet = excluded.snippet, source = excluded.source,
+    published = COALESCE(excluded.published, articles.published),
+    trusted = excluded.trusted, ingested_at = excluded.ingested_at
+"""
+
+
+class EvidenceIndex:
+    """
+    Normalized provider articles in a local SQLite FTS5 index.
+
+    Writes are queued and applied by one background thread in a single
+    transaction per batch, so ingesting never sits on the request path.
+    Lookups run on a per-thread connection; WAL mode lets every worker
+    process on the host share the file.
+    """
+
+    def __init__(self, path: str = EVIDENCE_INDEX_PATH, ttl: float = EVIDENCE_INDEX_TTL_SEC):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._pending: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.counters = {"lookups": 0, "sufficient": 0, "ingested": 0, "expired": 0, "write_failures": 0}
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[key] += n
+
+    # -- writes -------------------------------------------------------
+    def ingest(self, items: List[Dict], provider: str) -> None:
+        """Queue normalized articles ({title, url, source, snippet, publishedAt?, trusted?}) for indexing."""
+        rows = [_row(it, provider) for it in items if it.get("url")]
+        if not rows:
+            return
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="evidence-index", daemon=True)
+                    self._writer.start()
+        self._pending.put(rows)
+
+    def _write_loop(self) -> None:
+        while True:
+            rows = self._pending.get()
+            while not self._pending.empty():
+                rows.extend(self._pending.get_nowait())
+            self._write(rows)
+
+    def _write(self, rows) -> None:
+        now = time.time()
+        try:
+            conn = self._conn()
+            with conn:
+                conn.executemany(_UPSERT, [r + (now,) for r in rows])
+            self._count("ingested", len(rows))
+        except sqlite3.Error as e:
+            self._count("write_failures")
+            logging.warning(f"evidence index write failed: {e}")
+
+    def flush(self) -> None:
+        """Apply queued writes now (benchmarks, shutdown)."""
+        rows = []
+        while not self._pending.empty():
+            rows.extend(self._pending.get_nowait())
+        if rows:
+            self._write(rows)
+
+    def expire(self) -> int:
+        """Delete articles ingested more than `ttl` seconds ago; returns how many."""
+        conn = self._conn()
+        with conn:
+            n = conn.execute("DELETE FROM articles WHERE ingested_at < ?", (time.time() - self.ttl,)).rowcount
+            if n:
+                conn.execute("INSERT INTO articles_fts(articles_fts) VALUES ('optimize')")
+        self._count("expired", n)
+        return n
+
+    # -- reads --------------------------------------------------------
+    def lookup(
+        self,
+        query: str,
+        frm: Optional[str] = None,
+        to: Optional[str] = None,
+        domains: Optional[List[str]] = None,
+        limit: int = EVIDENCE_INDEX_MAX_HITS,
+    ) -> List[Dict]:
+        """
+        Indexed articles relevant to `query`, best BM25 match first:
+          1) Match any query term, restricted to fresh rows, the publish
+             window [frm, to] (undated rows pass) and `domains` if given.
+          2) Keep rows that contain at least EVIDENCE_INDEX_MIN_OVERLAP of
+             the query terms in title + snippet.
+        """
+        from ranking import tokenize  # NumPy; kept off function_app's import path
+        terms = list(dict.fromkeys(tokenize(unquote(query))))[:MAX_QUERY_TERMS]
+        self._count("lookups")
+        if not terms:
+            return []
+        sql = ("SELECT a.url, a.title, a.snippet, a.source, a.published, a.trusted "
+               "FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid "
+               "WHERE articles_fts MATCH ? AND a.ingested_at >= ?")
+        args: list = [" OR ".join(f'"{t}"' for t in terms), time.time() - self.ttl]
+        if frm:
+            sql += " AND (a.published IS NULL OR a.published >= ?)"
+            args.append(frm[:10])
+        if to:
+            sql += " AND (a.published IS NULL OR a.published <= ?)"
+            args.append(to[:10])
+        if domains:
+            sql += f" AND a.domain IN ({','.join('?' * len(domains))})"
+            args.extend(domains)
+        sql += " ORDER BY articles_fts.rank LIMIT ?"
+        args.append(limit * 3)  # headroom for the overlap filter
+
+        wanted = set(terms)
+        need = max(1, round(EVIDENCE_INDEX_MIN_OVERLAP * len(wanted)))
+        out = []
+        for url, title, snippet, source, published, trusted in self._conn().execute(sql, args):
+            if len(wanted.intersection(tokenize(f"{title} {snippet}"))) < need:
+                continue
+            out.append({"title": title, "url": url, "source": source, "snippet": snippet,
+                        "publishedAt": published, "trusted": bool(trusted), "indexed": True})
+            if len(out) >= limit:
+                break
+        if len(out) >= EVIDENCE_INDEX_MIN_HITS:
+            self._count("sufficient")
+        return out
+
+    def stats(self) -> Dict:
+        with self._lock:
+            out = dict(self.counters)
+        out["pending_writes"] = self._pending.qsize()
+        out["hit_rate"] = round(out["sufficient"] / out["lookups"], 3) if out["lookups"] else None
+        return out
+
+
+def _row(it: Dict, provider: str):
+    url = it["url"]
+    published = str(it.get("publishedAt") or "")
+    return (url, it.get("title") or "", it.get("snippet") or "", it.get("source") or "",
+            (urlparse(url).netloc or "").lower().removeprefix("www."),
+            published[:10] if _DATE.match(published) else None,
+            provider, int(bool(it.get("trusted"))))
+
+
+_index: Optional[EvidenceIndex] = None
+_index_failed = False
+_init_lock = threading.Lock()
+
+
+def get_evidence_index() -> Optional[EvidenceIndex]:
+    """The process-wide index, or None when disabled or the file cannot be opened."""
+    global _index, _index_failed
+    if not EVIDENCE_INDEX_ENABLED or _index_failed:
+        return None
+    if _index is None:
+        with _init_lock:
+            if _index is None and not _index_failed:
+                try:
+                    _index = EvidenceIndex()
+                except sqlite3.Error as e:  # read-only filesystem, no FTS5 in this SQLite build, ...
+                    logging.warning(f"evidence index unavailable: {e}")
+                    _index_failed = True
+    return _index
+
+
+def ingest(items: List[Dict], provider: str) -> None:
+    """Queue `items` for indexing; a no-op when the index is off."""
+    index = get_evidence_index()
+    if index is not None and items:
+        index.ingest(items, provider)
+
+
+def lookup(query: str, frm: Optional[str] = None, to: Optional[str] = None, **kwargs) -> List[Dict]:
+    """EvidenceIndex.lookup, or [] when the index is off or the read fails."""
+    index = get_evidence_index()
+    if index is None:
+        return []
+    with telemetry.stage("evidence_index") as st:
+        try:
+            hits = index.lookup(query, frm, to, **kwargs)
+        except sqlite3.Error as e:
+            logging.warning(f"evidence index lookup failed: {e}")
+            hits = []
+        st["citations"] = len(hits)
+    return hits
+
+
+def sufficient(hits: List[Dict]) -> bool:
+    """True when local recall is high enough to skip the external providers."""
+    return len(hits) >= EVIDENCE_INDEX_MIN_HITS
+
+
+def index_stats() -> Dict:
+    """Stats of the index if one has been opened; never opens it."""
+    return _index.stats() if _index is not None else {}
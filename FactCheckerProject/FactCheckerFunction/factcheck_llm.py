@@ -1,21 +1,108 @@
-import os, json, requests
+import os, re, json, time, requests
 import logging
-from openai import AzureOpenAI
+import threading
+import telemetry
+import deadline
+from clients import get_openai_client, get_async_openai_client
+
+try:
+    import tiktoken  # optional, exact local token counts
+except ImportError:
+    tiktoken = None  # type: ignore
 
 AZURE_OPENAI_ENDPOINT   = os.getenv("AZURE_OPENAI_ENDPOINT")
 AZURE_OPENAI_API_KEY    = os.getenv("AZURE_OPENAI_API_KEY")
 AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT","gpt-5-mini")
 api_version = "2024-12-01-preview"
 
-def classify_with_citations(query, articles):
-    logging.info(f'AZURE_OPENAI : {AZURE_OPENAI_ENDPOINT}, {AZURE_OPENAI_API_KEY}, {AZURE_OPENAI_DEPLOYMENT}')
-    if not AZURE_OPENAI_ENDPOINT or not AZURE_OPENAI_API_KEY:
-        return {"classification":"Unclear","rationale":"LLM not configured.","citations":[]}
-    sys = ("You are a careful fact-checking assistant for Grade-9 students. "
-           "Use ONLY the provided articles. If evidence is mixed/insufficient, answer 'Unclear'. "
-           "Always include 2–4 citations (title, source, url). Neutral tone.")
-    evidence="\n\n".join([f"- Title: {a['title']}\n  Source: {a['source']}\n  URL: {a['url']}\n  Snippet: {a.get('snippet','')}" for a in articles])
-    usr = f"""Claim or headline:
+# Classification cascade: rules -> fast deployment -> AZURE_OPENAI_DEPLOYMENT.
+# Without a fast deployment the middle tier is skipped.
+AZURE_OPENAI_FAST_DEPLOYMENT = os.getenv("AZURE_OPENAI_FAST_DEPLOYMENT")
+CASCADE_MIN_CITATIONS        = int(os.getenv("CASCADE_MIN_CITATIONS", "2"))
+CASCADE_MIN_CONFIDENCE       = float(os.getenv("CASCADE_MIN_CONFIDENCE", "0.8"))
+
+# Prompt/completion budgets. The reply schema (label, <= 6 sentences, <= 4 citations)
+# needs ~600 tokens; the rest of the completion cap is headroom for reasoning tokens.
+LLM_INPUT_TOKEN_BUDGET     = int(os.getenv("LLM_INPUT_TOKEN_BUDGET", "3000"))
+LLM_MAX_COMPLETION_TOKENS  = int(os.getenv("LLM_MAX_COMPLETION_TOKENS", "2000"))
+# Reasoning effort for reasoning deployments; set to "" for deployments that reject the parameter.
+# At the model's default effort, reasoning alone can use up the completion cap.
+LLM_REASONING_EFFORT       = os.getenv("LLM_REASONING_EFFORT", "low")
+LLM_FAST_REASONING_EFFORT  = os.getenv("LLM_FAST_REASONING_EFFORT", LLM_REASONING_EFFORT)
+# A reply cut off by the completion cap is retried once with this cap and minimal effort
+LLM_RETRY_COMPLETION_TOKENS = int(os.getenv("LLM_RETRY_COMPLETION_TOKENS", "4000"))
+# Per-call timeout; under a request deadline it is cut to what is left
+LLM_TIMEOUT_SEC            = float(os.getenv("LLM_TIMEOUT_SEC", "60"))
+MIN_SNIPPET_TOKENS = 32
+
+CLASSIFICATIONS = ("Supported", "Contradicted", "Unclear")
+NOT_CONFIGURED = {"classification":"Unclear","rationale":"LLM not configured.","citations":[]}
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "fact_check",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "classification": {"type": "string", "enum": list(CLASSIFICATIONS)},
+                "rationale": {"type": "string"},
+                "citations": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "title": {"type": "string"},
+                            "source": {"type": "string"},
+                            "url": {"type": "string"},
+                        },
+                        "required": ["title", "source", "url"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["classification", "rationale", "citations"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+SYSTEM_PROMPT = ("You are a careful fact-checking assistant for Grade-9 students. "
+                 "Use ONLY the provided articles. If evidence is mixed/insufficient, answer 'Unclear'. "
+                 "Always include 2–4 citations (title, source, url). Neutral tone.")
+
+# The fast tier also reports how sure it is, so low-confidence answers can be escalated
+CONFIDENCE_PROMPT = (" Also return confidence: a number from 0 to 1, the probability that your "
+                     "classification is what a careful expert would conclude from these articles.")
+RESPONSE_FORMAT_WITH_CONFIDENCE = json.loads(json.dumps(RESPONSE_FORMAT))
+_schema = RESPONSE_FORMAT_WITH_CONFIDENCE["json_schema"]["schema"]
+_schema["properties"]["confidence"] = {"type": "number"}
+_schema["required"].append("confidence")
+
+_encoding = None
+
+def count_tokens(text):
+    """Local token count: tiktoken when installed, otherwise ~4 characters per token."""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+def _truncate_tokens(text, max_tokens):
+    if tiktoken is not None:
+        toks = _encoding.encode(text)
+        return text if len(toks) <= max_tokens else _encoding.decode(toks[:max_tokens]).rstrip() + "…"
+    max_len = max_tokens * 4
+    return text if len(text) <= max_len else text[:max_len].rstrip() + "…"
+
+def _format_article(a, snippet):
+    return f"- Title: {a['title']}\n  Source: {a['source']}\n  URL: {a['url']}\n  Snippet: {snippet}"
+
+def _user_prompt(query, evidence):
+    return f"""Claim or headline:
 \"\"\"{query}\"\"\"
 
 Articles:
@@ -27,35 +114,465 @@ Return JSON with:
   rationale: <= 6 sentences; reference article titles
   citations: array of {{title, source, url}}
 Use ONLY the articles above."""
-    
-    client = AzureOpenAI(
-        api_version=api_version,
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        api_key=AZURE_OPENAI_API_KEY,
-    )
-
-    response = client.chat.completions.create(
-        messages=[
-            {
-                "role": "system",
-                "content": sys,
-            },
-            {
-                "role": "user",
-                "content": usr,
-            }
-        ],
-        max_completion_tokens=16384,
-        model=AZURE_OPENAI_DEPLOYMENT
-    )
 
+def build_prompt(query, articles, budget=LLM_INPUT_TOKEN_BUDGET):
+    """
+    Chat messages for the classifier, fitted to `budget` input tokens.
+    Articles are taken in order (best first); the one that overflows has its
+    snippet trimmed, and everything after it is dropped.
+    Returns (messages, articles_used, estimated_prompt_tokens).
+    """
+    used, blocks = [], []
+    remaining = budget - count_tokens(SYSTEM_PROMPT) - count_tokens(_user_prompt(query, ""))
+    for a in articles:
+        snippet = a.get('snippet','') or ''
+        block = _format_article(a, snippet)
+        cost = count_tokens(block) + 1
+        if cost > remaining:
+            head = count_tokens(_format_article(a, ""))
+            if remaining - head < MIN_SNIPPET_TOKENS:
+                break
+            block = _format_article(a, _truncate_tokens(snippet, remaining - head - 1))
+            cost = count_tokens(block) + 1
+        blocks.append(block)
+        used.append(a)
+        remaining -= cost
+        if remaining <= 0:
+            break
+    if len(used) < len(articles):
+        logging.info(f"Prompt budget {budget}: kept {len(used)} of {len(articles)} articles.")
+
+    usr = _user_prompt(query, "\n\n".join(blocks))
+    messages = [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT,
+        },
+        {
+            "role": "user",
+            "content": usr,
+        }
+    ]
+    return messages, used, count_tokens(SYSTEM_PROMPT) + count_tokens(usr)
+
+def _completion_kwargs(tier="full"):
+    fast = tier == "fast"
+    kwargs = {
+        "max_completion_tokens": LLM_MAX_COMPLETION_TOKENS,
+        "model": AZURE_OPENAI_FAST_DEPLOYMENT if fast else AZURE_OPENAI_DEPLOYMENT,
+        "response_format": RESPONSE_FORMAT_WITH_CONFIDENCE if fast else RESPONSE_FORMAT,
+    }
+    effort = LLM_FAST_REASONING_EFFORT if fast else LLM_REASONING_EFFORT
+    if effort:
+        kwargs["reasoning_effort"] = effort
+    return kwargs
+
+def _retry_kwargs(kwargs):
+    """Completion kwargs for the one retry after a reply was cut off by the token cap."""
+    retry = dict(kwargs, max_completion_tokens=max(LLM_RETRY_COMPLETION_TOKENS, kwargs["max_completion_tokens"]))
+    if "reasoning_effort" in retry:
+        retry["reasoning_effort"] = "minimal"
+    return retry
+
+def _cut_off(response):
+    """True when the reply hit max_completion_tokens (reasoning can leave no content at all)."""
+    choice = response.choices[0]
+    return choice.finish_reason == "length" or not choice.message.content
+
+def _tier_messages(messages, tier):
+    if tier != "fast":
+        return messages
+    return [dict(messages[0], content=messages[0]["content"] + CONFIDENCE_PROMPT)] + messages[1:]
+
+def _usage(usage, estimated):
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None) if usage else None,
+        "completion_tokens": getattr(usage, "completion_tokens", None) if usage else None,
+        "estimated_prompt_tokens": estimated,
+    }
+
+def _parse_reply(content):
+    """json.loads the reply; fall back to the outermost {...} if the model added prose."""
+    try:
+        return json.loads(content or "")
+    except ValueError:
+        m = re.search(r"\{.*\}", content or "", re.DOTALL)
+        if m:
+            try:
+                return json.loads(m.group(0))
+            except ValueError:
+                pass
+    logging.warning("Classifier reply was not valid JSON; returning 'Unclear'.")
+    return {}
+
+def _timed_prompt(query, articles):
+    with telemetry.stage("llm.prompt", articles=len(articles)) as st:
+        messages, used, estimated = build_prompt(query, articles)
+        st["citations"] = len(used)
+        st["estimated_prompt_tokens"] = estimated
+    return messages, estimated
+
+def _record_usage(st, usage):
+    st["prompt_tokens"] = usage["prompt_tokens"] or 0
+    st["completion_tokens"] = usage["completion_tokens"] or 0
+
+# -----------------------------
+# Cascade
+# -----------------------------
+class CascadeStats:
+    """Per-tier call counts, answers, escalations and latency for the classifier cascade."""
+
+    TIERS = ("rules", "fast", "full")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tiers = {t: {"calls": 0, "answered": 0, "escalated": 0, "ms": 0.0} for t in self.TIERS}
+
+    def request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record(self, tier, ms, answered):
+        with self._lock:
+            t = self.tiers[tier]
+            t["calls"] += 1
+            t["ms"] += ms
+            t["answered" if answered else "escalated"] += 1
+
+    def stats(self):
+        with self._lock:
+            out = {"requests": self.requests}
+            for name, t in self.tiers.items():
+                out[name] = {
+                    "calls": t["calls"],
+                    "answered": t["answered"],
+                    "escalated": t["escalated"],
+                    "hit_rate": round(t["answered"] / self.requests, 3) if self.requests else None,
+                    "mean_ms": round(t["ms"] / t["calls"], 1) if t["calls"] else None,
+                }
+        return out
+
+_cascade = CascadeStats()
+
+def cascade_stats():
+    return _cascade.stats()
+
+def _rule_verdict(articles):
+    """
+    Tier 0: with fewer than CASCADE_MIN_CITATIONS articles the model can
+    only answer 'Unclear', so say so without calling it.
+    """
+    if len(articles) >= CASCADE_MIN_CITATIONS:
+        return None
+    found = f"only {len(articles)} relevant article{'' if len(articles) == 1 else 's'}" if articles else "no relevant articles"
+    incomplete = deadline.degraded()
+    if incomplete:
+        # retrieval was skipped or cut short, so the missing articles say nothing about coverage
+        rationale = (f"The evidence search did not complete ({'; '.join(incomplete)}), so this claim "
+                     f"could not be checked: {found} retrieved.")
+    else:
+        rationale = f"There is not enough news coverage to check this claim: {found} found."
+    return {
+        "classification": "Unclear",
+        "rationale": rationale,
+        "citations": [{"title": a.get("title",""), "source": a.get("source",""), "url": a.get("url","")} for a in articles],
+        "tier": "rules",
+    }
+
+def _confident(result):
+    return (result.get("confidence") or 0.0) >= CASCADE_MIN_CONFIDENCE
+
+def _tiers():
+    return ("fast", "full") if AZURE_OPENAI_FAST_DEPLOYMENT else ("full",)
+
+def _sum_usage(a, b):
+    """Token usage of two model calls added up (a missing count adds 0)."""
+    return b if a is None else {k: (a[k] or 0) + (b[k] or 0) for k in b}
+
+def _check_rules(articles):
+    """Count the request and run tier 0; returns the rules verdict or None."""
+    _cascade.request()
+    t0 = time.perf_counter()
+    with telemetry.stage("llm.rules", articles=len(articles)) as st:
+        result = _rule_verdict(articles)
+        st["answered"] = result is not None
+    _cascade.record("rules", (time.perf_counter() - t0) * 1000.0, result is not None)
+    return result
+
+def _finish_tier(tier, result, t0, last):
+    """Record the tier; True when its answer stands (confident enough or nowhere left to escalate)."""
+    answered = last or _confident(result)
+    _cascade.record(tier, (time.perf_counter() - t0) * 1000.0, answered)
+    if not answered:
+        logging.info(f"{tier} tier confidence {result.get('confidence')} < {CASCADE_MIN_CONFIDENCE}; escalating")
+    return answered
+
+def _with_deadline(client):
+    """
+    `client` with its timeout cut to the request deadline. Raises
+    DeadlineExceeded when too little is left to start a call.
+    """
+    if deadline.remaining() is None:
+        return client
+    return client.with_options(timeout=deadline.timeout(LLM_TIMEOUT_SEC))
+
+def _deadline_hit(e):
+    """True when `e` means the request deadline stopped a model call."""
+    from openai import APITimeoutError
+    return isinstance(e, deadline.DeadlineExceeded) or (isinstance(e, APITimeoutError) and not deadline.allows())
+
+def _create(client, messages, kwargs, estimated):
+    """One classifier call, retried once with _retry_kwargs() if cut off. Returns (response, usage)."""
+    response = _with_deadline(client).chat.completions.create(messages=messages, **kwargs)
+    usage = _usage(response.usage, estimated)
+    if _cut_off(response):
+        logging.warning(f"Classifier reply cut off at {kwargs['max_completion_tokens']} tokens; retrying once")
+        telemetry.incr("retries")
+        response = _with_deadline(client).chat.completions.create(messages=messages, **_retry_kwargs(kwargs))
+        usage = _sum_usage(usage, _usage(response.usage, estimated))
+    return response, usage
+
+async def _create_async(client, messages, kwargs, estimated):
+    """_create for AsyncAzureOpenAI."""
+    response = await _with_deadline(client).chat.completions.create(messages=messages, **kwargs)
+    usage = _usage(response.usage, estimated)
+    if _cut_off(response):
+        logging.warning(f"Classifier reply cut off at {kwargs['max_completion_tokens']} tokens; retrying once")
+        telemetry.incr("retries")
+        response = await _with_deadline(client).chat.completions.create(messages=messages, **_retry_kwargs(kwargs))
+        usage = _sum_usage(usage, _usage(response.usage, estimated))
+    return response, usage
+
+def _reply_result(response, tier):
+    """Validated result of a tier's reply; a reply still cut off is marked degraded so it is not cached."""
     content = response.choices[0].message.content
-    print(content)
-    
-    # url=f"{AZURE_OPENAI_ENDPOINT}/openai/deployments/{AZURE_OPENAI_DEPLOYMENT}/chat/completions?api-version=2024-10-01-preview"
-    # headers={"api-key":AZURE_OPENAI_API_KEY,"Content-Type":"application/json"}
-    # body={"messages":[{"role":"system","content":sys},{"role":"user","content":usr}],
-    #       "temperature":0.2,"response_format":{"type":"json_object"}}
-    # r=requests.post(url,headers=headers,json=body,timeout=30); r.raise_for_status()
-    # content=r.json()["choices"][0]["message"]["content"]
-    return json.loads(content)
\ No newline at end of file
+    telemetry.log_payload("Classifier reply", content)
+    result = _validate_result(_parse_reply(content))
+    result["tier"] = tier
+    if _cut_off(response):
+        result["degraded_reasons"] = ["classifier reply cut off at the token cap"]
+    return result
+
+def deadline_verdict(articles):
+    """Best-effort 'Unclear' for a request whose deadline left no time to classify."""
+    return {
+        "classification": "Unclear",
+        "rationale": "The fact-check ran out of time before the evidence could be assessed.",
+        "citations": [{"title": a.get("title",""), "source": a.get("source",""), "url": a.get("url","")} for a in articles],
+        "tier": "deadline",
+    }
+
+def _out_of_time(result, articles):
+    """The answer a tier that no longer fits leaves: the previous tier's, else deadline_verdict()."""
+    if result is not None:
+        deadline.degrade("classifier escalation skipped")
+        return result
+    deadline.degrade("classification skipped")
+    return deadline_verdict(articles)
+
+def classify_with_citations(query, articles):
+    """
+    Classify `query` against `articles`, cheapest tier first:
+      1) rules: too few articles -> 'Unclear' without a model call;
+      2) AZURE_OPENAI_FAST_DEPLOYMENT, kept when its confidence is at least
+         CASCADE_MIN_CONFIDENCE;
+      3) AZURE_OPENAI_DEPLOYMENT otherwise.
+    The result names the answering `tier`; `usage` sums every model call.
+    A tier that does not fit the request deadline is skipped: the previous
+    tier's answer stands, or the result is deadline_verdict(). A reply cut
+    off by the completion cap is retried once; one still cut off carries
+    `degraded_reasons` and is not cached.
+    """
+    result = _check_rules(articles)
+    if result is not None:
+        return result
+    if not AZURE_OPENAI_ENDPOINT or not AZURE_OPENAI_API_KEY:
+        return dict(NOT_CONFIGURED)
+
+    client = get_openai_client()
+    messages, estimated = _timed_prompt(query, articles)
+    result = usage = None
+    tiers = _tiers()
+    for tier in tiers:
+        t0 = time.perf_counter()
+        kwargs = _completion_kwargs(tier)
+        try:
+            with telemetry.stage("llm.classify", model=kwargs["model"], tier=tier) as st:
+                response, call_usage = _create(client, _tier_messages(messages, tier), kwargs, estimated)
+                _record_usage(st, call_usage)
+        except Exception as e:
+            if not _deadline_hit(e):
+                raise
+            result = _out_of_time(result, articles)
+            break
+
+        result = _reply_result(response, tier)
+        usage = _sum_usage(usage, call_usage)
+        if _finish_tier(tier, result, t0, tier == tiers[-1]):
+            break
+    result["usage"] = usage
+    return result
+
+async def classify_with_citations_async(query, articles):
+    """classify_with_citations on AsyncAzureOpenAI, for the async routes."""
+    result = _check_rules(articles)
+    if result is not None:
+        return result
+    if not AZURE_OPENAI_ENDPOINT or not AZURE_OPENAI_API_KEY:
+        return dict(NOT_CONFIGURED)
+
+    client = get_async_openai_client()
+    messages, estimated = _timed_prompt(query, articles)
+    result = usage = None
+    tiers = _tiers()
+    for tier in tiers:
+        t0 = time.perf_counter()
+        kwargs = _completion_kwargs(tier)
+        try:
+            with telemetry.stage("llm.classify", model=kwargs["model"], tier=tier) as st:
+                response, call_usage = await _create_async(client, _tier_messages(messages, tier), kwargs, estimated)
+                _record_usage(st, call_usage)
+        except Exception as e:
+            if not _deadline_hit(e):
+                raise
+            result = _out_of_time(result, articles)
+            break
+
+        result = _reply_result(response, tier)
+        usage = _sum_usage(usage, call_usage)
+        if _finish_tier(tier, result, t0, tier == tiers[-1]):
+            break
+    result["usage"] = usage
+    return result
+
+
+def _validate_result(res):
+    """Coerce a parsed model reply into {classification, rationale, citations}."""
+    res = res if isinstance(res, dict) else {}
+    classification = res.get("classification")
+    citations = [
+        {"title": c.get("title",""), "source": c.get("source",""), "url": c.get("url","")}
+        for c in (res.get("citations") or []) if isinstance(c, dict)
+    ]
+    out = {
+        "classification": classification if classification in CLASSIFICATIONS else "Unclear",
+        "rationale": str(res.get("rationale") or ""),
+        "citations": citations,
+    }
+    if isinstance(res.get("confidence"), (int, float)):
+        out["confidence"] = min(1.0, max(0.0, float(res["confidence"])))
+    return out
+
+
+_CLASSIFICATION_RE = re.compile(r'"classification"\s*:\s*"([^"]*)"')
+_RATIONALE_RE = re.compile(r'"rationale"\s*:\s*"')
+
+def _partial_rationale(buf):
+    """
+    Decoded prefix of the (possibly still open) "rationale" string in a
+    partial JSON reply, or None if the field has not started yet.
+    """
+    m = _RATIONALE_RE.search(buf)
+    if not m:
+        return None
+    i = start = m.end()
+    while i < len(buf):
+        ch = buf[i]
+        if ch == "\\":
+            if i + 1 >= len(buf) or (buf[i+1] == "u" and i + 6 > len(buf)):
+                break  # escape sequence split across chunks
+            i += 6 if buf[i+1] == "u" else 2
+            continue
+        if ch == '"':
+            break
+        i += 1
+    try:
+        return json.loads('"' + buf[start:i] + '"')
+    except ValueError:
+        return None
+
+def stream_classify_with_citations(query, articles):
+    """
+    Streaming variant of classify_with_citations. Yields (event, data) pairs:
+      ("classification", str)  as soon as the label is complete,
+      ("rationale", str)       rationale text deltas as they arrive,
+      ("result", dict)         the final validated JSON.
+    Under a request deadline the call's timeout is cut to what is left, and a
+    reply still streaming when the deadline passes ends in deadline_verdict().
+    """
+    rule = _check_rules(articles)
+    if rule is not None:
+        yield "classification", rule["classification"]
+        yield "rationale", rule["rationale"]
+        yield "result", rule
+        return
+    if not AZURE_OPENAI_ENDPOINT or not AZURE_OPENAI_API_KEY:
+        yield "result", dict(NOT_CONFIGURED)
+        return
+
+    # Streamed text cannot be taken back, so the stream always uses the full tier
+    t0 = time.perf_counter()
+    client = get_openai_client()
+    messages, _, estimated = build_prompt(query, articles)
+    try:
+        stream = client.chat.completions.create(
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=deadline.timeout(LLM_TIMEOUT_SEC),
+            **_completion_kwargs()
+        )
+    except Exception as e:
+        if not _deadline_hit(e):
+            raise
+        yield "result", _out_of_time(None, articles)
+        return
+
+    buf = ""
+    usage = finish_reason = None
+    sent_classification = False
+    sent_rationale = 0
+    out_of_time = False
+    try:
+        for chunk in stream:
+            if deadline.budget(LLM_TIMEOUT_SEC) <= 0:
+                # the timeout bounds each read, not the whole reply
+                out_of_time = True
+                stream.close()
+                break
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if not chunk.choices:
+                continue  # Azure sends prompt-filter results in a choice-less chunk
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+            delta = chunk.choices[0].delta.content or ""
+            if not delta:
+                continue
+            buf += delta
+            if not sent_classification:
+                m = _CLASSIFICATION_RE.search(buf)
+                if m:
+                    sent_classification = True
+                    yield "classification", m.group(1)
+            rationale = _partial_rationale(buf)
+            if rationale is not None and len(rationale) > sent_rationale:
+                yield "rationale", rationale[sent_rationale:]
+                sent_rationale = len(rationale)
+    except Exception as e:
+        if not _deadline_hit(e):
+            raise
+        out_of_time = True
+
+    if out_of_time:
+        deadline.degrade("classification cut off")
+        yield "result", dict(deadline_verdict(articles), usage=_usage(usage, estimated))
+        return
+    result = _validate_result(_parse_reply(buf))
+    result["tier"] = "full"
+    if finish_reason == "length" or not buf:
+        result["degraded_reasons"] = ["classifier reply cut off at the token cap"]
+    result["usage"] = _usage(usage, estimated)
+    _cascade.record("full", (time.perf_counter() - t0) * 1000.0, True)
+    telemetry.log_payload("Classifier reply", buf)
+    yield "result", result
\ No newline at end of file
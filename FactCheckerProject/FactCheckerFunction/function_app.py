@@ -1,17 +1,260 @@
+import os
+import asyncio
 import logging
+import contextvars
 import json, azure.functions as func
-from binggrounding import get_response_and_classify
-from newsapisearch import classify_with_newsdata
-from sources import search_all
-from factcheck_llm import classify_with_citations
+from cache import VERDICT_CACHE_ENABLED, get_verdict_cache, verdict_key
+from batch import BATCH_MAX_CONCURRENCY, run_batch
+import telemetry
+import deadline
+import jobs
+import evidenceindex
+from singleflight import SINGLEFLIGHT_ENABLED, get_flights
 from datetime import datetime, timedelta
-from urllib.parse import quote
+from urllib.parse import quote, unquote
 
+# The SSE route needs azurefunctions-extensions-http-fastapi. Once that extension is
+# loaded the worker hands every HTTP trigger FastAPI request/response types, which
+# the func.HttpRequest routes below do not accept, so it is opt-in: set
+# STREAM_ENABLED=true only on a deployment that serves the stream route.
+STREAM_ENABLED = os.getenv("STREAM_ENABLED", "false").lower() == "true"
+Request = StreamingResponse = None
+if STREAM_ENABLED:
+    try:
+        from azurefunctions.extensions.http.fastapi import Request, StreamingResponse
+    except ImportError:
+        logging.warning("STREAM_ENABLED is set but azurefunctions-extensions-http-fastapi is not installed")
+
+# Pipelines (Bing/agents SDK, NewsData, OpenAI, NumPy ranking) are imported
+# by the route that first needs them, not at indexing time.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "false").lower() == "true"
+WARMUP_ROUTES  = tuple(r.strip() for r in os.getenv("WARMUP_ROUTES", "bing,newsdata").split(",") if r.strip())
+
+telemetry.setup()
 app = func.FunctionApp()
 
+def _cache_lookup(route, q, frm, to):
+    """
+    Cached verdict for (claim, route, date window): an exact match on the
+    normalized claim first, then the closest near-duplicate claim above
+    SIMINDEX_THRESHOLD that makes the same claim (simindex.claims_agree).
+    Returns None on a miss.
+    """
+    if not VERDICT_CACHE_ENABLED:
+        return None
+    from simindex import SIMINDEX_ENABLED, claims_agree, get_claim_index, near_key, simhash
+    cache = get_verdict_cache()
+    try:
+        hit = cache.get(verdict_key(q, route, frm, to))
+        if hit is not None:
+            return dict(hit, cached=True)
+        if SIMINDEX_ENABLED:
+            scope = f"{route}|{frm or ''}|{to or ''}"
+            match = get_claim_index().query(simhash(q), scope)
+            if match:
+                hit = cache.get(near_key(scope, match[0]))
+                if hit is not None and claims_agree(q, hit.get("matched_claim", "")):
+                    return dict(hit, cached=True, similarity=round(match[1], 3))
+    except Exception as e:
+        logging.warning(f'verdict cache read failed: {e}')
+    return None
+
+def _cache_store(route, q, frm, to, payload):
+    if not VERDICT_CACHE_ENABLED:
+        return
+    from simindex import SIMINDEX_ENABLED, get_claim_index, near_key, simhash
+    cache = get_verdict_cache()
+    payload = {k: v for k, v in payload.items() if k != "usage"}   # token counts belong to the original call
+    try:
+        cache.set(verdict_key(q, route, frm, to), payload)
+        if SIMINDEX_ENABLED:
+            scope = f"{route}|{frm or ''}|{to or ''}"
+            sig = simhash(q)
+            cache.set(near_key(scope, sig), dict(payload, matched_claim=unquote(q)))
+            get_claim_index().add(sig, scope)
+    except Exception as e:
+        logging.warning(f'verdict cache write failed: {e}')
+
+def _cached_verdict(route, q, frm, to, compute):
+    """
+    Serve the verdict for (claim, route, date window) from the verdict cache,
+    running `compute` and storing its payload on a miss. Concurrent misses
+    for the same key share one `compute` (single-flight). The returned
+    payload carries `cached`, plus `coalesced` when another request ran it.
+    A payload degraded by the request deadline or by failed retrieval (a
+    failed agent run, providers that timed out or failed, the search_all
+    fallback) is flagged and not cached.
+    """
+    with telemetry.stage("cache_lookup") as st:
+        hit = _cache_lookup(route, q, frm, to)
+        st["hit"] = hit is not None
+    if hit is not None:
+        return hit
+
+    def run():
+        with deadline.tracking():
+            with telemetry.stage(f"pipeline.{route}") as st:
+                payload = compute()
+                st["citations"] = len(payload.get("citations") or [])
+            return _store_unless_degraded(route, q, frm, to, payload)
+
+    if not SINGLEFLIGHT_ENABLED:
+        return dict(run(), cached=False)
+    payload, shared = get_flights().do(verdict_key(q, route, frm, to), run)
+    return _flight_payload(payload, shared)
+
+async def _cached_verdict_async(route, q, frm, to, compute):
+    """
+    _cached_verdict for a coroutine `compute` (the async routes). The SQLite
+    cache reads and writes run in a worker thread, off the event loop.
+    """
+    with telemetry.stage("cache_lookup") as st:
+        hit = await asyncio.to_thread(_cache_lookup, route, q, frm, to)
+        st["hit"] = hit is not None
+    if hit is not None:
+        return hit
+
+    async def run():
+        with deadline.tracking():
+            with telemetry.stage(f"pipeline.{route}") as st:
+                payload = await compute()
+                st["citations"] = len(payload.get("citations") or [])
+            return await asyncio.to_thread(_store_unless_degraded, route, q, frm, to, payload)
+
+    if not SINGLEFLIGHT_ENABLED:
+        return dict(await run(), cached=False)
+    payload, shared = await get_flights().do_async(verdict_key(q, route, frm, to), run)
+    return _flight_payload(payload, shared)
+
+async def _verdict_before_deadline(route, q, frm, to, compute):
+    """
+    _cached_verdict_async bounded by the request deadline: a pipeline still
+    running when it expires is cancelled and the request gets a degraded
+    'Unclear' verdict instead of an error.
+    """
+    try:
+        return await asyncio.wait_for(_cached_verdict_async(route, q, frm, to, compute), deadline.budget(float("inf")))
+    except Exception as e:
+        if not isinstance(e, asyncio.TimeoutError) and not deadline.ran_out(e):
+            raise
+    from factcheck_llm import deadline_verdict
+    deadline.degrade(f"{route}: pipeline stopped at the deadline")
+    return dict(deadline_verdict([]), cached=False, degraded=True, degraded_reasons=deadline.degraded())
+
+def _store_unless_degraded(route, q, frm, to, payload):
+    """Cache `payload` unless the request or the payload itself was degraded; a degraded payload is flagged."""
+    reasons = list(dict.fromkeys(list(payload.get("degraded_reasons") or []) + deadline.degraded()))
+    if reasons:
+        return dict(payload, degraded=True, degraded_reasons=reasons)
+    _cache_store(route, q, frm, to, payload)
+    return payload
+
+def _flight_payload(payload, shared):
+    if not shared:
+        return dict(payload, cached=False)
+    # token counts belong to the request that ran the pipeline
+    return dict({k: v for k, v in payload.items() if k != "usage"}, cached=False, coalesced=True)
+
+def _json_response(payload, stages=None, status_code=200):
+    """JSON response, with a Server-Timing header built from the request's stages."""
+    headers = {}
+    if stages and telemetry.SERVER_TIMING_ENABLED:
+        headers["Server-Timing"] = telemetry.server_timing(stages)
+    return func.HttpResponse(json.dumps(payload), status_code=status_code, mimetype="application/json", headers=headers)
+
+def _classify_bing(q):
+    from binggrounding import get_response_and_classify
+    return get_response_and_classify(q)
+
+def _bing_articles(q):
+    from binggrounding import get_bing_articles
+    return get_bing_articles(q)
+
+def _classify_newsdata(q):
+    from newsapisearch import classify_with_newsdata
+    from ratelimit import ProviderUnavailable
+    try:
+        return classify_with_newsdata(
+            query=q,
+            country="in",
+            language="en",
+            page_limit=2,          # fetch up to 2 pages
+            use_sdk=False,         # set True if you installed `newsdataapi`
+        )
+    except ProviderUnavailable as e:
+        # NewsData is throttled or its circuit is open: answer from Guardian/NewsAPI instead
+        logging.warning(f'NewsData unavailable ({e}); falling back to search_all')
+        deadline.degrade("newsdata unavailable; answered from search_all")
+        from sources import search_all
+        from factcheck_llm import classify_with_citations
+        arts = search_all(q) if _fallback_fits() else []
+        return dict(classify_with_citations(q, arts), fallback="search_all")
+
+def _fallback_fits():
+    if deadline.allows(reserve=deadline.classify_reserve()):
+        return True
+    deadline.degrade("newsdata unavailable; search fallback skipped")
+    return False
+
+def _newsdata_articles(q):
+    from newsapisearch import fetch_newsdata_citations
+    return fetch_newsdata_citations(q, country="in", language="en", page_limit=2, use_sdk=False)
+
+def _classify_unified(q):
+    """Race Bing grounding against NewsData and classify the first sufficient evidence set."""
+    from hedge import retrieve_hedged
+    from factcheck_llm import classify_with_citations
+    articles, meta = retrieve_hedged(q, [("bing", _bing_articles), ("newsdata", _newsdata_articles)])
+    return dict(classify_with_citations(q, articles), **meta)
+
+_PIPELINES = {
+    "bing":     _classify_bing,
+    "newsdata": _classify_newsdata,
+    "unified":  _classify_unified,
+}
+
+# Async pipelines for the HTTP routes: agents, OpenAI and news calls are
+# awaited, so a waiting fact-check does not hold a worker thread.
+async def _classify_bing_async(q):
+    from binggrounding import get_response_and_classify_async
+    return await get_response_and_classify_async(q)
+
+async def _bing_articles_async(q):
+    from binggrounding import get_bing_articles_async
+    return await get_bing_articles_async(q)
+
+async def _classify_newsdata_async(q):
+    from newsapisearch import classify_with_newsdata_async
+    from ratelimit import ProviderUnavailable
+    try:
+        return await classify_with_newsdata_async(
+            query=q,
+            country="in",
+            language="en",
+            page_limit=2,
+            use_sdk=False,
+        )
+    except ProviderUnavailable as e:
+        logging.warning(f'NewsData unavailable ({e}); falling back to search_all')
+        deadline.degrade("newsdata unavailable; answered from search_all")
+        from sources import search_all_async
+        from factcheck_llm import classify_with_citations_async
+        arts = await search_all_async(q) if _fallback_fits() else []
+        return dict(await classify_with_citations_async(q, arts), fallback="search_all")
+
+async def _newsdata_articles_async(q):
+    from newsapisearch import fetch_newsdata_citations_async
+    return await fetch_newsdata_citations_async(q, country="in", language="en", page_limit=2, use_sdk=False)
+
+async def _classify_unified_async(q):
+    from hedge import retrieve_hedged_async
+    from factcheck_llm import classify_with_citations_async
+    articles, meta = await retrieve_hedged_async(q, [("bing", _bing_articles_async), ("newsdata", _newsdata_articles_async)])
+    return dict(await classify_with_citations_async(q, articles), **meta)
+
 @app.function_name(name="FactCheckHttpBing")   # First function
 @app.route(route="factcheckbing", auth_level=func.AuthLevel.ANONYMOUS)
-def function_app1(req: func.HttpRequest) -> func.HttpResponse:
+async def function_app1(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processing a request.')
     try:
         raw_body = req.get_body().decode('utf-8')
@@ -30,10 +273,11 @@ def function_app1(req: func.HttpRequest) -> func.HttpResponse:
             return func.HttpResponse(json.dumps({"error":"query required"}), status_code=400)
         
         logging.info(f'{q}, {frm}, {to}')
-        payload = get_response_and_classify(q)
+        with telemetry.request_timings() as stages, deadline.scope(deadline.requested(body)):
+            payload = await _verdict_before_deadline("bing", q, frm, to, lambda: _classify_bing_async(q))
 
-        logging.info(f'response: {json.dumps(payload)}')
-        return func.HttpResponse(json.dumps(payload), status_code=200, mimetype="application/json")
+        telemetry.log_payload("response", payload)
+        return _json_response(payload, stages)
 
         # arts = search_all(q, frm=frm, to=to, limit=12)
         # logging.info(f'{arts}')
@@ -52,13 +296,12 @@ def function_app1(req: func.HttpRequest) -> func.HttpResponse:
 
 @app.function_name(name="FactCheckHttpNewsDataIo")   # First function
 @app.route(route="factchecknewsdataio", auth_level=func.AuthLevel.ANONYMOUS)
-def function_app2(req: func.HttpRequest) -> func.HttpResponse:
+async def function_app2(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processing a request.')
     try:
         raw_body = req.get_body().decode('utf-8')
-        logging.info(f'Raw body: {raw_body}')
+        telemetry.log_payload("Raw body", raw_body)
         body = json.loads(raw_body)
-        logging.info(f'{body}')
         query   = body.get("query")
         q = quote(query, safe='')
         frm = body.get("from")
@@ -74,16 +317,11 @@ def function_app2(req: func.HttpRequest) -> func.HttpResponse:
         
         logging.info(f'{q}, {frm}, {to}')
 
-        payload = classify_with_newsdata(
-            query=q,
-            country="in",
-            language="en",
-            page_limit=2,          # fetch up to 2 pages
-            use_sdk=False,         # set True if you installed `newsdataapi`
-        )
+        with telemetry.request_timings() as stages, deadline.scope(deadline.requested(body)):
+            payload = await _verdict_before_deadline("newsdata", q, frm, to, lambda: _classify_newsdata_async(q))
 
-        logging.info(f'response: {json.dumps(payload)}')
-        return func.HttpResponse(json.dumps(payload), status_code=200, mimetype="application/json")
+        telemetry.log_payload("response", payload)
+        return _json_response(payload, stages)
 
         # arts = search_all(q, frm=frm, to=to, limit=12)
         # logging.info(f'{arts}')
@@ -98,4 +336,259 @@ def function_app2(req: func.HttpRequest) -> func.HttpResponse:
         # return func.HttpResponse(json.dumps(payload), status_code=200, mimetype="application/json")
     except Exception as e:
         logging.info(f'response: {e}')
-        return func.HttpResponse(json.dumps({"error":str(e)}), status_code=500)
\ No newline at end of file
+        return func.HttpResponse(json.dumps({"error":str(e)}), status_code=500)
+
+@app.function_name(name="FactCheckHttpUnified")
+@app.route(route="factcheck", auth_level=func.AuthLevel.ANONYMOUS)
+async def function_app_unified(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Python HTTP unified trigger function processing a request.')
+    try:
+        raw_body = req.get_body().decode('utf-8')
+        body = json.loads(raw_body)
+        query = body.get("query")
+        if not query:
+            return func.HttpResponse(json.dumps({"error":"query required"}), status_code=400)
+        q = quote(query, safe='')
+        today = datetime.today().date()
+        to  = body.get("to") or today.strftime("%Y-%m-%d")
+        frm = body.get("from") or (today - timedelta(days=30)).strftime("%Y-%m-%d")
+
+        logging.info(f'{q}, {frm}, {to}')
+        with telemetry.request_timings() as stages, deadline.scope(deadline.requested(body)):
+            payload = await _verdict_before_deadline("unified", q, frm, to, lambda: _classify_unified_async(q))
+
+        telemetry.log_payload("response", payload)
+        return _json_response(payload, stages)
+    except Exception as e:
+        logging.info(f'response: {e}')
+        return func.HttpResponse(json.dumps({"error":str(e)}), status_code=500)
+
+@app.function_name(name="FactCheckHttpBatch")
+@app.route(route="factcheckbatch", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.ANONYMOUS)
+def function_app_batch(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Python HTTP batch trigger function processing a request.')
+    try:
+        body = json.loads(req.get_body().decode('utf-8'))
+        claims = body.get("claims")
+        if not isinstance(claims, list) or not claims or not all(isinstance(c, str) and c for c in claims):
+            return func.HttpResponse(json.dumps({"error":"claims must be a non-empty list of strings"}), status_code=400)
+        provider = body.get("provider", "bing")
+        pipeline = _PIPELINES.get(provider)
+        if pipeline is None:
+            return func.HttpResponse(json.dumps({"error":f"provider must be one of {sorted(_PIPELINES)}"}), status_code=400)
+        concurrency = int(body.get("concurrency") or BATCH_MAX_CONCURRENCY)
+
+        today = datetime.today().date()
+        to  = body.get("to") or today.strftime("%Y-%m-%d")
+        frm = body.get("from") or (today - timedelta(days=30)).strftime("%Y-%m-%d")
+
+        payload = run_batch(claims, provider, _batch_classifier(provider, frm, to), concurrency=concurrency)
+        logging.info(f'batch: {len(claims)} claims, {payload["unique"]} unique')
+        return func.HttpResponse(json.dumps(payload), status_code=200, mimetype="application/json")
+    except ValueError as e:
+        return func.HttpResponse(json.dumps({"error":str(e)}), status_code=400)
+    except Exception as e:
+        logging.info(f'response: {e}')
+        return func.HttpResponse(json.dumps({"error":str(e)}), status_code=500)
+
+def _batch_classifier(provider, frm, to):
+    """classify(claim) for run_batch: the provider's sync pipeline behind the verdict cache."""
+    pipeline = _PIPELINES[provider]
+    def classify(claim):
+        q = quote(claim, safe='')
+        return _cached_verdict(provider, q, frm, to, lambda: pipeline(q))
+    return classify
+
+def _process_job(message, attempt=1):
+    """Run one queued job (queue trigger or the in-memory stand-in) and store its result."""
+    jobs.start_job(message["id"], attempt)
+    provider = message["provider"]
+    payload = run_batch(message["claims"], provider, _batch_classifier(provider, message["from"], message["to"]))
+    jobs.finish_job(message["id"], payload)
+    logging.info(f'job {message["id"]}: {len(message["claims"])} claims done')
+
+@app.function_name(name="FactCheckJobSubmit")
+@app.route(route="factcheckjobs", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.ANONYMOUS)
+def function_app_job_submit(req: func.HttpRequest) -> func.HttpResponse:
+    """Enqueue a claim (or a list of claims) and answer 202 with the job id right away."""
+    try:
+        body = json.loads(req.get_body().decode('utf-8'))
+        claims = body.get("claims") or ([body["query"]] if body.get("query") else None)
+        if not isinstance(claims, list) or not claims or not all(isinstance(c, str) and c for c in claims):
+            return func.HttpResponse(json.dumps({"error":"query or claims (non-empty list of strings) required"}), status_code=400)
+        provider = body.get("provider", "bing")
+        if provider not in _PIPELINES:
+            return func.HttpResponse(json.dumps({"error":f"provider must be one of {sorted(_PIPELINES)}"}), status_code=400)
+
+        today = datetime.today().date()
+        to  = body.get("to") or today.strftime("%Y-%m-%d")
+        frm = body.get("from") or (today - timedelta(days=30)).strftime("%Y-%m-%d")
+
+        job = jobs.submit_job(claims, provider, frm, to, _process_job)
+        payload = {"id": job["id"], "status": job["status"], "result_url": f"/api/factcheckjobs/{job['id']}"}
+        return func.HttpResponse(json.dumps(payload), status_code=202, mimetype="application/json",
+                                 headers={"Location": payload["result_url"]})
+    except ValueError as e:
+        return func.HttpResponse(json.dumps({"error":str(e)}), status_code=400)
+    except Exception as e:
+        logging.info(f'response: {e}')
+        return func.HttpResponse(json.dumps({"error":str(e)}), status_code=500)
+
+@app.function_name(name="FactCheckJobResult")
+@app.route(route="factcheckjobs/{id}", methods=[func.HttpMethod.GET], auth_level=func.AuthLevel.ANONYMOUS)
+def function_app_job_result(req: func.HttpRequest) -> func.HttpResponse:
+    """The job record: status queued/running/done/failed, plus `result` once done."""
+    job = jobs.get_job(req.route_params.get("id", ""))
+    if job is None:
+        return func.HttpResponse(json.dumps({"error":"unknown job id"}), status_code=404)
+    return func.HttpResponse(json.dumps(job), status_code=200, mimetype="application/json")
+
+if jobs.JOBS_BACKEND == "storage":
+    @app.function_name(name="FactCheckJobWorker")
+    @app.queue_trigger(arg_name="msg", queue_name=jobs.JOBS_QUEUE, connection=jobs.JOBS_CONNECTION)
+    def job_worker(msg: func.QueueMessage) -> None:
+        """
+        Queue-triggered worker. host.json (extensions.queues) sets how many
+        messages an instance takes at once; the per-provider slots in batch.py
+        bound the in-flight pipeline runs across them. A failure is retried by
+        the queue until the last attempt, which marks the job failed.
+        """
+        message = json.loads(msg.get_body().decode('utf-8'))
+        attempt = msg.dequeue_count or 1
+        try:
+            _process_job(message, attempt)
+        except Exception as e:
+            logging.warning(f'job {message.get("id")} attempt {attempt} failed: {e}')
+            if attempt >= jobs.JOBS_MAX_ATTEMPTS:
+                jobs.fail_job(message["id"], str(e))
+                return
+            raise
+
+@app.function_name(name="ProviderStats")
+@app.route(route="providerstats", methods=[func.HttpMethod.GET], auth_level=func.AuthLevel.ANONYMOUS)
+def provider_stats(req: func.HttpRequest) -> func.HttpResponse:
+    from ratelimit import all_stats
+    from agentthreads import pool_stats
+    from factcheck_llm import cascade_stats
+    from singleflight import flight_stats
+    stats = dict(all_stats(), agent_threads=pool_stats(), evidence_index=evidenceindex.index_stats(),
+                 cascade=cascade_stats(), singleflight=flight_stats())
+    return func.HttpResponse(json.dumps(stats), status_code=200, mimetype="application/json")
+
+if evidenceindex.EVIDENCE_INDEX_ENABLED:
+    @app.function_name(name="EvidenceIndexExpiry")
+    @app.timer_trigger(schedule=evidenceindex.EVIDENCE_INDEX_EXPIRY_SCHEDULE, arg_name="timer", run_on_startup=False)
+    def evidence_index_expiry(timer: func.TimerRequest) -> None:
+        """Drop indexed articles older than EVIDENCE_INDEX_TTL_SEC from this host's index file."""
+        index = evidenceindex.get_evidence_index()
+        if index is not None:
+            logging.info(f'evidence index: expired {index.expire()} articles')
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _in_one_context(gen):
+    """
+    Step `gen` inside a single contextvars.Context. StreamingResponse pulls a
+    sync body with one thread-pool call per chunk, each in a fresh copy of the
+    context, so a deadline scope opened in `gen` would not outlive its first yield.
+    """
+    ctx = contextvars.copy_context()
+    try:
+        while True:
+            try:
+                chunk = ctx.run(next, gen)
+            except StopIteration:
+                return
+            yield chunk
+    finally:
+        ctx.run(gen.close)
+
+def _stream_events(q, provider, frm, to, seconds):
+    """
+    SSE body for /factcheckstream: citations first, then the classification
+    and rationale deltas as the model writes them, then the validated result.
+    Runs under a `seconds` deadline scope like the other routes.
+    """
+    try:
+        with deadline.scope(seconds) as degraded:
+            hit = _cache_lookup(provider, q, frm, to)
+            if hit is not None:
+                yield _sse("citations", hit.get("citations", []))
+                yield _sse("result", hit)
+                return
+
+            from factcheck_llm import stream_classify_with_citations
+            if provider == "newsdata":
+                articles = _newsdata_articles(q)
+            elif provider == "unified":
+                from hedge import retrieve_hedged
+                articles, _ = retrieve_hedged(q, [("bing", _bing_articles), ("newsdata", _newsdata_articles)])
+            else:
+                articles = _bing_articles(q)
+            yield _sse("citations", articles)
+
+            for event, data in stream_classify_with_citations(q, articles):
+                if event == "result":
+                    if degraded:
+                        data = dict(data, degraded_reasons=list(data.get("degraded_reasons") or []) + degraded)
+                    data = dict(_store_unless_degraded(provider, q, frm, to, data), cached=False)
+                yield _sse(event, data)
+    except Exception as e:
+        logging.info(f'stream error: {e}')
+        yield _sse("error", {"error": str(e)})
+
+if StreamingResponse is not None:
+    @app.function_name(name="FactCheckHttpStream")
+    @app.route(route="factcheckstream", methods=[func.HttpMethod.POST], auth_level=func.AuthLevel.ANONYMOUS)
+    async def function_app_stream(req: Request) -> StreamingResponse:
+        """
+        SSE fact-check. Only registered with STREAM_ENABLED=true, and that hands
+        the whole app to the FastAPI extension: every func.HttpRequest route
+        in this file stops working there, so serve the stream from its own
+        deployment. Body: query, plus optional provider, from, to and deadline_sec.
+        """
+        logging.info('Python HTTP streaming trigger function processing a request.')
+        body = await req.json()
+        query = body.get("query")
+        if not query:
+            return StreamingResponse(iter([_sse("error", {"error":"query required"})]),
+                                     status_code=400, media_type="text/event-stream")
+        q = quote(query, safe='')
+        provider = body.get("provider", "bing")
+        if provider not in _PIPELINES:
+            return StreamingResponse(iter([_sse("error", {"error":f"provider must be one of {sorted(_PIPELINES)}"})]),
+                                     status_code=400, media_type="text/event-stream")
+        today = datetime.today().date()
+        to  = body.get("to") or today.strftime("%Y-%m-%d")
+        frm = body.get("from") or (today - timedelta(days=30)).strftime("%Y-%m-%d")
+
+        events = _in_one_context(_stream_events(q, provider, frm, to, deadline.requested(body)))
+        return StreamingResponse(events, media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+if WARMUP_ENABLED:
+    @app.function_name(name="WarmUp")
+    @app.warm_up_trigger("warmup")
+    async def warm_up(warmup: func.warmup.WarmUpContext) -> None:
+        """
+        Runs when a new instance is added (Premium/Dedicated plans): import the
+        configured route stacks and build their clients before traffic arrives.
+        """
+        import clients
+        modules = {
+            "bing":     ("binggrounding",),
+            "newsdata": ("newsapisearch",),
+            "unified":  ("hedge", "binggrounding", "newsapisearch"),
+        }
+        for route in WARMUP_ROUTES:
+            for module in modules.get(route, ()):
+                __import__(module)
+        __import__("factcheck_llm")
+        if "bing" in WARMUP_ROUTES or "unified" in WARMUP_ROUTES:
+            from agentthreads import get_thread_pool
+            pool = get_thread_pool()
+            if pool:
+                pool.start()
+        logging.info(f'warm-up: {await asyncio.to_thread(clients.warm_up, WARMUP_ROUTES)}')
+        logging.info(f'async warm-up: {await clients.warm_up_async(WARMUP_ROUTES)}')
@@ -0,0 +1,173 @@
+import os
+import time
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from ranking import rank_evidence
+import deadline
+
+
+HEDGE_DELAY_SEC       = float(os.getenv("HEDGE_DELAY_SEC", "0"))      # 0 = start every path at once
+HEDGE_BUDGET_SEC      = float(os.getenv("HEDGE_BUDGET_SEC", "20"))
+HEDGE_MERGE           = os.getenv("HEDGE_MERGE", "false").lower() == "true"
+HEDGE_MERGE_GRACE_SEC = float(os.getenv("HEDGE_MERGE_GRACE_SEC", "1.0"))
+HEDGE_MAX_WORKERS     = int(os.getenv("HEDGE_MAX_WORKERS", "16"))
+MIN_CITATIONS = 2
+MAX_CITATIONS = 4
+
+_executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="hedge")
+
+Retriever = Tuple[str, Callable[[str], List[Dict]]]
+
+
+def retrieve_hedged(
+    query: str,
+    retrievers: List[Retriever],
+    delay: float = HEDGE_DELAY_SEC,
+    budget: float = HEDGE_BUDGET_SEC,
+    merge: bool = HEDGE_MERGE,
+) -> Tuple[List[Dict], Dict]:
+    """
+    Race evidence retrievers for `query`:
+      1) Start the first retriever; start each next one after `delay`
+         seconds unless an earlier one already produced MIN_CITATIONS.
+      2) The first result with >= MIN_CITATIONS wins; slower paths are
+         ignored (a thread already running cannot be interrupted, its
+         result is simply dropped).
+      3) With `merge`, wait up to HEDGE_MERGE_GRACE_SEC (within budget) for
+         the others and rank the union.
+      4) If nobody is sufficient by the deadline, use the largest set seen.
+    `budget` is capped by what the request deadline leaves for retrieval.
+    Returns (articles, meta) where meta names the winner and the losers.
+    """
+    requested, budget = budget, deadline.budget(budget, reserve=deadline.classify_reserve())
+    until = time.monotonic() + budget
+    futures = {}
+    results: Dict[str, List[Dict]] = {}
+    winner = None
+    queue = list(retrievers)
+
+    def _launch():
+        name, fn = queue.pop(0)
+        futures[_executor.submit(contextvars.copy_context().run, fn, query)] = name
+
+    def _collect(done):
+        nonlocal winner
+        for f in done:
+            name = futures.pop(f)
+            try:
+                results[name] = f.result() or []
+            except Exception as e:
+                logging.warning(f"hedged retriever {name} failed: {e}")
+                results[name] = []
+            logging.info(f"hedged retriever {name}: {len(results[name])} citations")
+            if winner is None and len(results[name]) >= MIN_CITATIONS:
+                winner = name
+
+    _launch()
+    while winner is None and (futures or queue):
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            break
+        timeout = min(delay, remaining) if queue else remaining
+        done, _ = wait(list(futures), timeout=timeout, return_when=FIRST_COMPLETED)
+        _collect(done)
+        if winner is None and queue and (not done or not futures):
+            _launch()  # hedge delay elapsed, or every started path came back short
+
+    if winner is not None and merge and futures:
+        grace = min(HEDGE_MERGE_GRACE_SEC, until - time.monotonic())
+        if grace > 0:
+            done, _ = wait(list(futures), timeout=grace)
+            _collect(done)
+
+    ignored = list(futures.values()) + [name for name, _ in queue]
+    if winner is None and ignored and budget < requested:
+        deadline.degrade("hedge: retrievers cut off at the deadline")
+    return _select(query, results, winner, merge, ignored)
+
+
+async def retrieve_hedged_async(
+    query: str,
+    retrievers: List[Tuple[str, Callable[[str], Awaitable[List[Dict]]]]],
+    delay: float = HEDGE_DELAY_SEC,
+    budget: float = HEDGE_BUDGET_SEC,
+    merge: bool = HEDGE_MERGE,
+) -> Tuple[List[Dict], Dict]:
+    """
+    retrieve_hedged for coroutine retrievers. Same race; the losing paths
+    are cancelled rather than left to finish in a worker thread.
+    """
+    requested, budget = budget, deadline.budget(budget, reserve=deadline.classify_reserve())
+    until = time.monotonic() + budget
+    tasks: Dict[asyncio.Task, str] = {}
+    results: Dict[str, List[Dict]] = {}
+    winner = None
+    queue = list(retrievers)
+
+    def _launch():
+        name, fn = queue.pop(0)
+        tasks[asyncio.ensure_future(fn(query))] = name
+
+    def _collect(done):
+        nonlocal winner
+        for t in done:
+            name = tasks.pop(t)
+            try:
+                results[name] = t.result() or []
+            except Exception as e:
+                logging.warning(f"hedged retriever {name} failed: {e}")
+                results[name] = []
+            logging.info(f"hedged retriever {name}: {len(results[name])} citations")
+            if winner is None and len(results[name]) >= MIN_CITATIONS:
+                winner = name
+
+    _launch()
+    while winner is None and (tasks or queue):
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            break
+        timeout = min(delay, remaining) if queue else remaining
+        if tasks:
+            done, _ = await asyncio.wait(list(tasks), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        else:
+            done = set()
+        _collect(done)
+        if winner is None and queue and (not done or not tasks):
+            _launch()
+
+    if winner is not None and merge and tasks:
+        grace = min(HEDGE_MERGE_GRACE_SEC, until - time.monotonic())
+        if grace > 0:
+            done, _ = await asyncio.wait(list(tasks), timeout=grace)
+            _collect(done)
+
+    ignored = list(tasks.values()) + [name for name, _ in queue]
+    if winner is None and ignored and budget < requested:
+        deadline.degrade("hedge: retrievers cut off at the deadline")
+    for t in tasks:
+        t.cancel()
+    return await asyncio.to_thread(_select, query, results, winner, merge, ignored)  # NumPy ranking
+
+
+def _select(query, results, winner, merge, ignored) -> Tuple[List[Dict], Dict]:
+    """Pick the evidence sets to use, dedupe by URL and rank."""
+    if merge and winner is not None:
+        used = [n for n, arts in results.items() if arts]
+    elif winner is not None:
+        used = [winner]
+    else:
+        used = [max(results, key=lambda n: len(results[n]))] if results else []
+
+    candidates = [a for n in used for a in results[n]]
+    seen, unique = set(), []
+    for a in candidates:
+        u = a.get("url")
+        if u and u not in seen:
+            seen.add(u)
+            unique.append(a)
+    articles = rank_evidence(query, unique, k=MAX_CITATIONS)
+    return articles, {"evidence_sources": used, "ignored": ignored}
@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from cache import LRUCache
+
+
+# App setting that holds the storage connection string (the queue trigger
+# takes the setting name, the enqueue side reads its value).
+JOBS_CONNECTION     = os.getenv("JOBS_CONNECTION", "AzureWebJobsStorage")
+# "memory"  = in-process queue and store, for local runs and benchmarks (default);
+# "storage" = Azure Storage queue + blob results (Azurite works too). Opt-in,
+# since AzureWebJobsStorage is set on every Function App.
+JOBS_BACKEND        = os.getenv("JOBS_BACKEND", "memory")
+JOBS_QUEUE          = os.getenv("JOBS_QUEUE", "factcheck-jobs")
+JOBS_CONTAINER      = os.getenv("JOBS_CONTAINER", "factcheck-jobs")
+JOBS_MAX_CLAIMS     = int(os.getenv("JOBS_MAX_CLAIMS", "50"))
+JOBS_MAX_ATTEMPTS   = int(os.getenv("JOBS_MAX_ATTEMPTS", "5"))   # keep in step with host.json maxDequeueCount
+JOBS_LOCAL_WORKERS  = int(os.getenv("JOBS_LOCAL_WORKERS", "4"))
+JOBS_RESULT_TTL_SEC = int(os.getenv("JOBS_RESULT_TTL_SEC", "86400"))
+
+
+class MemoryJobStore:
+    """Job records in this process only; results expire after JOBS_RESULT_TTL_SEC."""
+
+    def __init__(self, ttl: float = JOBS_RESULT_TTL_SEC):
+        self._data = LRUCache(max_size=100_000, ttl=ttl)
+
+    def put(self, job: Dict) -> None:
+        self._data.set(job["id"], dict(job))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        job = self._data.get(job_id)
+        return dict(job) if job is not None else None
+
+
+class BlobJobStore:
+    """Job records as JSON blobs named <id>.json; expiry is left to a lifecycle policy."""
+
+    def __init__(self, conn_str: str, container: str = JOBS_CONTAINER):
+        from azure.storage.blob import ContainerClient
+        from azure.core.exceptions import ResourceExistsError
+        self._container = ContainerClient.from_connection_string(conn_str, container)
+        try:
+            self._container.create_container()
+        except ResourceExistsError:
+            pass
+
+    def put(self, job: Dict) -> None:
+        self._container.upload_blob(f"{job['id']}.json", json.dumps(job), overwrite=True)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            return json.loads(self._container.download_blob(f"{job_id}.json").readall())
+        except ResourceNotFoundError:
+            return None
+
+
+class MemoryJobQueue:
+    """
+    Stand-in for the storage queue: messages go to a bounded local worker
+    pool that calls the same `process` function the queue trigger uses.
+    """
+
+    def __init__(self, workers: int = JOBS_LOCAL_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+    def send(self, message: Dict, process: Callable[[Dict], None]) -> None:
+        self._executor.submit(contextvars.Context().run, _run_local, process, message)
+
+
+class StorageJobQueue:
+    """Azure Storage queue; the FunctionApp's queue trigger does the processing."""
+
+    def __init__(self, conn_str: str, queue: str = JOBS_QUEUE):
+        from azure.storage.queue import QueueClient, TextBase64EncodePolicy
+        from azure.core.exceptions import ResourceExistsError
+        # The Functions queue trigger expects base64 message bodies by default
+        self._queue = QueueClient.from_connection_string(conn_str, queue, message_encode_policy=TextBase64EncodePolicy())
+        try:
+            self._queue.create_queue()
+        except ResourceExistsError:
+            pass
+
+    def send(self, message: Dict, process: Callable[[Dict], None]) -> None:
+        self._queue.send_message(json.dumps(message))
+
+
+def _run_local(process, message):
+    try:
+        process(message)
+    except Exception as e:
+        logging.warning(f"local job {message.get('id')} failed: {e}")
+        fail_job(message["id"], str(e))
+
+
+_store = None
+_queue = None
+_lock = threading.Lock()
+
+
+def get_job_store():
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = BlobJobStore(os.environ[JOBS_CONNECTION]) if JOBS_BACKEND == "storage" else MemoryJobStore()
+    return _store
+
+
+def get_job_queue():
+    global _queue
+    if _queue is None:
+        with _lock:
+            if _queue is None:
+                _queue = StorageJobQueue(os.environ[JOBS_CONNECTION]) if JOBS_BACKEND == "storage" else MemoryJobQueue()
+    return _queue
+
+
+def submit_job(claims: List[str], provider: str, frm: str, to: str, process: Callable[[Dict], None]) -> Dict:
+    """
+    Record a queued job and enqueue it. The record is written first so a
+    GET right after the POST finds it. Returns the stored record.
+    """
+    if len(claims) > JOBS_MAX_CLAIMS:
+        raise ValueError(f"At most {JOBS_MAX_CLAIMS} claims per job.")
+    job = {
+        "id": uuid.uuid4().hex,
+        "status": "queued",
+        "provider": provider,
+        "claims": claims,
+        "from": frm,
+        "to": to,
+        "created": time.time(),
+    }
+    get_job_store().put(job)
+    get_job_queue().send({k: job[k] for k in ("id", "provider", "claims", "from", "to")}, process)
+    return job
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    return get_job_store().get(job_id)
+
+
+def _update(job_id: str, **fields) -> None:
+    store = get_job_store()
+    job = store.get(job_id) or {"id": job_id}
+    job.update(fields)
+    store.put(job)
+
+
+def start_job(job_id: str, attempt: int = 1) -> None:
+    _update(job_id, status="running", started=time.time(), attempt=attempt)
+
+
+def finish_job(job_id: str, result: Dict) -> None:
+    _update(job_id, status="done", finished=time.time(), result=result)
+
+
+def fail_job(job_id: str, error: str) -> None:
+    _update(job_id, status="failed", finished=time.time(), error=error)
@@ -1,7 +1,8 @@
 import os
-import time
-import hashlib
+import asyncio
 import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Tuple
 
 try:
@@ -9,19 +10,46 @@ try:
 except ImportError:
     NewsDataApiClient = None  # type: ignore
 
-import requests
 from dateutil import parser as dateparser
-from urllib.parse import urlparse
+from urllib.parse import urlparse, unquote
 
 # Your existing classifier
-from factcheck_llm import classify_with_citations
+from factcheck_llm import classify_with_citations, classify_with_citations_async
+from clients import get_http_session, http_get
+from cache import get_retrieval_cache, retrieval_key
+import telemetry
+import evidenceindex
+import deadline
+from ranking import rank_evidence, tokenize
+from ratelimit import get_guard
 
 
-NEWSDATA_BASE_URL = "https://newsdata.io/api/1/latest"
+NEWSDATA_BASE_URL = os.getenv("NEWSDATA_BASE_URL", "https://newsdata.io/api/1/latest")
+NEWSDATA_TIMEOUT_SEC = float(os.getenv("NEWSDATA_TIMEOUT_SEC", "20"))
 DEFAULT_MAX_CITATIONS = 4
 
+# Stop paging once this many unique, query-relevant items are collected
+NEWSDATA_MIN_CANDIDATES   = int(os.getenv("NEWSDATA_MIN_CANDIDATES", str(2 * DEFAULT_MAX_CITATIONS)))
+NEWSDATA_PREFETCH_WORKERS = int(os.getenv("NEWSDATA_PREFETCH_WORKERS", "8"))
 
-def classify_with_newsdata(
+_prefetcher = ThreadPoolExecutor(max_workers=NEWSDATA_PREFETCH_WORKERS, thread_name_prefix="newsdata-page")
+
+
+def classify_with_newsdata(query: str, **kwargs) -> Dict:
+    """
+    End-to-end:
+      1) fetch_newsdata_citations(query, **kwargs).
+      2) Call classify_with_citations(query, citations).
+    """
+    return classify_with_citations(query, fetch_newsdata_citations(query, **kwargs))
+
+
+async def classify_with_newsdata_async(query: str, **kwargs) -> Dict:
+    """classify_with_newsdata without blocking the event loop."""
+    return await classify_with_citations_async(query, await fetch_newsdata_citations_async(query, **kwargs))
+
+
+def fetch_newsdata_citations(
     query: str,
     *,
     country: str = "in",
@@ -33,21 +61,76 @@ def classify_with_newsdata(
     retry_backoff_sec: float = 1.5,
     api_key: Optional[str] = None,
     use_sdk: bool = True,
-) -> Dict:
+    min_candidates: int = NEWSDATA_MIN_CANDIDATES,
+) -> List[Dict]:
     """
-    End-to-end:
-      1) Search NewsData for `query` with simple filters.
-      2) Normalize to [{title, source, url, snippet}].
-      3) Dedupe by URL and cap to 4 citations.
-      4) Call classify_with_citations(query, citations).
+    Retrieval half of the NewsData flow:
+      1) Look `query` up in the local evidence index; if that alone finds
+         enough articles, NewsData is not called.
+      2) Otherwise page through NewsData with simple filters, stopping once
+         `min_candidates` unique, query-relevant items (index hits included)
+         are in hand.
+      3) Normalize to [{title, source, url, snippet, publishedAt}], deduped by URL.
+      4) Rank against the query and keep the best 4 citations.
     """
+    params, sdk_client = _build_request(query, country, language, from_date, to_date, api_key, use_sdk)
+    candidates = _Candidates(query, min_candidates)
+    if _seed_from_index(query, params, candidates):
+        return _rank_citations(query, candidates.items)
+    try:
+        for items in _iter_pages(params, sdk_client, page_limit, max_retries, retry_backoff_sec, candidates):
+            candidates.add(items)
+            if candidates.enough:
+                break
+    except Exception as e:
+        _cut_short(e)
+    return _rank_citations(query, candidates.items)
+
+
+async def fetch_newsdata_citations_async(
+    query: str,
+    *,
+    country: str = "in",
+    language: str = "en",
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    page_limit: int = 1,
+    max_retries: int = 3,
+    retry_backoff_sec: float = 1.5,
+    api_key: Optional[str] = None,
+    use_sdk: bool = True,
+    min_candidates: int = NEWSDATA_MIN_CANDIDATES,
+) -> List[Dict]:
+    """
+    fetch_newsdata_citations on aiohttp (the sync SDK, if used, runs in a
+    thread, as do the index lookup and the ranking).
+    """
+    params, sdk_client = _build_request(query, country, language, from_date, to_date, api_key, use_sdk)
+    candidates = _Candidates(query, min_candidates)
+    if await asyncio.to_thread(_seed_from_index, query, params, candidates):
+        return await asyncio.to_thread(_rank_citations, query, candidates.items)
+    try:
+        async for items in _iter_pages_async(params, sdk_client, page_limit, max_retries, retry_backoff_sec, candidates):
+            candidates.add(items)
+            if candidates.enough:
+                break
+    except Exception as e:
+        _cut_short(e)
+    return await asyncio.to_thread(_rank_citations, query, candidates.items)
+
+
+# -----------------------------
+# Internals
+# -----------------------------
+def _build_request(query, country, language, from_date, to_date, api_key, use_sdk):
+    """Search params and (optional) SDK client for one fetch_newsdata_citations call."""
     api_key = api_key or os.getenv("NEWSDATA_API_KEY")
     if not api_key:
         raise ValueError("Missing API key. Set NEWSDATA_API_KEY or pass api_key=...")
 
     params = {
         "apikey": api_key,
-        "q": query,
+        "q": unquote(query),  # the routes pass the claim URL-quoted; params are encoded on send
         "language": language,
         "country": country,
     }
@@ -57,39 +140,149 @@ def classify_with_newsdata(
         params["to_date"] = _to_yyyy_mm_dd(to_date)
 
     sdk_client = NewsDataApiClient(apikey=api_key) if (use_sdk and NewsDataApiClient) else None
+    return params, sdk_client
 
-    # Accumulate pages
-    all_items: List[Dict] = []
-    seen_hashes = set()
-    next_page_token: Optional[str] = None
 
-    for _ in range(max(1, page_limit)):
-        if next_page_token:
-            params["page"] = next_page_token
+class _Candidates:
+    """
+    Unique items (by URL) collected across pages, counting the ones that
+    share at least one term with the query. Items without a URL cannot be
+    cited and are dropped here.
+    """
 
-        raw = _fetch_newsdata(params, sdk_client, max_retries, retry_backoff_sec)
-        items, next_page_token = _normalize_payload(raw)
+    def __init__(self, query: str, needed: int):
+        self.terms = set(tokenize(query))
+        self.needed = needed
+        self.items: List[Dict] = []
+        self.relevant = 0
+        self._seen = set()
 
+    def add(self, items: List[Dict]) -> None:
         for it in items:
-            h = _hash(it.get("url") or it.get("title") or "")
-            if h in seen_hashes:
+            url = it.get("url")
+            if not url or url in self._seen:
                 continue
-            seen_hashes.add(h)
-            all_items.append(it)
+            self._seen.add(url)
+            self.items.append(it)
+            if not self.terms or self.terms.intersection(tokenize(f"{it.get('title', '')} {it.get('snippet', '')}")):
+                self.relevant += 1
+
+    @property
+    def enough(self) -> bool:
+        return self.relevant >= self.needed
+
+    def short_even_with(self, n: int) -> bool:
+        """True when `n` more items cannot be enough even if all count, i.e. another page is certainly needed."""
+        return self.relevant + n < self.needed
+
+
+def _seed_from_index(query: str, params: Dict, candidates: _Candidates) -> bool:
+    """Add local evidence index hits to `candidates`; True when they are enough on their own."""
+    hits = evidenceindex.lookup(query, params.get("from_date"), params.get("to_date"))
+    candidates.add(hits)
+    return evidenceindex.sufficient(hits)
+
+
+def _cut_short(e: Exception) -> None:
+    """Re-raise `e` unless the request deadline ended paging; then rank what was collected."""
+    if not deadline.ran_out(e, reserve=deadline.classify_reserve()):
+        raise e
+    deadline.degrade("newsdata: retrieval cut short")
 
-        if not next_page_token:
-            break
 
-    citations = _dedupe_by_url(all_items)[:DEFAULT_MAX_CITATIONS]
+def _more_pages(next_token, page: int, page_limit: int) -> bool:
+    """Another page exists, is allowed, and fits in the request deadline."""
+    if not next_token or page + 1 >= page_limit:
+        return False
+    if not deadline.allows(reserve=deadline.classify_reserve()):
+        deadline.degrade("newsdata: extra pages skipped")
+        return False
+    return True
+
+
+def _iter_pages(params, sdk_client, page_limit, max_retries, backoff, candidates: _Candidates):
+    """
+    Yield normalized pages in order, sending `page` with the previous
+    nextPage token. When a page cannot satisfy `candidates` even if every
+    item counts, the next page is requested before this one is yielded, so
+    it downloads while the caller dedupes; otherwise it is requested only
+    if the caller comes back for it. No request is ever wasted. Paging
+    also stops when the request deadline leaves no room for another page.
+    """
+    def fetch(p):
+        return _prefetcher.submit(contextvars.copy_context().run, _fetch_page, p, sdk_client, max_retries, backoff)
+
+    pending, prefetched = fetch(dict(params)), False
+    for page in range(max(1, page_limit)):
+        with telemetry.stage("newsdata.page", page=page, prefetched=prefetched) as st:
+            items, next_token = pending.result()
+            st["citations"] = len(items)
+        more = _more_pages(next_token, page, page_limit)
+        pending, prefetched = None, False
+        if more and candidates.short_even_with(len(items)):
+            pending, prefetched = fetch(dict(params, page=next_token)), True
+        yield items
+        if not more:
+            return
+        if pending is None:
+            pending = fetch(dict(params, page=next_token))
+
+
+async def _iter_pages_async(params, sdk_client, page_limit, max_retries, backoff, candidates: _Candidates):
+    """_iter_pages for the async path: the prefetch is an asyncio task."""
+    def fetch(p):
+        return asyncio.ensure_future(_fetch_page_async(p, sdk_client, max_retries, backoff))
+
+    pending, prefetched = fetch(dict(params)), False
+    for page in range(max(1, page_limit)):
+        with telemetry.stage("newsdata.page", page=page, prefetched=prefetched) as st:
+            items, next_token = await pending
+            st["citations"] = len(items)
+        more = _more_pages(next_token, page, page_limit)
+        pending, prefetched = None, False
+        if more and candidates.short_even_with(len(items)):
+            pending, prefetched = fetch(dict(params, page=next_token)), True
+        yield items
+        if not more:
+            return
+        if pending is None:
+            pending = fetch(dict(params, page=next_token))
+
+
+def _rank_citations(query: str, items: List[Dict]) -> List[Dict]:
+    with telemetry.stage("rank", candidates=len(items)) as st:
+        citations = rank_evidence(query, items, k=DEFAULT_MAX_CITATIONS)
+        st["citations"] = len(citations)
     if len(citations) < 2:
         logging.info("Fewer than 2 citations found; classifier may return 'Unclear'.")
+    return citations
 
-    return classify_with_citations(query, citations)
+
+def _fetch_page(
+    params: Dict,
+    sdk_client,
+    max_retries: int,
+    backoff: float,
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One normalized page, served from the retrieval cache when the same
+    request parameters were fetched recently.
+    """
+    cache = get_retrieval_cache("newsdata")
+    key = retrieval_key(params)
+    hit = cache.get(key)
+    if hit is not None:
+        telemetry.incr("cache_hits")
+        items, next_page = hit
+        return list(items), next_page
+
+    raw = _fetch_newsdata(params, sdk_client, max_retries, backoff)
+    items, next_page = _normalize_payload(raw)
+    cache.set(key, (items, next_page))
+    evidenceindex.ingest(items, "newsdata")
+    return list(items), next_page
 
 
-# -----------------------------
-# Internals
-# -----------------------------
 def _fetch_newsdata(
     params: Dict,
     sdk_client,
@@ -97,40 +290,82 @@ def _fetch_newsdata(
     backoff: float,
 ) -> Dict:
     """
-    Fetch once via SDK if available; otherwise via HTTP.
-    Retries on 429/RequestException with exponential backoff.
-    """
-    attempt = 0
-    while True:
-        try:
-            if sdk_client:
-                sdk_params = {k: v for k, v in params.items() if k != "apikey"}
-                logging.info(f'params:{sdk_params}')
-                resp = sdk_client.news_api(**sdk_params)
-                logging.info(f'response:{resp}')
-                if not isinstance(resp, dict):
-                    raise RuntimeError("Unexpected SDK response type.")
-                return resp
-            else:
-                url = NEWSDATA_BASE_URL + f'?apikey=pub_cf12a6fd139c416496d5b562f52c0c4d&q={params["q"]}&country=in&language=en'
-                logging.info(f'url:{url}')
-                r = requests.get(url, timeout=20)
-                if r.status_code == 429:
-                    raise requests.RequestException("Rate limited (429)")
-                r.raise_for_status()
-                return r.json()
-        except Exception as ex:
-            attempt += 1
-            if attempt > max_retries:
-                logging.error(f"NewsData call failed after {attempt} attempts: {ex}")
-                raise
-            time.sleep(backoff ** attempt)
+    Fetch once via SDK if available; otherwise via HTTP, through the shared
+    NewsData limiter: 429s honour Retry-After, 429/5xx/network errors are
+    retried up to `max_retries`, other errors are raised immediately.
+    Raises ratelimit.ProviderUnavailable while NewsData is throttled or its
+    circuit is open.
+    """
+    guard = get_guard("newsdata")
+    if sdk_client:
+        sdk_params = {k: v for k, v in params.items() if k != "apikey"}
+        resp = guard.call(lambda: sdk_client.news_api(**sdk_params))
+        telemetry.log_payload("NewsData response", resp)
+        if not isinstance(resp, dict):
+            raise RuntimeError("Unexpected SDK response type.")
+        return resp
+
+    r = guard.request(lambda: get_http_session().get(NEWSDATA_BASE_URL, params=params, timeout=_timeout()),
+                      max_retries=max_retries, backoff=backoff)
+    resp = r.json()
+    telemetry.log_payload("NewsData response", resp)
+    return resp
+
+
+async def _fetch_page_async(
+    params: Dict,
+    sdk_client,
+    max_retries: int,
+    backoff: float,
+) -> Tuple[List[Dict], Optional[str]]:
+    """_fetch_page for the async path; shares the same retrieval cache."""
+    cache = get_retrieval_cache("newsdata")
+    key = retrieval_key(params)
+    hit = cache.get(key)
+    if hit is not None:
+        telemetry.incr("cache_hits")
+        items, next_page = hit
+        return list(items), next_page
+
+    raw = await _fetch_newsdata_async(params, sdk_client, max_retries, backoff)
+    items, next_page = _normalize_payload(raw)
+    cache.set(key, (items, next_page))
+    evidenceindex.ingest(items, "newsdata")
+    return list(items), next_page
+
+
+async def _fetch_newsdata_async(
+    params: Dict,
+    sdk_client,
+    max_retries: int,
+    backoff: float,
+) -> Dict:
+    """_fetch_newsdata with awaited retries and rate-limit waits."""
+    guard = get_guard("newsdata")
+    if sdk_client:
+        sdk_params = {k: v for k, v in params.items() if k != "apikey"}
+        resp = await guard.call_async(lambda: asyncio.to_thread(sdk_client.news_api, **sdk_params))
+        if not isinstance(resp, dict):
+            raise RuntimeError("Unexpected SDK response type.")
+        telemetry.log_payload("NewsData response", resp)
+        return resp
+
+    r = await guard.request_async(lambda: http_get(NEWSDATA_BASE_URL, params=params, timeout=_timeout()),
+                                  max_retries=max_retries, backoff=backoff)
+    resp = await r.json(content_type=None)
+    telemetry.log_payload("NewsData response", resp)
+    return resp
+
+
+def _timeout() -> float:
+    """Per-attempt HTTP timeout: NEWSDATA_TIMEOUT_SEC within what the request deadline leaves."""
+    return deadline.timeout(NEWSDATA_TIMEOUT_SEC, reserve=deadline.classify_reserve())
 
 
 def _normalize_payload(raw: Dict) -> Tuple[List[Dict], Optional[str]]:
     """
     Normalize NewsData response to a simple list of dicts with
-    {title, source, url, snippet} and return nextPage token.
+    {title, source, url, snippet, publishedAt} and return nextPage token.
     """
     results = raw.get("results") or []
     items: List[Dict] = []
@@ -147,6 +382,7 @@ def _normalize_payload(raw: Dict) -> Tuple[List[Dict], Optional[str]]:
             "source": source,
             "url": url,
             "snippet": snippet,
+            "publishedAt": r.get("pubDate"),
         })
 
     return items, raw.get("nextPage")
@@ -169,15 +405,3 @@ def _to_yyyy_mm_dd(s: str) -> str:
 
 def _truncate(text: str, max_len: int) -> str:
     return text if len(text) <= max_len else (text[: max_len - 1].rstrip() + "…")
-
-def _hash(s: str) -> str:
-    return hashlib.sha256(s.encode("utf-8")).hexdigest()
-
-def _dedupe_by_url(items: List[Dict]) -> List[Dict]:
-    seen, out = set(), []
-    for it in items:
-        u = it.get("url")
-        if u and u not in seen:
-            seen.add(u)
-            out.append(it)
-    return out
\ No newline at end of file
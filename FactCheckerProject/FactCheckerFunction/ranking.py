@@ -0,0 +1,121 @@
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Protocol
+
+import numpy as np
+
+from cache import normalize_claim
+from simindex import simhash, BITS
+
+
+# How many candidates retrieval keeps before ranking, and the ranking knobs
+EVIDENCE_CANDIDATES     = int(os.getenv("EVIDENCE_CANDIDATES", "20"))
+RANK_DEDUPE_THRESHOLD   = float(os.getenv("RANK_DEDUPE_THRESHOLD", "0.9"))
+RANK_TRUSTED_BOOST      = float(os.getenv("RANK_TRUSTED_BOOST", "1.2"))
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "is", "are", "was", "were",
+    "be", "by", "at", "as", "it", "its", "this", "that", "with", "from", "has", "have", "had",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(normalize_claim(text)) if t not in _STOPWORDS]
+
+
+def _doc_text(a: Dict) -> str:
+    return f"{a.get('title') or ''} {a.get('snippet') or ''}"
+
+
+class Scorer(Protocol):
+    """Scores every candidate document against the query in one call."""
+
+    def score(self, query: str, docs: List[str]) -> np.ndarray: ...
+
+
+class BM25Scorer:
+    """Okapi BM25 over the candidate set, with IDF taken from the candidates themselves."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, docs: List[str]) -> np.ndarray:
+        terms = sorted(set(tokenize(query)))
+        if not terms or not docs:
+            return np.zeros(len(docs))
+        toks = [tokenize(d) for d in docs]
+        col = {t: i for i, t in enumerate(terms)}
+        tf = np.zeros((len(docs), len(terms)))
+        for row, dt in enumerate(toks):
+            for t, c in Counter(dt).items():
+                j = col.get(t)
+                if j is not None:
+                    tf[row, j] = c
+        dl = np.array([len(t) for t in toks], dtype=float)
+        avgdl = dl.mean() or 1.0
+        df = (tf > 0).sum(axis=0)
+        n = len(docs)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * dl / avgdl)
+        return ((tf * (self.k1 + 1)) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+
+class TfidfScorer:
+    """Cosine similarity between TF-IDF vectors of the query and each candidate."""
+
+    def score(self, query: str, docs: List[str]) -> np.ndarray:
+        qt = tokenize(query)
+        if not qt or not docs:
+            return np.zeros(len(docs))
+        toks = [tokenize(d) for d in docs]
+        vocab = {t: i for i, t in enumerate(sorted(set(qt).union(*toks)))}
+        m = np.zeros((len(docs) + 1, len(vocab)))
+        for row, dt in enumerate([qt] + toks):
+            for t, c in Counter(dt).items():
+                m[row, vocab[t]] = c
+        df = (m[1:] > 0).sum(axis=0)
+        m *= np.log((1 + len(docs)) / (1 + df)) + 1
+        m /= np.linalg.norm(m, axis=1, keepdims=True) + 1e-12
+        return m[1:] @ m[0]
+
+
+DEFAULT_SCORER: Scorer = BM25Scorer()
+
+
+def rank_evidence(
+    query: str,
+    articles: List[Dict],
+    k: int = 4,
+    scorer: Optional[Scorer] = None,
+    collapse_threshold: float = RANK_DEDUPE_THRESHOLD,
+) -> List[Dict]:
+    """
+    Best `k` articles for `query`:
+      1) Score title + snippet of every candidate in one batch.
+      2) Boost trusted sources by RANK_TRUSTED_BOOST.
+      3) Walk in score order, dropping near-duplicates of articles already
+         kept (SimHash similarity >= collapse_threshold), e.g. the same wire
+         story carried by several providers.
+    Ties keep the original (arrival) order.
+    """
+    if not articles:
+        return []
+    scorer = scorer or DEFAULT_SCORER
+    docs = [_doc_text(a) for a in articles]
+    scores = np.asarray(scorer.score(query, docs), dtype=float)
+    scores = scores * np.where([bool(a.get("trusted")) for a in articles], RANK_TRUSTED_BOOST, 1.0)
+    order = np.argsort(-scores, kind="stable")
+
+    sigs = np.array([simhash(d) for d in docs], dtype=np.uint64)
+    max_bits = int((1.0 - collapse_threshold) * BITS)
+    kept: List[int] = []
+    for i in order:
+        if kept and int(np.bitwise_count(sigs[kept] ^ sigs[i]).min()) <= max_bits:
+            continue
+        kept.append(int(i))
+        if len(kept) >= k:
+            break
+    return [articles[i] for i in kept]
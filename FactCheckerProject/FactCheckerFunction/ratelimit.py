@@ -0,0 +1,356 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+import requests
+
+import telemetry
+import deadline
+
+try:
+    import aiohttp  # async HTTP transport, used by the async routes
+except ImportError:
+    aiohttp = None  # type: ignore
+
+
+# Longest a request thread may wait for a token / Retry-After before failing fast
+RATE_LIMIT_MAX_WAIT_SEC = float(os.getenv("RATE_LIMIT_MAX_WAIT_SEC", "2"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SEC = float(os.getenv("BREAKER_RESET_SEC", "30"))
+
+# Per-provider quota: sustained requests per minute and burst size
+PROVIDER_QUOTAS = {
+    "newsdata": (float(os.getenv("NEWSDATA_RATE_PER_MIN", "30")), int(os.getenv("NEWSDATA_BURST", "5"))),
+    "guardian": (float(os.getenv("GUARDIAN_RATE_PER_MIN", "60")), int(os.getenv("GUARDIAN_BURST", "5"))),
+    "newsapi":  (float(os.getenv("NEWSAPI_RATE_PER_MIN", "60")), int(os.getenv("NEWSAPI_BURST", "5"))),
+}
+
+
+class ProviderUnavailable(Exception):
+    """The provider cannot be called right now; callers should fall back."""
+
+
+class CircuitOpenError(ProviderUnavailable):
+    pass
+
+
+class RateLimited(ProviderUnavailable):
+    pass
+
+
+class TokenBucket:
+    """Thread-safe token bucket that can also be paused (for Retry-After)."""
+
+    def __init__(self, rate_per_sec: float, capacity: int):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._stamp = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _wait_time(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def acquire(self, max_wait: float) -> bool:
+        """Take one token, waiting at most `max_wait` seconds for it."""
+        until = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                wait = self._wait_time()
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > until:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, max_wait: float) -> bool:
+        """acquire() for coroutines: waits with asyncio.sleep instead of blocking the loop."""
+        until = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                wait = self._wait_time()
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > until:
+                return False
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures; after `reset_sec` one probe
+    call is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    def __init__(self, threshold: int = BREAKER_FAILURE_THRESHOLD, reset_sec: float = BREAKER_RESET_SEC):
+        self.threshold = threshold
+        self.reset_sec = reset_sec
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if self._probing else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._probing and time.monotonic() - self._opened_at >= self.reset_sec:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                if self._opened_at is None or self._probing:
+                    logging.warning(f"Circuit opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def release(self) -> None:
+        """Hand back a half-open probe that ended without an outcome (deadline, cancellation)."""
+        with self._lock:
+            self._probing = False
+
+
+def _retry_after(r: requests.Response) -> Optional[float]:
+    value = r.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+# Network errors worth retrying on the async path
+_ASYNC_NETWORK_ERRORS = (asyncio.TimeoutError,) + ((aiohttp.ClientError,) if aiohttp else ())
+
+
+class ProviderGuard:
+    """Token bucket + circuit breaker + counters for one outbound provider."""
+
+    def __init__(self, name: str, rate_per_min: float, burst: int):
+        self.name = name
+        self.bucket = TokenBucket(rate_per_min / 60.0, burst)
+        self.breaker = CircuitBreaker()
+        self.counters: Dict[str, int] = {
+            "calls": 0, "retries": 0, "throttled": 0, "rejected": 0, "open_circuit": 0, "failures": 0,
+        }
+        self._lock = threading.Lock()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counters[key] += 1
+
+    def _admit(self, max_wait: float) -> None:
+        max_wait = deadline.budget(max_wait)
+        # Token first: a half-open probe taken by allow() must reach the provider
+        if not self.bucket.acquire(max_wait):
+            self._count("rejected")
+            raise RateLimited(f"{self.name} rate limit: no capacity within {max_wait}s")
+        if not self.breaker.allow():
+            self._count("open_circuit")
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        self._count("calls")
+
+    async def _admit_async(self, max_wait: float) -> None:
+        max_wait = deadline.budget(max_wait)
+        # Token first: a half-open probe taken by allow() must reach the provider
+        if not await self.bucket.acquire_async(max_wait):
+            self._count("rejected")
+            raise RateLimited(f"{self.name} rate limit: no capacity within {max_wait}s")
+        if not self.breaker.allow():
+            self._count("open_circuit")
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        self._count("calls")
+
+    def _check_response(self, r, status: int, attempt: int, backoff: float):
+        """
+        (error, sleep_for) for a retryable response (429 or 5xx), or
+        (None, 0) when `r` is good. Remaining 4xx raise immediately.
+        """
+        if status == 429:
+            self._count("throttled")
+            self.bucket.pause(_retry_after(r) or backoff ** (attempt + 1))
+            return RateLimited(f"{self.name} returned 429"), 0.0
+        if status >= 500:
+            err = requests.HTTPError(f"{self.name} returned {status}", response=r)
+            return err, _retry_after(r) or backoff ** (attempt + 1)
+        self.breaker.record_success()
+        if status >= 400:  # our fault, not retried
+            raise requests.HTTPError(f"{self.name} returned {status}", response=r)
+        return None, 0.0
+
+    def _after_failure(self, attempt: int, max_retries: int, sleep_for: float, max_wait: float) -> bool:
+        """Record a failed attempt; True when it should be retried (and the request deadline leaves room)."""
+        self._count("failures")
+        self.breaker.record_failure()
+        if attempt > max_retries or sleep_for > max_wait:
+            return False
+        if not deadline.allows(sleep_for + deadline.MIN_CALL_SEC):
+            deadline.degrade(f"{self.name}: retry skipped")
+            return False
+        self._count("retries")
+        telemetry.incr("retries")
+        return True
+
+    def call(self, fn: Callable, max_wait: float = RATE_LIMIT_MAX_WAIT_SEC):
+        """One admitted call (e.g. an SDK request); any exception counts as a failure."""
+        self._admit(max_wait)
+        try:
+            out = fn()
+        except deadline.DeadlineExceeded:
+            self.breaker.release()  # the request ran out of time, not the provider
+            raise
+        except Exception:
+            self._count("failures")
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()  # cancelled: no outcome to record
+            raise
+        self.breaker.record_success()
+        return out
+
+    def request(
+        self,
+        send: Callable[[], requests.Response],
+        max_retries: int = 2,
+        backoff: float = 1.5,
+        max_wait: float = RATE_LIMIT_MAX_WAIT_SEC,
+    ) -> requests.Response:
+        """
+        Run `send()` (one HTTP call) under the limiter. 429 pauses the shared
+        bucket for Retry-After; 429, 5xx, timeouts and connection errors are
+        retried; other 4xx are raised immediately. Waits longer than
+        `max_wait` fail fast instead of parking the request thread.
+        """
+        attempt = 0
+        while True:
+            self._admit(max_wait)
+            try:
+                r = send()
+            except deadline.DeadlineExceeded:
+                self.breaker.release()  # the request ran out of time, not the provider
+                raise
+            except (requests.ConnectionError, requests.Timeout) as e:
+                err, sleep_for = e, backoff ** (attempt + 1)
+            except BaseException:
+                self.breaker.release()  # cancelled or unexpected: no outcome to record
+                raise
+            else:
+                err, sleep_for = self._check_response(r, r.status_code, attempt, backoff)
+                if err is None:
+                    return r
+            attempt += 1
+            if not self._after_failure(attempt, max_retries, sleep_for, max_wait):
+                raise err
+            time.sleep(sleep_for)
+
+    async def call_async(self, fn: Callable, max_wait: float = RATE_LIMIT_MAX_WAIT_SEC):
+        """call() for coroutines: `fn()` returns an awaitable."""
+        await self._admit_async(max_wait)
+        try:
+            out = await fn()
+        except deadline.DeadlineExceeded:
+            self.breaker.release()  # the request ran out of time, not the provider
+            raise
+        except Exception:
+            self._count("failures")
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()  # cancelled: no outcome to record
+            raise
+        self.breaker.record_success()
+        return out
+
+    async def request_async(
+        self,
+        send: Callable,
+        max_retries: int = 2,
+        backoff: float = 1.5,
+        max_wait: float = RATE_LIMIT_MAX_WAIT_SEC,
+    ):
+        """
+        request() for coroutines: `send()` returns an awaitable aiohttp
+        response (body already read). Same retry and failure rules; 4xx
+        raise requests.HTTPError so callers handle both paths alike.
+        """
+        attempt = 0
+        while True:
+            await self._admit_async(max_wait)
+            try:
+                r = await send()
+            except deadline.DeadlineExceeded:
+                self.breaker.release()  # the request ran out of time, not the provider
+                raise
+            except _ASYNC_NETWORK_ERRORS as e:
+                err, sleep_for = e, backoff ** (attempt + 1)
+            except BaseException:
+                self.breaker.release()  # cancelled or unexpected: no outcome to record
+                raise
+            else:
+                err, sleep_for = self._check_response(r, r.status, attempt, backoff)
+                if err is None:
+                    return r
+            attempt += 1
+            if not self._after_failure(attempt, max_retries, sleep_for, max_wait):
+                raise err
+            await asyncio.sleep(sleep_for)
+
+    def stats(self) -> Dict:
+        return dict(self.counters, circuit=self.breaker.state)
+
+
+_guards: Dict[str, ProviderGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(name: str) -> ProviderGuard:
+    guard = _guards.get(name)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(name)
+            if guard is None:
+                rate, burst = PROVIDER_QUOTAS.get(name, (60.0, 5))
+                guard = _guards[name] = ProviderGuard(name, rate, burst)
+    return guard
+
+
+def all_stats() -> Dict[str, Dict]:
+    return {name: g.stats() for name, g in _guards.items()}
@@ -0,0 +1,178 @@
+import os
+import logging
+import hashlib
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from cache import normalize_claim, get_verdict_cache
+
+
+SIMINDEX_ENABLED   = os.getenv("SIMINDEX_ENABLED", "true").lower() != "false"
+SIMINDEX_THRESHOLD = float(os.getenv("SIMINDEX_THRESHOLD", "0.9"))
+SIMINDEX_MAX_ITEMS = int(os.getenv("SIMINDEX_MAX_ITEMS", "3000000"))
+
+SHINGLE_SIZE = 4
+BITS = 64
+# 4 x 16-bit bands: any pair within 3 bits is guaranteed to share a band. The default
+# threshold accepts up to 6 differing bits, so pairs 4-6 bits apart are found only when
+# they happen to share a band anyway. That is a recall gap (a missed cache hit), not a
+# wrong match; 7+ narrower bands would close it at the cost of much larger buckets.
+BANDS = 4
+BAND_BITS = BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+_SHIFTS = np.arange(BITS, dtype=np.uint64)
+
+
+# Tokens that flip a claim's meaning; "n't" is split by normalize_claim into "...n t"
+_NEGATIONS = frozenset("not no never none nobody nothing nor neither without cannot".split())
+
+
+def shingles(text: str, n: int = SHINGLE_SIZE) -> List[str]:
+    """
+    Words, word bigrams and character n-grams of the normalized claim, in
+    their original order, so a reordered sentence ("A beat B" / "B beat A")
+    gets different shingles.
+    """
+    words = normalize_claim(text).split()
+    pairs = [f"{a} {b}" for a, b in zip(words, words[1:])]
+    joined = " ".join(words)
+    grams = [joined[i:i + n] for i in range(max(1, len(joined) - n + 1))]
+    return words + pairs + grams
+
+
+def _numbers(words: List[str]) -> List[str]:
+    return sorted(w for w in words if any(c.isdigit() for c in w))
+
+
+def _negations(words: List[str]) -> int:
+    return sum(1 for i, w in enumerate(words)
+               if w in _NEGATIONS or (w == "t" and i and words[i - 1].endswith("n")))
+
+
+def claims_agree(a: str, b: str) -> bool:
+    """
+    Guard for a SimHash match: near-identical signatures can still make
+    different claims. Requires the same numbers, the same number of
+    negations, and the words the claims share to appear in the same order.
+    """
+    wa, wb = normalize_claim(a).split(), normalize_claim(b).split()
+    if _numbers(wa) != _numbers(wb) or _negations(wa) != _negations(wb):
+        return False
+    shared = set(wa) & set(wb)
+    return list(dict.fromkeys(w for w in wa if w in shared)) == list(dict.fromkeys(w for w in wb if w in shared))
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over the claim's shingles."""
+    toks = shingles(text)
+    if not toks:
+        return 0
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(), "little") for t in toks),
+        dtype=np.uint64, count=len(toks))
+    ones = ((hashes[:, None] >> _SHIFTS) & np.uint64(1)).sum(axis=0)
+    bits = (ones * 2 > len(toks)).astype(np.uint64)
+    return int((bits << _SHIFTS).sum())
+
+
+def similarity(a: int, b: int) -> float:
+    return 1.0 - (a ^ b).bit_count() / BITS
+
+
+class SimHashIndex:
+    """
+    In-memory near-duplicate index over 64-bit SimHash signatures.
+
+    Each entry costs 8 bytes of signature, 4 bytes of scope id and 4 bytes
+    per band in the LSH buckets, so a few million claims fit in well under
+    100 MB. Candidates are the entries sharing at least one 16-bit band with
+    the query; they are then ranked by exact Hamming distance with NumPy.
+    """
+
+    def __init__(self, max_items: int = SIMINDEX_MAX_ITEMS):
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        self._sigs = array("Q")
+        self._scopes = array("I")
+        self._scope_ids: Dict[str, int] = {}
+        self._buckets: List[Dict[int, array]] = [{} for _ in range(BANDS)]
+
+    def __len__(self) -> int:
+        return len(self._sigs)
+
+    def add(self, sig: int, scope: str) -> None:
+        with self._lock:
+            if len(self._sigs) >= self.max_items:
+                logging.info(f"SimHashIndex reached {self.max_items} entries; starting a new generation.")
+                self.clear()
+            idx = len(self._sigs)
+            self._sigs.append(sig)
+            self._scopes.append(self._scope_ids.setdefault(scope, len(self._scope_ids)))
+            for b in range(BANDS):
+                band = (sig >> (b * BAND_BITS)) & BAND_MASK
+                self._buckets[b].setdefault(band, array("I")).append(idx)
+
+    def query(self, sig: int, scope: str, threshold: float = SIMINDEX_THRESHOLD) -> Optional[Tuple[int, float]]:
+        """Closest stored signature in `scope` with similarity >= threshold, as (sig, similarity)."""
+        with self._lock:
+            scope_id = self._scope_ids.get(scope)
+            if scope_id is None:
+                return None
+            ids = set()
+            for b in range(BANDS):
+                bucket = self._buckets[b].get((sig >> (b * BAND_BITS)) & BAND_MASK)
+                if bucket:
+                    ids.update(bucket)
+            if not ids:
+                return None
+            cand = np.fromiter(ids, dtype=np.int64, count=len(ids))
+            cand = cand[np.frombuffer(self._scopes, dtype=np.uint32)[cand] == scope_id]
+            if not len(cand):
+                return None
+            sigs = np.frombuffer(self._sigs, dtype=np.uint64)[cand]
+            dist = np.bitwise_count(sigs ^ np.uint64(sig))
+            best = int(dist.argmin())
+            match = int(sigs[best])
+        score = 1.0 - int(dist[best]) / BITS
+        return (match, score) if score >= threshold else None
+
+
+_index: Optional[SimHashIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_claim_index() -> SimHashIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = SimHashIndex()
+                _warm_from_disk(index)
+                _index = index
+    return _index
+
+
+def _warm_from_disk(index: SimHashIndex) -> None:
+    """Re-index near-duplicate entries other workers left in the shared SQLite tier."""
+    disk = get_verdict_cache().disk
+    if disk is None:
+        return
+    try:
+        for key in disk.keys("near|"):
+            _, scope_and_sig = key.split("|", 1)
+            scope, sig_hex = scope_and_sig.rsplit("|", 1)
+            index.add(int(sig_hex, 16), scope)
+    except Exception as e:
+        logging.warning(f"SimHashIndex warm-up failed: {e}")
+
+
+def near_key(scope: str, sig: int) -> str:
+    """Verdict-cache key under which a near-duplicate match is stored."""
+    return f"near|{scope}|{sig:016x}"
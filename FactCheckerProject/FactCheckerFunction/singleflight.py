@@ -0,0 +1,146 @@
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+import telemetry
+import deadline
+
+
+SINGLEFLIGHT_ENABLED  = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() != "false"
+# How long a duplicate waits for the leader before running the pipeline itself
+SINGLEFLIGHT_WAIT_SEC = float(os.getenv("SINGLEFLIGHT_WAIT_SEC", "30"))
+
+
+class LeaderCancelled(Exception):
+    """The leading call was cancelled (e.g. its client went away); waiters run on their own."""
+
+
+class SingleFlight:
+    """
+    In-process request coalescing: while a call for `key` is running,
+    identical calls wait for its result instead of repeating the work.
+
+    Flights are concurrent.futures.Future objects, so sync callers (batch,
+    job and stream threads) and async callers (the HTTP routes) coalesce
+    with each other. The leader's exception is raised in every waiter. A
+    waiter that has not heard back within `wait` seconds (or what is left
+    of its own request deadline), or whose leader was cancelled, runs the
+    call itself.
+    """
+
+    def __init__(self, wait: float = SINGLEFLIGHT_WAIT_SEC):
+        self.wait = wait
+        self._flights: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "leaders": 0, "coalesced": 0, "timeouts": 0, "shared_errors": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counters[key] += 1
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            self.counters["calls"] += 1
+            fut = self._flights.get(key)
+            if fut is not None:
+                return fut, False
+            fut = self._flights[key] = Future()
+            self.counters["leaders"] += 1
+            return fut, True
+
+    def _land(self, key: str, fut: Future) -> None:
+        with self._lock:
+            if self._flights.get(key) is fut:
+                del self._flights[key]
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run `fn` once per concurrent `key`; returns (result, shared) where shared means another call ran it."""
+        fut, leader = self._join(key)
+        if leader:
+            try:
+                result = fn()
+            except BaseException as e:
+                fut.set_exception(e)
+                raise
+            else:
+                fut.set_result(result)
+                return result, False
+            finally:
+                self._land(key, fut)
+
+        with telemetry.stage("coalesced_wait") as st:
+            try:
+                return self._shared(fut.result(timeout=deadline.budget(self.wait)))
+            except (FutureTimeout, LeaderCancelled) as e:
+                st["fallback"] = self._fallback(e)
+            except Exception:
+                self._count("shared_errors")
+                raise
+        return fn(), False
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """do() for a coroutine function; waiting never blocks the event loop."""
+        fut, leader = self._join(key)
+        if leader:
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                fut.set_exception(LeaderCancelled(key))
+                raise
+            except BaseException as e:
+                fut.set_exception(e)
+                raise
+            else:
+                fut.set_result(result)
+                return result, False
+            finally:
+                self._land(key, fut)
+
+        with telemetry.stage("coalesced_wait") as st:
+            try:
+                waiter = asyncio.wrap_future(fut)
+                waiter.add_done_callback(_retrieve)  # nobody may be left awaiting it after a timeout
+                return self._shared(await asyncio.wait_for(asyncio.shield(waiter), deadline.budget(self.wait)))
+            except (asyncio.TimeoutError, LeaderCancelled) as e:
+                st["fallback"] = self._fallback(e)
+            except Exception:
+                self._count("shared_errors")
+                raise
+        return await fn(), False
+
+    def _shared(self, result):
+        self._count("coalesced")
+        return result, True
+
+    def _fallback(self, reason) -> str:
+        name = "cancelled" if isinstance(reason, LeaderCancelled) else "timeout"
+        if name == "timeout":
+            self._count("timeouts")
+        logging.warning(f"single-flight waiter running on its own: leader {name}")
+        return name
+
+    def stats(self) -> Dict:
+        with self._lock:
+            out = dict(self.counters)
+            out["in_flight"] = len(self._flights)
+        out["coalescing_ratio"] = round(out["coalesced"] / out["calls"], 3) if out["calls"] else None
+        return out
+
+
+def _retrieve(f: asyncio.Future) -> None:
+    if not f.cancelled():
+        f.exception()
+
+
+_flights = SingleFlight()
+
+
+def get_flights() -> SingleFlight:
+    return _flights
+
+
+def flight_stats() -> Dict:
+    return _flights.stats()
@@ -1,7 +1,25 @@
-import os, re, requests
+import os, re, time, asyncio, logging, requests, contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from clients import get_http_session, http_get
+from cache import get_retrieval_cache, retrieval_key
+from ranking import rank_evidence
+from ratelimit import get_guard, ProviderUnavailable
+import telemetry
+import evidenceindex
+import deadline
 
 GUARDIAN_KEY = os.getenv("GUARDIAN_API_KEY")
 NEWS_KEY = os.getenv("NEWSAPI_KEY")
+GUARDIAN_BASE_URL = os.getenv("GUARDIAN_BASE_URL", "https://content.guardianapis.com/search")
+NEWSAPI_BASE_URL  = os.getenv("NEWSAPI_BASE_URL", "https://newsapi.org/v2")
+
+# Per-provider deadlines and the overall retrieval budget (seconds)
+GUARDIAN_TIMEOUT_SEC = float(os.getenv("GUARDIAN_TIMEOUT_SEC", "12"))
+NEWSAPI_TIMEOUT_SEC  = float(os.getenv("NEWSAPI_TIMEOUT_SEC", "12"))
+SEARCH_BUDGET_SEC    = float(os.getenv("SEARCH_BUDGET_SEC", "12"))
+SEARCH_MAX_WORKERS   = int(os.getenv("SEARCH_MAX_WORKERS", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="search")
 
 TRUSTED = {"indiatimes.com"}
 
@@ -9,43 +27,44 @@ def _domain(u): return re.sub(r"^https?://(www\.)?","",u or "").split("/")[0].lo
 def _trusted(u): 
     d=_domain(u); return any(d.endswith(t) or t.endswith(d) for t in TRUSTED)
 
-def fetch_guardian(q, frm=None, to=None, page_size=10):
-    if not GUARDIAN_KEY: return []
-    url = "https://content.guardianapis.com/search"
+def _guardian_params(q, frm, to, page_size):
     params = {"q": q, "api-key": GUARDIAN_KEY, "page-size": page_size,
               "order-by": "relevance", "show-fields":"headline,trailText,short-url"}
     if frm: params["from-date"]=frm
     if to:  params["to-date"]=to
-    r = requests.get(url, params=params, timeout=12); r.raise_for_status()
+    return params
+
+def _guardian_articles(payload):
     out=[]
-    for it in r.json().get("response", {}).get("results", []):
+    for it in payload.get("response", {}).get("results", []):
         u = it.get("webUrl")
         out.append({"title":it.get("webTitle","").strip(),"url":u,"source":"The Guardian",
                     "snippet":(it.get("fields",{}) or {}).get("trailText",""),
                     "publishedAt":it.get("webPublicationDate"),"trusted":_trusted(u)})
     return out
 
-def fetch_newsapi(q, frm=None, to=None, page_size=20, language="en"):
-    if not NEWS_KEY: return []
-    base="https://newsapi.org/v2/everything"
+def fetch_guardian(q, frm=None, to=None, page_size=10, timeout=GUARDIAN_TIMEOUT_SEC):
+    if not GUARDIAN_KEY: return []
+    url = GUARDIAN_BASE_URL
+    params = _guardian_params(q, frm, to, page_size)
+    cache = get_retrieval_cache("guardian"); key = retrieval_key(params)
+    hit = cache.get(key)
+    if hit is not None: return list(hit)
+    r = get_guard("guardian").request(lambda: get_http_session().get(url, params=params, timeout=timeout), max_retries=1)
+    out = _guardian_articles(r.json())
+    cache.set(key, out)
+    evidenceindex.ingest(out, "guardian")
+    return list(out)
+
+def _newsapi_params(q, frm, to, page_size, language):
     params={"q":q,"apiKey":NEWS_KEY,"pageSize":page_size,"language":language,"sortBy":"relevancy"}
     if frm: params["from"]=frm
     if to:  params["to"]=to
-    r = requests.get(base, params=params, timeout=12)
+    return params
+
+def _newsapi_articles(payload):
     out=[]
-    if r.status_code==200:
-        for a in r.json().get("articles", []):
-            u=a.get("url")
-            out.append({"title":a.get("title","").strip(),"url":u,
-                        "source":(a.get("source") or {}).get("name",""),
-                        "snippet":a.get("description",""),
-                        "publishedAt":a.get("publishedAt"),"trusted":_trusted(u)})
-        return out
-    # fallback to top-headlines if everything is restricted
-    base="https://newsapi.org/v2/top-headlines"
-    params={"q":q,"apiKey":NEWS_KEY,"pageSize":page_size,"language":language}
-    r=requests.get(base, params=params, timeout=12); r.raise_for_status()
-    for a in r.json().get("articles", []):
+    for a in payload.get("articles", []):
         u=a.get("url")
         out.append({"title":a.get("title","").strip(),"url":u,
                     "source":(a.get("source") or {}).get("name",""),
@@ -53,12 +72,207 @@ def fetch_newsapi(q, frm=None, to=None, page_size=20, language="en"):
                     "publishedAt":a.get("publishedAt"),"trusted":_trusted(u)})
     return out
 
-def search_all(q, frm=None, to=None, limit=12):
+def fetch_newsapi(q, frm=None, to=None, page_size=20, language="en", timeout=NEWSAPI_TIMEOUT_SEC):
+    if not NEWS_KEY: return []
+    until = time.monotonic() + timeout
+    base=f"{NEWSAPI_BASE_URL}/everything"
+    params=_newsapi_params(q, frm, to, page_size, language)
+    cache = get_retrieval_cache("newsapi"); key = retrieval_key(params)
+    hit = cache.get(key)
+    if hit is not None: return list(hit)
+    guard = get_guard("newsapi")
+    try:
+        r = guard.request(lambda: get_http_session().get(base, params=params, timeout=timeout), max_retries=0)
+    except requests.HTTPError:
+        r = None
+    if r is not None and r.status_code==200:
+        out = _newsapi_articles(r.json())
+        cache.set(key, out)
+        evidenceindex.ingest(out, "newsapi")
+        return list(out)
+    # fallback to top-headlines if everything is restricted, within what is left of the deadline
+    remaining = until - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("NewsAPI deadline exhausted before top-headlines fallback")
+    base=f"{NEWSAPI_BASE_URL}/top-headlines"
+    params={"q":q,"apiKey":NEWS_KEY,"pageSize":page_size,"language":language}
+    r=guard.request(lambda: get_http_session().get(base, params=params, timeout=remaining), max_retries=0)
+    out = _newsapi_articles(r.json())
+    cache.set(key, out)
+    evidenceindex.ingest(out, "newsapi")
+    return list(out)
+
+async def fetch_guardian_async(q, frm=None, to=None, page_size=10, timeout=GUARDIAN_TIMEOUT_SEC):
+    """fetch_guardian on the shared aiohttp session."""
+    if not GUARDIAN_KEY: return []
+    params = _guardian_params(q, frm, to, page_size)
+    cache = get_retrieval_cache("guardian"); key = retrieval_key(params)
+    hit = cache.get(key)
+    if hit is not None: return list(hit)
+    r = await get_guard("guardian").request_async(lambda: http_get(GUARDIAN_BASE_URL, params=params, timeout=timeout), max_retries=1)
+    out = _guardian_articles(await r.json(content_type=None))
+    cache.set(key, out)
+    evidenceindex.ingest(out, "guardian")
+    return list(out)
+
+async def fetch_newsapi_async(q, frm=None, to=None, page_size=20, language="en", timeout=NEWSAPI_TIMEOUT_SEC):
+    """fetch_newsapi on the shared aiohttp session, same top-headlines fallback."""
+    if not NEWS_KEY: return []
+    until = time.monotonic() + timeout
+    params=_newsapi_params(q, frm, to, page_size, language)
+    cache = get_retrieval_cache("newsapi"); key = retrieval_key(params)
+    hit = cache.get(key)
+    if hit is not None: return list(hit)
+    guard = get_guard("newsapi")
+    try:
+        r = await guard.request_async(lambda: http_get(f"{NEWSAPI_BASE_URL}/everything", params=params, timeout=timeout), max_retries=0)
+    except requests.HTTPError:
+        r = None
+    if r is None:
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("NewsAPI deadline exhausted before top-headlines fallback")
+        fallback={"q":q,"apiKey":NEWS_KEY,"pageSize":page_size,"language":language}
+        r = await guard.request_async(lambda: http_get(f"{NEWSAPI_BASE_URL}/top-headlines", params=fallback, timeout=remaining), max_retries=0)
+    out = _newsapi_articles(await r.json(content_type=None))
+    cache.set(key, out)
+    evidenceindex.ingest(out, "newsapi")
+    return list(out)
+
+class SearchResults(list):
+    """Merged articles, plus the providers that missed the deadline or failed."""
+    def __init__(self, items=(), timed_out=(), failed=()):
+        super().__init__(items)
+        self.timed_out = list(timed_out)
+        self.failed = list(failed)
+
+def _providers(q, frm, to, limit):
+    out = []
+    if GUARDIAN_KEY:
+        out.append(("guardian", fetch_guardian, (q, frm, to, min(10,limit)), GUARDIAN_TIMEOUT_SEC))
+    if NEWS_KEY:
+        out.append(("newsapi", fetch_newsapi, (q, frm, to, min(20,limit*2)), NEWSAPI_TIMEOUT_SEC))
+    return out
+
+_ASYNC_FETCHERS = {"guardian": fetch_guardian_async, "newsapi": fetch_newsapi_async}
+
+def _timed_fetch(name, fn, *args, **kwargs):
+    with telemetry.stage(f"search.{name}") as st:
+        out = fn(*args, **kwargs)
+        st["citations"] = len(out)
+    return out
+
+def search_all(q, frm=None, to=None, limit=12, budget=SEARCH_BUDGET_SEC):
+    """
+    Query the local evidence index, then (unless it already had enough)
+    every configured provider concurrently. Each provider gets its own
+    deadline (capped by `budget`, itself capped by the request deadline);
+    whatever has arrived when the budget runs out is merged with the index
+    hits and returned, with the stragglers listed in `.timed_out`.
+    """
+    requested, budget = budget, deadline.budget(budget, reserve=deadline.classify_reserve())
+    with telemetry.stage("search_all", budget_sec=budget) as st:
+        local = evidenceindex.lookup(q, frm, to)
+        if evidenceindex.sufficient(local) or not _providers_fit(budget):
+            out = SearchResults(rank_evidence(q, local, k=limit))
+        else:
+            out = _search_all(q, frm, to, limit, budget, local)
+            _note_partial(out, budget < requested)
+        st["local"] = len(local)
+        st["citations"] = len(out)
+        st["timed_out"] = ",".join(out.timed_out)
+        st["failed"] = ",".join(out.failed)
+    return out
+
+def _providers_fit(budget):
+    """False (and the request marked degraded) when the deadline leaves no time to query providers."""
+    if budget >= deadline.MIN_CALL_SEC:
+        return True
+    deadline.degrade("search: providers skipped")
+    return False
+
+def _note_partial(out, cut):
+    """Mark the request degraded when providers timed out or failed, so its verdict is not cached."""
+    if out.timed_out:
+        deadline.degrade("search: providers cut off at the deadline" if cut
+                         else f"search: {', '.join(out.timed_out)} timed out")
+    if out.failed:
+        deadline.degrade(f"search: {', '.join(out.failed)} failed")
+
+def _search_all(q, frm, to, limit, budget, local=()):
+    futures = {}
+    for name, fn, args, timeout in _providers(q, frm, to, limit):
+        ctx = contextvars.copy_context()
+        futures[_executor.submit(ctx.run, _timed_fetch, name, fn, *args, timeout=min(timeout, budget))] = name
+
+    done, pending = wait(futures, timeout=budget)
+    timed_out = [futures[f] for f in pending]
+    for f in pending:
+        f.cancel()
+
+    return _merge(q, limit, list(futures.values()), {futures[f]: f for f in done}, timed_out, local)
+
+def _merge(q, limit, names, done, timed_out, local=()):
+    """Collect finished provider futures/tasks (by name), add the index hits, dedupe by URL and rank."""
+    merged, failed = _gather(names, done, timed_out, local)
+    return SearchResults(rank_evidence(q, merged, k=limit), timed_out=timed_out, failed=failed)
+
+def _gather(names, done, timed_out, local=()):
+    """_merge without the ranking: (articles deduped by URL, failed provider names)."""
+    failed = []
+    results = {}
+    for name, f in done.items():
+        try:
+            results[name] = f.result()
+        except (TimeoutError, asyncio.TimeoutError, requests.Timeout):
+            timed_out.append(name)
+        except ProviderUnavailable as e:
+            logging.warning(f"{name} skipped: {e}")
+            failed.append(name)
+        except Exception as e:
+            logging.warning(f"{name} search failed: {e}")
+            failed.append(name)
+    if timed_out:
+        logging.warning(f"search_all: providers timed out: {timed_out}")
+
     seen=set(); merged=[]
-    #for a in (fetch_guardian(q, frm, to, min(10,limit)) + fetch_newsapi(q, frm, to, min(20,limit*2))):
-    for a in (fetch_guardian(q, frm, to, min(10,limit))):
-        u=a.get("url"); 
+    for a in [a for name in names for a in results.get(name, [])] + list(local):
+        u=a.get("url")
         if not u or u in seen: continue
         seen.add(u); merged.append(a)
-    merged.sort(key=lambda x: (not x["trusted"], (x["publishedAt"] or "")))
-    return merged[:limit]
\ No newline at end of file
+    return merged, failed
+
+async def _timed_fetch_async(name, fn, *args, **kwargs):
+    with telemetry.stage(f"search.{name}") as st:
+        out = await fn(*args, **kwargs)
+        st["citations"] = len(out)
+    return out
+
+async def search_all_async(q, frm=None, to=None, limit=12, budget=SEARCH_BUDGET_SEC):
+    """
+    search_all on asyncio tasks: stragglers are cancelled at the budget
+    instead of left running. Index reads and ranking run in a worker thread.
+    """
+    requested, budget = budget, deadline.budget(budget, reserve=deadline.classify_reserve())
+    with telemetry.stage("search_all", budget_sec=budget) as st:
+        local = await asyncio.to_thread(evidenceindex.lookup, q, frm, to)
+        st["local"] = len(local)
+        if evidenceindex.sufficient(local) or not _providers_fit(budget):
+            out = SearchResults(await asyncio.to_thread(rank_evidence, q, local, k=limit))
+            st["citations"] = len(out)
+            return out
+        tasks = {}
+        for name, _, args, timeout in _providers(q, frm, to, limit):
+            fn = _ASYNC_FETCHERS[name]
+            tasks[asyncio.ensure_future(_timed_fetch_async(name, fn, *args, timeout=min(timeout, budget)))] = name
+        done, pending = await asyncio.wait(tasks, timeout=budget) if tasks else (set(), set())
+        for t in pending:
+            t.cancel()
+        timed_out = [tasks[t] for t in pending]
+        merged, failed = _gather(list(tasks.values()), {tasks[t]: t for t in done}, timed_out, local)
+        out = SearchResults(await asyncio.to_thread(rank_evidence, q, merged, k=limit), timed_out=timed_out, failed=failed)
+        _note_partial(out, budget < requested)
+        st["citations"] = len(out)
+        st["timed_out"] = ",".join(out.timed_out)
+        st["failed"] = ",".join(out.failed)
+    return out
\ No newline at end of file
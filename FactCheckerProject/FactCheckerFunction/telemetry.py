@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import random
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+try:
+    from opentelemetry import trace, metrics  # optional
+except ImportError:
+    trace = metrics = None  # type: ignore
+
+
+SERVER_TIMING_ENABLED   = os.getenv("SERVER_TIMING_ENABLED", "true").lower() != "false"
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+LOG_PAYLOAD_MAX_CHARS   = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "500"))
+
+_tracer = trace.get_tracer("factchecker") if trace else None
+_meter = metrics.get_meter("factchecker") if metrics else None
+_stage_ms = _meter.create_histogram("factcheck.stage.duration", unit="ms") if _meter else None
+_tokens = _meter.create_counter("factcheck.llm.tokens", unit="{token}") if _meter else None
+_retries = _meter.create_counter("factcheck.provider.retries") if _meter else None
+_citations = _meter.create_histogram("factcheck.citations") if _meter else None
+
+# Stages finished during the current request, and the stage currently open
+_request_stages: contextvars.ContextVar[Optional[List[Dict]]] = contextvars.ContextVar("request_stages", default=None)
+_current_stage: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("current_stage", default=None)
+
+
+def setup() -> None:
+    """Export through Azure Monitor when a connection string and the distro are present."""
+    if not os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING"):
+        return
+    try:
+        from azure.monitor.opentelemetry import configure_azure_monitor
+    except ImportError:
+        logging.info("azure-monitor-opentelemetry not installed; spans stay local.")
+        return
+    configure_azure_monitor()
+
+
+@contextmanager
+def request_timings():
+    """Collect every stage finished inside the block (including worker threads started with copy_context)."""
+    stages: List[Dict] = []
+    token = _request_stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _request_stages.reset(token)
+
+
+@contextmanager
+def stage(name: str, **attrs):
+    """
+    Time one pipeline stage as an OpenTelemetry span plus a duration metric.
+    The yielded dict takes extra attributes (citations, prompt_tokens, ...).
+    """
+    rec = {"name": name, **attrs}
+    span_cm = _tracer.start_as_current_span(name) if _tracer else None
+    span = span_cm.__enter__() if span_cm else None
+    token = _current_stage.set(rec)
+    t0 = time.perf_counter()
+    try:
+        yield rec
+    except Exception as e:
+        rec["error"] = type(e).__name__
+        raise
+    finally:
+        rec["dur_ms"] = (time.perf_counter() - t0) * 1000.0
+        _current_stage.reset(token)
+        if span is not None:
+            for k, v in rec.items():
+                if isinstance(v, (str, bool, int, float)):
+                    span.set_attribute(f"factcheck.{k}", v)
+            span_cm.__exit__(None, None, None)
+        if _stage_ms is not None:
+            _stage_ms.record(rec["dur_ms"], {"stage": name})
+        if _citations is not None and "citations" in rec:
+            _citations.record(rec["citations"], {"stage": name})
+        if _tokens is not None:
+            for kind in ("prompt_tokens", "completion_tokens"):
+                if rec.get(kind):
+                    _tokens.add(rec[kind], {"kind": kind, "stage": name})
+        stages = _request_stages.get()
+        if stages is not None:
+            stages.append(rec)
+
+
+def incr(key: str, n: int = 1) -> None:
+    """Add to a counter attribute (e.g. retries) of the stage currently open."""
+    rec = _current_stage.get()
+    if rec is not None:
+        rec[key] = rec.get(key, 0) + n
+    if key == "retries" and _retries is not None:
+        _retries.add(n, {"stage": rec["name"] if rec else ""})
+
+
+def server_timing(stages: List[Dict]) -> str:
+    """Server-Timing header value, one metric per stage (repeated stages are summed)."""
+    totals: Dict[str, float] = {}
+    for rec in stages:
+        key = rec["name"].replace(".", "_")
+        totals[key] = totals.get(key, 0.0) + rec["dur_ms"]
+    return ", ".join(f"{k};dur={v:.1f}" for k, v in totals.items())
+
+
+def log_payload(label: str, payload) -> None:
+    """Sampled, size-capped debug logging for SDK objects, bodies and article lists."""
+    if not logging.getLogger().isEnabledFor(logging.DEBUG) and random.random() >= LOG_PAYLOAD_SAMPLE_RATE:
+        return
+    try:
+        text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    except (TypeError, ValueError):
+        text = str(payload)
+    if len(text) > LOG_PAYLOAD_MAX_CHARS:
+        text = text[:LOG_PAYLOAD_MAX_CHARS] + f"… ({len(text)} chars)"
+    logging.info(f"{label}: {text}")
@@ -0,0 +1,174 @@
+"""
+Import-time and cold-start measurement for the fact-check function app.
+
+Every sample is a fresh interpreter, so nothing is shared between runs:
+
+  import      `python -X importtime -c "import function_app"`: wall time of
+              the import and the slowest modules it pulls in.
+  <route>     start the local stand-ins from fakes.py (near-zero latency),
+              import function_app, then time the first and second request to
+              the route. The gap between them is the cold-start cost of that
+              route's lazy imports and client construction. With --warm-up,
+              the app's WarmUp trigger runs (and is timed) before the first
+              request.
+
+    python cold_start.py --runs 5 --routes bing newsdata --out cold.json
+
+Compare the JSON output between commits to catch import-time regressions.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "FactCheckerFunction"))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ROUTES = {"bing": "function_app1", "newsdata": "function_app2", "unified": "function_app_unified"}
+
+# Stand-ins answer immediately so the numbers are import + init cost only
+FAST_FAKES = {
+    family: {"latency_ms": 0, "sigma": 0.0}
+    for family in ("newsdata", "guardian", "newsapi", "openai", "agents")
+}
+FAST_FAKES["agents"]["run_ms"] = 0
+FAST_FAKES["agents"]["run_sigma"] = 0.0
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _summary(values):
+    values = sorted(values)
+    return {
+        "min": round(values[0], 1),
+        "median": round(statistics.median(values), 1),
+        "max": round(values[-1], 1),
+    }
+
+
+def _import_sample():
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import function_app"],
+                          cwd=APP_DIR, capture_output=True, text=True, check=True)
+    wall_ms = (time.perf_counter() - t0) * 1000.0
+    modules = {}
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m:
+            depth = len(m.group(3)) // 2
+            modules[m.group(4)] = (int(m.group(2)) / 1000.0, depth)
+    return wall_ms, modules
+
+
+def measure_imports(runs, top):
+    walls, totals, per_module = [], [], {}
+    for _ in range(runs):
+        wall, modules = _import_sample()
+        walls.append(wall)
+        totals.append(modules.get("function_app", (0.0, 0))[0])
+        for name, (cum_ms, depth) in modules.items():
+            if depth == 1:  # direct imports of function_app
+                per_module.setdefault(name, []).append(cum_ms)
+    slowest = sorted(per_module.items(), key=lambda kv: -statistics.median(kv[1]))[:top]
+    return {
+        "process_wall_ms": _summary(walls),
+        "function_app_import_ms": _summary(totals),
+        "slowest_direct_imports_ms": {name: round(statistics.median(v), 1) for name, v in slowest},
+    }
+
+
+def _child(route, warm_up):
+    """Runs in a fresh interpreter; prints one JSON line."""
+    sys.path.insert(0, BENCH_DIR)
+    from fakes import FakeServers
+
+    with FakeServers(FAST_FAKES) as fakes:
+        os.environ.update(fakes.env())
+        os.environ.update({"VERDICT_CACHE_ENABLED": "false", "SIMINDEX_ENABLED": "false",
+                           "NEWSDATA_CACHE_TTL_SEC": "0", "EVIDENCE_INDEX_ENABLED": "false",
+                           "WARMUP_ENABLED": "true" if warm_up else "false", "WARMUP_ROUTES": route})
+        sys.path.insert(0, APP_DIR)
+
+        from run_bench import _install_project_client, run_route
+
+        out = {}
+        t0 = time.perf_counter()
+        import azure.functions as func
+        import function_app
+        out["import_ms"] = (time.perf_counter() - t0) * 1000.0
+
+        def request():
+            req = func.HttpRequest("POST", "/api/cold", body=json.dumps({"query": "moon cheese nasa"}).encode())
+            t = time.perf_counter()
+            resp = run_route(getattr(function_app, ROUTES[route]), req)
+            if resp.status_code != 200:
+                raise RuntimeError(f"HTTP {resp.status_code}: {resp.get_body()[:200]!r}")
+            return (time.perf_counter() - t) * 1000.0
+
+        # Same static-auth project client run_bench.py uses; building it (and
+        # importing the agents SDK) is part of the route's cold cost.
+        t0 = time.perf_counter()
+        if route in ("bing", "unified"):
+            _install_project_client(fakes.env())
+        if warm_up:
+            run_route(function_app.warm_up, None)
+        setup_ms = (time.perf_counter() - t0) * 1000.0
+
+        first = request()
+        out["warm_up_ms"] = setup_ms if warm_up else None
+        out["first_request_ms"] = first if warm_up else setup_ms + first
+        out["second_request_ms"] = request()
+        import clients
+        run_route(lambda _: clients.close_async(), None)
+    print(json.dumps(out))
+
+
+def measure_route(route, runs, warm_up):
+    samples = []
+    for _ in range(runs):
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", route]
+        if warm_up:
+            cmd.append("--warm-up")
+        proc = subprocess.run(cmd, cwd=BENCH_DIR, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{route} child failed:\n{proc.stderr[-2000:]}")
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    keys = ["import_ms", "first_request_ms", "second_request_ms"] + (["warm_up_ms"] if warm_up else [])
+    return {k: _summary([s[k] for s in samples]) for k in keys}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    p.add_argument("--routes", nargs="*", default=["bing", "newsdata"], choices=sorted(ROUTES))
+    p.add_argument("--top", type=int, default=10, help="slowest direct imports to report")
+    p.add_argument("--warm-up", action="store_true", help="run the WarmUp trigger before the first request")
+    p.add_argument("--out", help="write the JSON report here as well as stdout")
+    p.add_argument("--child", choices=sorted(ROUTES), help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.child:
+        _child(args.child, args.warm_up)
+        return
+
+    from run_bench import _git_head
+    report = {
+        "commit": _git_head(),
+        "python": sys.version.split()[0],
+        "args": vars(args),
+        "import": measure_imports(args.runs, args.top),
+        "routes": {route: measure_route(route, args.runs, args.warm_up) for route in args.routes},
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Local stand-ins for every external dependency of the fact-check function app:
+
+  /newsdata/api/1/latest                       NewsData
+  /guardian/search                             Guardian content search
+  /newsapi/v2/everything, /newsapi/v2/top-headlines
+  /openai/deployments/<dep>/chat/completions   Azure OpenAI chat completions
+  /agents/api/projects/bench/...               Agents assistants/threads/messages/runs
+
+Each endpoint family has a latency distribution (log-normal around a median),
+error and 429 rates and payload sizes, all overridable from a JSON config.
+Counters (requests, bytes in/out, 429s, errors, tokens) are kept per family.
+"""
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from copy import deepcopy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+DEFAULT_CONFIG = {
+    "newsdata": {"latency_ms": 400, "sigma": 0.5, "error_rate": 0.0, "rate_429": 0.0,
+                 "articles": 10, "snippet_chars": 300, "pages": 3},
+    "guardian": {"latency_ms": 250, "sigma": 0.4, "error_rate": 0.0, "rate_429": 0.0,
+                 "articles": 10, "snippet_chars": 200},
+    "newsapi":  {"latency_ms": 300, "sigma": 0.4, "error_rate": 0.0, "rate_429": 0.0,
+                 "articles": 20, "snippet_chars": 250},
+    "openai":   {"latency_ms": 1500, "sigma": 0.5, "error_rate": 0.0, "rate_429": 0.0,
+                 "completion_tokens": 250, "ms_per_completion_token": 0},
+    "agents":   {"latency_ms": 60, "sigma": 0.3, "error_rate": 0.0, "rate_429": 0.0,
+                 "run_ms": 4000, "run_sigma": 0.6, "citations": 4, "snippet_chars": 200},
+}
+
+_WORDS = ("moon cheese nasa government policy election minister climate vaccine "
+          "study report claim official statement court ruling market price").split()
+
+
+def merge_config(overrides):
+    cfg = deepcopy(DEFAULT_CONFIG)
+    for family, values in (overrides or {}).items():
+        cfg.setdefault(family, {}).update(values)
+    return cfg
+
+
+def _lognormal_ms(median, sigma, rng):
+    return median * math.exp(sigma * rng.gauss(0, 1)) if median > 0 else 0.0
+
+
+def _text(rng, chars):
+    out = []
+    while sum(len(w) + 1 for w in out) < chars:
+        out.append(rng.choice(_WORDS))
+    return " ".join(out)[:chars]
+
+
+class FakeState:
+    def __init__(self, config, seed=0):
+        self.config = config
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.runs = {}
+        self.reset_counters()
+
+    def reset_counters(self):
+        with self.lock:
+            self.counters = {f: {"requests": 0, "bytes_in": 0, "bytes_out": 0, "status_429": 0, "errors": 0,
+                                 "prompt_tokens": 0, "completion_tokens": 0} for f in self.config}
+
+    def snapshot(self):
+        with self.lock:
+            return deepcopy(self.counters)
+
+    def count(self, family, **inc):
+        with self.lock:
+            c = self.counters[family]
+            for k, v in inc.items():
+                c[k] += v
+
+    def sample(self, family, key="latency_ms", sigma_key="sigma"):
+        cfg = self.config[family]
+        with self.lock:
+            return _lognormal_ms(cfg[key], cfg.get(sigma_key, 0), self.rng) / 1000.0
+
+    def roll(self, family):
+        """'429', 'error' or None for one request."""
+        cfg = self.config[family]
+        with self.lock:
+            x = self.rng.random()
+        if x < cfg.get("rate_429", 0):
+            return "429"
+        if x < cfg.get("rate_429", 0) + cfg.get("error_rate", 0):
+            return "error"
+        return None
+
+
+# -----------------------------
+# Payload builders
+# -----------------------------
+def _newsdata(state, query, page):
+    cfg = state.config["newsdata"]
+    rng = random.Random(f"nd|{query}|{page}")
+    results = [{
+        "title": f"{query} {_text(rng, 40)}",
+        "link": f"https://news{i % 7}.example/{uuid.UUID(int=rng.getrandbits(128))}",
+        "source_id": f"news{i % 7}",
+        "description": _text(rng, cfg["snippet_chars"]),
+    } for i in range(cfg["articles"])]
+    page_no = int(page or 0)
+    nxt = str(page_no + 1) if page_no + 1 < cfg.get("pages", 1) else None
+    return {"status": "success", "totalResults": cfg["articles"] * cfg.get("pages", 1),
+            "results": results, "nextPage": nxt}
+
+
+def _guardian(state, query):
+    cfg = state.config["guardian"]
+    rng = random.Random(f"g|{query}")
+    return {"response": {"status": "ok", "results": [{
+        "webTitle": f"{query} {_text(rng, 40)}",
+        "webUrl": f"https://www.theguardian.com/{uuid.UUID(int=rng.getrandbits(128))}",
+        "webPublicationDate": "2024-01-01T00:00:00Z",
+        "fields": {"trailText": _text(rng, cfg["snippet_chars"])},
+    } for _ in range(cfg["articles"])]}}
+
+
+def _newsapi(state, query):
+    cfg = state.config["newsapi"]
+    rng = random.Random(f"n|{query}")
+    return {"status": "ok", "articles": [{
+        "title": f"{query} {_text(rng, 40)}",
+        "url": f"https://wire{i % 5}.example/{uuid.UUID(int=rng.getrandbits(128))}",
+        "source": {"name": f"wire{i % 5}"},
+        "description": _text(rng, cfg["snippet_chars"]),
+        "publishedAt": "2024-01-01T00:00:00Z",
+    } for i in range(cfg["articles"])]}
+
+
+def _chat_completion(state, body, prompt_tokens):
+    cfg = state.config["openai"]
+    citations = re.findall(r"- Title: (.*)\n  Source: (.*)\n  URL: (.*)", body["messages"][-1]["content"])
+    reply = {
+        "classification": "Unclear" if len(citations) < 2 else "Supported",
+        "rationale": "Benchmark rationale. " * 5,
+        "citations": [{"title": t, "source": s, "url": u} for t, s, u in citations[:4]],
+    }
+    schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("schema") or {}
+    if "confidence" in schema.get("properties", {}):
+        # fast tier: deterministic per claim, about half of the claims fall below 0.8
+        reply["confidence"] = round(0.6 + 0.4 * random.Random(body["messages"][-1]["content"][:200]).random(), 2)
+    content = json.dumps(reply)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion", "created": int(time.time()),
+        "model": body.get("model", "bench"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": cfg["completion_tokens"],
+                  "total_tokens": prompt_tokens + cfg["completion_tokens"]},
+    }
+
+
+def _agent_message(state, thread_id, query):
+    cfg = state.config["agents"]
+    rng = random.Random(f"a|{query}")
+    text, annotations = "", []
+    for i in range(cfg["citations"]):
+        sentence = _text(rng, cfg["snippet_chars"]) + " "
+        marker = f"【{i}†source】"
+        text += sentence
+        annotations.append({
+            "type": "url_citation", "text": marker,
+            "start_index": len(text), "end_index": len(text) + len(marker),
+            "url_citation": {"url": f"https://bing{i}.example/{uuid.UUID(int=rng.getrandbits(128))}",
+                             "title": f"{query} {_text(rng, 30)}"},
+        })
+        text += marker
+    return {"id": f"msg_{uuid.uuid4().hex}", "object": "thread.message", "created_at": int(time.time()),
+            "thread_id": thread_id, "role": "assistant", "status": "completed", "attachments": [],
+            "metadata": {}, "content": [{"type": "text", "text": {"value": text, "annotations": annotations}}]}
+
+
+def _run(run_id, thread_id, status):
+    return {"id": run_id, "object": "thread.run", "created_at": int(time.time()), "thread_id": thread_id,
+            "assistant_id": "asst_bench", "status": status, "model": "bench", "instructions": "",
+            "tools": [], "metadata": {}, "parallel_tool_calls": True}
+
+
+# -----------------------------
+# HTTP handler
+# -----------------------------
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: FakeState = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, family, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+        self.state.count(family, bytes_out=len(body))
+
+    def _read_body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(n) if n else b""
+
+    def _handle(self, method):
+        parsed = urlparse(self.path)
+        path, qs = parsed.path, parse_qs(parsed.query)
+        raw = self._read_body()
+        family = path.strip("/").split("/", 1)[0]
+        if family not in self.state.config:
+            return self._send("agents", 404, {"error": "unknown endpoint"})
+        self.state.count(family, requests=1, bytes_in=len(raw) + len(self.path))
+
+        time.sleep(self.state.sample(family))
+        outcome = self.state.roll(family)
+        if outcome == "429":
+            self.state.count(family, status_429=1)
+            return self._send(family, 429, {"error": "rate limited"}, {"Retry-After": "1"})
+        if outcome == "error":
+            self.state.count(family, errors=1)
+            return self._send(family, 500, {"error": "injected failure"})
+
+        q = (qs.get("q") or [""])[0]
+        if family == "newsdata":
+            return self._send(family, 200, _newsdata(self.state, q, (qs.get("page") or [None])[0]))
+        if family == "guardian":
+            return self._send(family, 200, _guardian(self.state, q))
+        if family == "newsapi":
+            return self._send(family, 200, _newsapi(self.state, q))
+        if family == "openai":
+            body = json.loads(raw or b"{}")
+            prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+            cfg = self.state.config["openai"]
+            time.sleep(cfg.get("ms_per_completion_token", 0) * cfg["completion_tokens"] / 1000.0)
+            self.state.count(family, prompt_tokens=prompt_tokens, completion_tokens=cfg["completion_tokens"])
+            return self._send(family, 200, _chat_completion(self.state, body, prompt_tokens))
+        return self._agents(method, path, qs, raw)
+
+    def _agents(self, method, path, qs, raw):
+        parts = path.strip("/").split("/")[4:]   # drop agents/api/projects/<name>
+        st = self.state
+        if parts[:1] == ["assistants"]:
+            return self._send("agents", 200, {"id": parts[1], "object": "assistant", "created_at": 0,
+                                              "name": "bench", "model": "bench", "instructions": "",
+                                              "tools": [], "metadata": {}})
+        if parts == ["threads"] and method == "POST":
+            tid = f"thread_{uuid.uuid4().hex}"
+            with st.lock:
+                st.runs[tid] = {"query": "", "runs": {}}
+            return self._send("agents", 200, {"id": tid, "object": "thread", "created_at": 0,
+                                              "metadata": {}, "tool_resources": {}})
+        if len(parts) >= 2 and parts[0] == "threads":
+            tid = parts[1]
+            thread = st.runs.setdefault(tid, {"query": "", "runs": {}})
+            if parts[2:] == ["messages"] and method == "POST":
+                thread["query"] = (json.loads(raw or b"{}").get("content") or "")
+                return self._send("agents", 200, {"id": f"msg_{uuid.uuid4().hex}", "object": "thread.message",
+                                                  "created_at": 0, "thread_id": tid, "role": "user",
+                                                  "content": [], "attachments": [], "metadata": {}})
+            if parts[2:] == ["messages"]:
+                # a single page; the SDK pages on with ?after=<last_id> until it gets an empty list
+                data = [] if qs.get("after") else [_agent_message(st, tid, thread["query"])]
+                last = data[-1]["id"] if data else None
+                return self._send("agents", 200, {"object": "list", "data": data, "first_id": last,
+                                                  "last_id": last, "has_more": False})
+            if parts[2:] == ["runs"] and method == "POST":
+                rid = f"run_{uuid.uuid4().hex}"
+                thread["runs"][rid] = time.monotonic() + st.sample("agents", "run_ms", "run_sigma")
+                return self._send("agents", 200, _run(rid, tid, "queued"))
+            if len(parts) >= 4 and parts[2] == "runs":
+                rid = parts[3]
+                if parts[4:] == ["cancel"]:
+                    thread["runs"][rid] = None
+                    return self._send("agents", 200, _run(rid, tid, "cancelled"))
+                ready = thread["runs"].get(rid)
+                status = "cancelled" if ready is None else ("completed" if time.monotonic() >= ready else "in_progress")
+                return self._send("agents", 200, _run(rid, tid, status))
+            if len(parts) == 2 and method == "DELETE":
+                st.runs.pop(tid, None)
+                return self._send("agents", 200, {"id": tid, "object": "thread.deleted", "deleted": True})
+        return self._send("agents", 404, {"error": f"unhandled {method} {path}"})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+class FakeServers:
+    """All stand-ins behind one threaded HTTP server on 127.0.0.1."""
+
+    def __init__(self, config=None, seed=0, port=0):
+        self.state = FakeState(merge_config(config), seed)
+        handler = type("Handler", (_Handler,), {"state": self.state})
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """Environment that points the function app at these stand-ins."""
+        base = self.base_url
+        return {
+            "NEWSDATA_BASE_URL": f"{base}/newsdata/api/1/latest",
+            "NEWSDATA_API_KEY": "bench",
+            "GUARDIAN_BASE_URL": f"{base}/guardian/search",
+            "GUARDIAN_API_KEY": "bench",
+            "NEWSAPI_BASE_URL": f"{base}/newsapi/v2",
+            "NEWSAPI_KEY": "bench",
+            "AZURE_OPENAI_ENDPOINT": base,
+            "AZURE_OPENAI_API_KEY": "bench",
+            "AZURE_OPENAI_PROJECT_ENDPOINT": f"{base}/agents/api/projects/bench",
+            "AZURE_OPENAI_ASSISTANT_ID": "asst_bench",
+        }
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,271 @@
+"""
+Offline benchmark for the fact-check function app.
+
+Starts the local stand-ins from fakes.py, points the app at them through
+environment variables, then drives function_app1 (Bing grounding),
+function_app2 (NewsData) and/or search_all at a fixed concurrency and prints
+one JSON document with p50/p95/p99 latency, throughput, bytes and tokens per
+request for each target. Compare the output between commits.
+
+    python run_bench.py --targets bing newsdata search_all --requests 200 \
+        --concurrency 16 --claims 50 --out bench.json
+
+Verdict, near-duplicate and retrieval caches, the local evidence index and
+single-flight request coalescing are disabled unless --cache is given (the index then starts empty in a fresh
+temporary file), and provider quotas are lifted unless --real-quotas is given, so the
+numbers measure the pipeline rather than the cache hit rate.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fakes import FakeServers
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "FactCheckerFunction")
+
+CLAIM_WORDS = ("moon cheese nasa government policy election minister climate vaccine study "
+               "report official statement court ruling market price fuel tax cricket").split()
+
+
+def _claims(n, seed):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(CLAIM_WORDS) for _ in range(rng.randint(5, 10))) for _ in range(n)]
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _configure_env(fakes, args):
+    os.environ.update(fakes.env())
+    os.environ.setdefault("AGENT_RUN_TIMEOUT_SEC", str(args.agent_timeout))
+    if args.fast_deployment:
+        os.environ["AZURE_OPENAI_FAST_DEPLOYMENT"] = args.fast_deployment
+    if not args.cache:
+        os.environ.update({
+            "VERDICT_CACHE_ENABLED": "false",
+            "SIMINDEX_ENABLED": "false",
+            "NEWSDATA_CACHE_TTL_SEC": "0",
+            "GUARDIAN_CACHE_TTL_SEC": "0",
+            "NEWSAPI_CACHE_TTL_SEC": "0",
+            "EVIDENCE_INDEX_ENABLED": "false",
+            "SINGLEFLIGHT_ENABLED": "false",
+        })
+    else:
+        os.environ.setdefault("EVIDENCE_INDEX_PATH", os.path.join(tempfile.mkdtemp(), "evidence.sqlite"))
+    if not args.real_quotas:
+        for provider in ("NEWSDATA", "GUARDIAN", "NEWSAPI"):
+            os.environ[f"{provider}_RATE_PER_MIN"] = "1000000"
+            os.environ[f"{provider}_BURST"] = "100000"
+
+
+class _EventLoopThread:
+    """One event loop shared by every async route call, as in the Functions worker."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="bench-loop", daemon=True).start()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def run_route(fn, req):
+    """Call a route handler, sync or async, and return its HttpResponse."""
+    global _loop
+    resp = fn(req)
+    if inspect.iscoroutine(resp):
+        if _loop is None:
+            with _loop_lock:  # concurrent first requests must share one loop
+                if _loop is None:
+                    _loop = _EventLoopThread()
+        resp = _loop.run(resp)
+    return resp
+
+
+def _install_project_client(base_env):
+    """The agents SDK refuses bearer auth over plain HTTP, so build the clients with a static header."""
+    import clients
+    from azure.ai.projects import AIProjectClient
+    from azure.ai.projects.aio import AIProjectClient as AsyncAIProjectClient
+    from azure.core.credentials import AccessToken
+    from azure.core.pipeline.policies import SansIOHTTPPolicy
+
+    class _StaticCredential:
+        def get_token(self, *scopes, **kwargs):
+            return AccessToken("bench", int(time.time()) + 3600)
+
+    class _AsyncStaticCredential:
+        async def get_token(self, *scopes, **kwargs):
+            return AccessToken("bench", int(time.time()) + 3600)
+
+        async def close(self):
+            pass
+
+    class _StaticAuth(SansIOHTTPPolicy):
+        def on_request(self, request):
+            request.http_request.headers["Authorization"] = "Bearer bench"
+
+    clients.register("project", AIProjectClient(
+        endpoint=base_env["AZURE_OPENAI_PROJECT_ENDPOINT"],
+        credential=_StaticCredential(),
+        authentication_policy=_StaticAuth(),
+    ))
+    clients.register("async_project", AsyncAIProjectClient(
+        endpoint=base_env["AZURE_OPENAI_PROJECT_ENDPOINT"],
+        credential=_AsyncStaticCredential(),
+        authentication_policy=_StaticAuth(),
+    ))
+
+
+def _targets():
+    import azure.functions as func
+    import function_app
+    from sources import search_all
+
+    def _http(fn):
+        def call(claim):
+            req = func.HttpRequest("POST", "/api/bench", body=json.dumps({"query": claim}).encode("utf-8"))
+            resp = run_route(fn, req)
+            body = resp.get_body()
+            if resp.status_code != 200:
+                raise RuntimeError(f"HTTP {resp.status_code}: {body[:200]!r}")
+            return len(body)
+        return call
+
+    def _search(claim):
+        return len(json.dumps(search_all(claim)).encode("utf-8"))
+
+    return {
+        "bing": _http(function_app.function_app1),
+        "newsdata": _http(function_app.function_app2),
+        "search_all": _search,
+    }
+
+
+def _run_target(name, call, fakes, claims, args):
+    work = [claims[i % len(claims)] for i in range(args.requests)]
+    latencies, errors, response_bytes = [], [], 0
+
+    def one(claim):
+        t0 = time.perf_counter()
+        try:
+            n = call(claim)
+            return time.perf_counter() - t0, n, None
+        except Exception as e:
+            return time.perf_counter() - t0, 0, f"{type(e).__name__}: {e}"
+
+    for claim in work[:args.warmup]:
+        one(claim)
+    fakes.state.reset_counters()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for dt, n, err in pool.map(one, work):
+            latencies.append(dt * 1000.0)
+            response_bytes += n
+            if err:
+                errors.append(err)
+    wall = time.perf_counter() - start
+
+    upstream = fakes.state.snapshot()
+    n = len(work)
+    lat = sorted(latencies)
+    totals = {k: sum(c[k] for c in upstream.values()) for k in ("requests", "bytes_in", "bytes_out",
+                                                               "prompt_tokens", "completion_tokens")}
+    return {
+        "requests": n,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "p50_ms": _percentile(lat, 50),
+        "p95_ms": _percentile(lat, 95),
+        "p99_ms": _percentile(lat, 99),
+        "mean_ms": sum(lat) / n if n else None,
+        "throughput_rps": n / wall if wall else None,
+        "response_bytes_per_req": response_bytes / n if n else None,
+        "upstream_calls_per_req": totals["requests"] / n if n else None,
+        "upstream_bytes_per_req": (totals["bytes_in"] + totals["bytes_out"]) / n if n else None,
+        "prompt_tokens_per_req": totals["prompt_tokens"] / n if n else None,
+        "completion_tokens_per_req": totals["completion_tokens"] / n if n else None,
+        "upstream": upstream,
+    }
+
+
+def _git_head():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=APP_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--targets", nargs="+", default=["bing", "newsdata", "search_all"],
+                   choices=["bing", "newsdata", "search_all"])
+    p.add_argument("--requests", type=int, default=100)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--claims", type=int, default=50, help="size of the distinct claim pool")
+    p.add_argument("--warmup", type=int, default=2)
+    p.add_argument("--config", help="JSON file overriding fakes.DEFAULT_CONFIG per endpoint family")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--agent-timeout", type=float, default=20.0)
+    p.add_argument("--cache", action="store_true", help="leave the app's caches and request coalescing enabled")
+    p.add_argument("--real-quotas", action="store_true", help="keep the default provider rate limits")
+    p.add_argument("--fast-deployment", help="enable the classifier's fast tier with this deployment name")
+    p.add_argument("--out", help="write the JSON report here as well as stdout")
+    args = p.parse_args(argv)
+
+    overrides = None
+    if args.config:
+        with open(args.config) as f:
+            overrides = json.load(f)
+
+    with FakeServers(overrides, seed=args.seed) as fakes:
+        _configure_env(fakes, args)
+        sys.path.insert(0, os.path.abspath(APP_DIR))
+        _install_project_client(fakes.env())
+        targets = _targets()
+        claims = _claims(args.claims, args.seed)
+
+        report = {
+            "commit": _git_head(),
+            "args": vars(args),
+            "fakes": fakes.state.config,
+            "results": {name: _run_target(name, targets[name], fakes, claims, args) for name in args.targets},
+        }
+        from agentthreads import pool_stats
+        report["agent_threads"] = pool_stats()
+        from factcheck_llm import cascade_stats
+        report["cascade"] = cascade_stats()
+        from singleflight import flight_stats
+        report["singleflight"] = flight_stats()
+        if _loop is not None:
+            import clients
+            _loop.run(clients.close_async())
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The function app is a flat folder of modules; import them the way the Functions host does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "FactCheckerFunction"))
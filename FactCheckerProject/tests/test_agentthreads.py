@@ -0,0 +1,99 @@
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+
+import agentthreads
+from agentthreads import AgentThreadPool
+
+
+class _Threads:
+    """agents.threads stand-in: numbered thread ids, optional delete failures."""
+
+    def __init__(self, delete_failures=0):
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.created, self.deleted = [], []
+        self.delete_failures = delete_failures
+
+    def create(self):
+        with self._lock:
+            tid = f"thread_{next(self._ids)}"
+            self.created.append(tid)
+        return SimpleNamespace(id=tid)
+
+    def delete(self, tid):
+        with self._lock:
+            if self.delete_failures:
+                self.delete_failures -= 1
+                raise RuntimeError("503")
+            self.deleted.append(tid)
+
+
+def _pool(threads, **kwargs):
+    project = SimpleNamespace(agents=SimpleNamespace(threads=threads))
+    kwargs.setdefault("interval", 0.01)
+    return AgentThreadPool(project_factory=lambda: project, **kwargs)
+
+
+def _until(predicate, timeout=2.0):
+    t0 = time.monotonic()
+    while not predicate():
+        assert time.monotonic() - t0 < timeout, "timed out"
+        time.sleep(0.005)
+
+
+def test_acquire_hands_out_pre_created_threads_and_refills():
+    threads = _Threads()
+    pool = _pool(threads, size=2)
+    pool._refill()
+    first = pool.acquire()
+    assert first in threads.created
+    _until(lambda: pool.stats()["pool_size"] == 2)
+    assert pool.acquire() not in (None, first)
+    assert pool.stats()["hits"] == 2
+
+
+def test_empty_pool_is_a_miss():
+    pool = _pool(_Threads(), size=0)
+    assert pool.acquire() is None
+    assert pool.stats()["misses"] == 1 and pool.stats()["hit_rate"] == 0.0
+
+
+def test_released_threads_are_deleted_never_reused():
+    threads = _Threads()
+    pool = _pool(threads, size=1)
+    pool._refill()
+    tid = pool.acquire()
+    pool.release(tid)
+    assert pool.flush(timeout=2)
+    assert threads.deleted == [tid]
+    assert pool.acquire() != tid
+
+
+def test_stale_pooled_threads_are_retired_unused():
+    threads = _Threads()
+    pool = _pool(threads, size=1, max_age=0.0, interval=60)
+    pool._refill()
+    stale = threads.created[0]
+    time.sleep(0.01)
+    assert pool.acquire() is None
+    assert pool.stats()["expired"] == 1
+    pool.flush(timeout=2)
+    assert stale in threads.deleted
+
+
+def test_failed_deletes_are_retried_then_abandoned():
+    threads = _Threads(delete_failures=agentthreads.AGENT_THREAD_DELETE_ATTEMPTS)
+    pool = _pool(threads, size=0, interval=60)
+    pool.release("thread_a")
+    pool.release("thread_b")
+    assert pool.flush(timeout=2)
+    stats = pool.stats()
+    assert stats["abandoned"] + stats["deleted"] == 2
+    assert stats["delete_failures"] >= 1 and stats["cleanup_backlog"] == 0
+
+
+def test_pool_can_be_switched_off(monkeypatch):
+    monkeypatch.setattr(agentthreads, "AGENT_THREAD_POOL_ENABLED", False)
+    assert agentthreads.get_thread_pool() is None
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+import batch
+from batch import run_batch
+
+
+class _Concurrency:
+    """classify() stand-in that records how many calls overlap."""
+
+    def __init__(self, seconds=0.05):
+        self.seconds = seconds
+        self.calls = []
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, claim):
+        with self._lock:
+            self.calls.append(claim)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.active -= 1
+        return {"classification": "Unclear"}
+
+
+def test_duplicate_claims_run_once_and_results_keep_input_order():
+    classify = _Concurrency(0)
+    out = run_batch(["The moon is cheese", "Tea cures colds", "the MOON is cheese!"], "bing", classify)
+    assert out["unique"] == 2
+    assert sorted(classify.calls) == ["Tea cures colds", "The moon is cheese"]
+    assert [r["query"] for r in out["results"]] == ["The moon is cheese", "Tea cures colds", "the MOON is cheese!"]
+
+
+def test_a_failing_claim_does_not_fail_the_batch():
+    def classify(claim):
+        if "boom" in claim:
+            raise RuntimeError("provider down")
+        return {"classification": "Supported"}
+
+    results = run_batch(["fine", "boom"], "bing", classify)["results"]
+    assert results[0]["classification"] == "Supported"
+    assert results[1] == {"error": "provider down", "query": "boom"}
+
+
+def test_oversized_batches_are_rejected(monkeypatch):
+    monkeypatch.setattr(batch, "BATCH_MAX_CLAIMS", 2)
+    with pytest.raises(ValueError):
+        run_batch(["a", "b", "c"], "bing", lambda c: {})
+
+
+def test_concurrency_is_bounded_by_the_request():
+    classify = _Concurrency()
+    run_batch([f"claim {i}" for i in range(8)], "other", classify, concurrency=3)
+    assert classify.peak <= 3
+
+
+def test_concurrency_is_bounded_by_the_provider_slots():
+    classify = _Concurrency()
+    run_batch([f"claim {i}" for i in range(8)], "newsdata", classify, concurrency=8)
+    assert classify.peak <= batch.PROVIDER_CONCURRENCY["newsdata"]
+
+
+def test_unified_items_hold_a_bing_and_a_newsdata_slot():
+    classify = _Concurrency()
+    run_batch([f"claim {i}" for i in range(8)], "unified", classify, concurrency=8)
+    assert classify.peak <= min(batch.PROVIDER_CONCURRENCY.values())
@@ -0,0 +1,37 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from binggrounding import _wait_for_run_async
+
+
+class _Runs:
+    """project.agents.runs stand-in whose run never finishes."""
+
+    def __init__(self):
+        self.cancelled = []
+
+    async def get(self, thread_id, run_id):
+        return SimpleNamespace(id=run_id, status="in_progress")
+
+    async def cancel(self, thread_id, run_id):
+        await asyncio.sleep(0)  # a real round trip yields to the loop
+        self.cancelled.append((thread_id, run_id))
+
+
+def test_cancelled_wait_cancels_the_agent_run():
+    runs = _Runs()
+    project = SimpleNamespace(agents=SimpleNamespace(runs=runs))
+    run = SimpleNamespace(id="run_1", status="queued")
+
+    async def main():
+        task = asyncio.create_task(_wait_for_run_async(project, "thread_1", run, timeout=30))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert runs.cancelled == [("thread_1", "run_1")]
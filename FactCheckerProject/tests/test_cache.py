@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+import deadline
+from cache import LRUCache, SqliteCache, TieredCache, normalize_claim, retrieval_key, verdict_key
+
+
+def test_normalize_claim_unquotes_folds_case_and_strips_punctuation():
+    assert normalize_claim("NASA%20says:  the Moon is made of CHEESE!") == "nasa says the moon is made of cheese"
+    assert normalize_claim("ｆｕｌｌwidth") == "fullwidth"  # NFKC
+    assert normalize_claim(None) == ""
+
+
+def test_verdict_key_matches_respellings_but_not_other_routes_or_windows():
+    key = verdict_key("The moon is cheese.", "bing", "2024-01-01", "2024-01-31")
+    assert key == verdict_key("the  MOON is cheese", "bing", "2024-01-01", "2024-01-31")
+    assert key != verdict_key("The moon is cheese.", "newsdata", "2024-01-01", "2024-01-31")
+    assert key != verdict_key("The moon is cheese.", "bing", "2024-01-02", "2024-01-31")
+
+
+def test_retrieval_key_leaves_out_api_keys():
+    assert retrieval_key({"q": "moon", "apikey": "a"}) == retrieval_key({"apikey": "b", "q": "moon"})
+
+
+def test_lru_evicts_least_recently_used():
+    c = LRUCache(max_size=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+    assert (c.get("a"), c.get("b"), c.get("c")) == (1, None, 3)
+
+
+def test_lru_expires_entries():
+    c = LRUCache(ttl=60)
+    c.set("a", 1, ttl=-1)
+    c.set("b", 2)
+    assert c.get("a") is None
+    assert c.get("b") == 2
+
+
+def test_sqlite_cache_round_trips_json_and_expires(tmp_path):
+    c = SqliteCache(str(tmp_path / "c.sqlite"), ttl=60)
+    c.set("near|bing||x|00ff", {"classification": "Supported"})
+    c.set("old", {"classification": "Unclear"}, ttl=-1)
+    assert c.get("near|bing||x|00ff") == {"classification": "Supported"}
+    assert c.get("old") is None
+    assert c.keys("near|") == ["near|bing||x|00ff"]
+    assert c.purge_expired() == 1
+
+
+def test_tiered_cache_promotes_disk_hits_with_their_expiry(tmp_path):
+    disk = SqliteCache(str(tmp_path / "c.sqlite"), ttl=60)
+    disk.set("k", {"v": 1})
+    memory = LRUCache()
+    c = TieredCache(memory, disk)
+    assert c.get("k") == {"v": 1}
+    expires_at, value = memory._data["k"]
+    assert value == {"v": 1} and expires_at <= time.time() + 60
+
+
+@pytest.fixture
+def verdicts(monkeypatch):
+    """function_app's verdict cache, swapped for a fresh in-memory one with the near-duplicate index off."""
+    function_app = pytest.importorskip("function_app")
+    import simindex
+    cache = TieredCache(LRUCache())
+    monkeypatch.setattr(function_app, "VERDICT_CACHE_ENABLED", True)
+    monkeypatch.setattr(function_app, "get_verdict_cache", lambda: cache)
+    monkeypatch.setattr(simindex, "SIMINDEX_ENABLED", False)
+    return function_app
+
+
+def test_verdict_is_cached_and_served(verdicts):
+    calls = []
+    compute = lambda: calls.append(1) or {"classification": "Supported", "citations": []}
+    first = verdicts._cached_verdict("bing", "moon%20cheese", "a", "b", compute)
+    second = verdicts._cached_verdict("bing", "Moon cheese", "a", "b", compute)
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert len(calls) == 1
+
+
+def test_verdict_from_failed_retrieval_is_flagged_and_not_cached(verdicts):
+    def failed():
+        deadline.degrade("bing: agent run failed")
+        return {"classification": "Unclear", "citations": []}
+
+    first = verdicts._cached_verdict("bing", "moon cheese", "a", "b", failed)
+    assert first["degraded"] is True
+    assert first["degraded_reasons"] == ["bing: agent run failed"]
+    second = verdicts._cached_verdict("bing", "moon cheese", "a", "b", lambda: {"classification": "Supported"})
+    assert second == {"classification": "Supported", "cached": False}
+
+
+def test_payload_marked_degraded_is_not_cached(verdicts):
+    cut_off = {"classification": "Unclear", "degraded_reasons": ["classifier reply cut off at the token cap"]}
+    assert verdicts._cached_verdict("bing", "moon", "a", "b", lambda: dict(cut_off))["degraded"] is True
+    assert verdicts._cache_lookup("bing", "moon", "a", "b") is None
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+
+import pytest
+import requests
+
+import deadline
+
+
+@pytest.mark.parametrize("body, seconds", [
+    ({}, deadline.REQUEST_DEADLINE_SEC),
+    ({"deadline_sec": 5}, 5.0),
+    ({"deadline_sec": "2.5"}, 2.5),
+    ({"deadline_sec": 10_000}, deadline.REQUEST_DEADLINE_MAX_SEC),
+    ({"deadline_sec": -1}, deadline.REQUEST_DEADLINE_SEC),
+    ({"deadline_sec": "soon"}, deadline.REQUEST_DEADLINE_SEC),
+])
+def test_requested_budget(body, seconds):
+    assert deadline.requested(body) == seconds
+
+
+def test_no_deadline_outside_a_scope():
+    assert deadline.remaining() is None
+    assert deadline.budget(20, reserve=6) == 20
+    assert deadline.timeout(20) == 20
+    assert deadline.allows(1000)
+    assert deadline.classify_reserve() == deadline.CLASSIFY_RESERVE_SEC
+    deadline.degrade("ignored")
+    assert deadline.degraded() == []
+
+
+def test_budget_is_cut_to_what_is_left():
+    with deadline.scope(10):
+        left = 10 - deadline.RESPONSE_RESERVE_SEC
+        assert deadline.budget(60) == pytest.approx(left, abs=0.05)
+        assert deadline.budget(60, reserve=3) == pytest.approx(left - 3, abs=0.05)
+        assert deadline.budget(2) == 2
+        assert deadline.budget(60, reserve=100) == 0.0
+    assert deadline.remaining() is None
+
+
+def test_timeout_refuses_calls_that_cannot_fit():
+    with deadline.scope(deadline.RESPONSE_RESERVE_SEC + deadline.MIN_CALL_SEC / 2):
+        assert not deadline.allows()
+        with pytest.raises(deadline.DeadlineExceeded):
+            deadline.timeout(20)
+
+
+def test_classify_reserve_scales_with_the_request_budget():
+    with deadline.scope(2.5):
+        assert deadline.classify_reserve() == pytest.approx(deadline.CLASSIFY_RESERVE_FRACTION * 2.5)
+    with deadline.scope(100):
+        assert deadline.classify_reserve() == deadline.CLASSIFY_RESERVE_SEC
+
+
+def test_ran_out_only_for_timeouts_at_the_deadline():
+    with deadline.scope(10):
+        assert not deadline.ran_out(requests.Timeout())
+    with deadline.scope(0):
+        assert deadline.ran_out(requests.Timeout())
+        assert deadline.ran_out(deadline.DeadlineExceeded())
+        assert not deadline.ran_out(ValueError())
+
+
+def test_degradations_are_shared_with_threads_and_tasks():
+    import contextvars
+
+    async def task():
+        deadline.degrade("from a task")
+
+    with deadline.scope(10) as degraded:
+        deadline.degrade("newsdata: extra pages skipped")
+        deadline.degrade("newsdata: extra pages skipped")
+        t = threading.Thread(target=contextvars.copy_context().run, args=(deadline.degrade, "from a thread"))
+        t.start()
+        t.join()
+        asyncio.run(task())
+        assert deadline.degraded() == ["newsdata: extra pages skipped", "from a thread", "from a task"]
+    assert len(degraded) == 3
+    assert deadline.degraded() == []
+
+
+def test_tracking_reuses_the_request_list_and_works_without_a_deadline():
+    with deadline.tracking() as degraded:
+        assert deadline.remaining() is None
+        deadline.degrade("bing: agent run failed")
+    assert degraded == ["bing: agent run failed"]
+
+    with deadline.scope(10) as request:
+        with deadline.tracking() as inner:
+            deadline.degrade("search: guardian failed")
+        assert inner is request
+    assert request == ["search: guardian failed"]
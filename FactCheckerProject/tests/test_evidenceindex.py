@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+import evidenceindex
+from evidenceindex import EvidenceIndex
+
+
+def _article(i, title, snippet="", published=None, **extra):
+    return dict(url=f"https://www.news.example/{i}", title=title, snippet=snippet, source="wire",
+                publishedAt=published, **extra)
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = EvidenceIndex(path=str(tmp_path / "evidence.sqlite"), ttl=3600)
+    idx.ingest([
+        _article(1, "NASA says the moon is not made of cheese", "Lunar samples are rock.", "2024-05-02T08:00:00Z"),
+        _article(2, "Moon cheese rumour spreads online", "A viral post claims NASA found cheese.", "2024-04-01"),
+        _article(3, "Cricket final rained off", "No play at the stadium.", "2024-05-02"),
+        _article(4, "Cheese prices rise", "Dairy costs go up.", "2024-05-02"),
+        _article(5, "NASA moon cheese claim checked", "Undated wire copy.", trusted=True),
+    ], "newsdata")
+    idx.flush()
+    return idx
+
+
+def test_lookup_returns_articles_sharing_enough_query_terms(index):
+    hits = index.lookup("NASA moon cheese")
+    assert sorted(h["url"][-1] for h in hits) == ["1", "2", "5"]  # "Cheese prices rise" has 1 of 3 terms
+    assert all(h["indexed"] for h in hits)
+    assert [h["trusted"] for h in hits if h["url"].endswith("5")] == [True]
+    assert index.lookup("the of and") == []
+
+
+def test_best_bm25_match_comes_first(index):
+    index.ingest([_article(6, "Cricket board meets", "Selectors discuss the cricket calendar.")], "guardian")
+    index.flush()
+    assert [h["url"][-1] for h in index.lookup("cricket final")] == ["3", "6"]
+    assert len(index.lookup("NASA moon cheese", limit=1)) == 1
+
+
+def test_lookup_filters_by_publish_window_keeping_undated_rows(index):
+    hits = index.lookup("NASA moon cheese", frm="2024-05-01", to="2024-05-31")
+    assert sorted(h["url"][-1] for h in hits) == ["1", "5"]
+
+
+def test_reingesting_a_url_updates_it_in_place(index):
+    index.ingest([_article(3, "Cricket final replayed on Monday")], "guardian")
+    index.flush()
+    assert [h["title"] for h in index.lookup("cricket final replayed")] == ["Cricket final replayed on Monday"]
+
+
+def test_expire_drops_articles_past_the_ttl(index):
+    index.ttl = 0.05
+    time.sleep(0.1)
+    assert index.lookup("NASA moon cheese") == []
+    assert index.expire() == 5
+    assert index.stats()["expired"] == 5
+
+
+def test_module_helpers_are_no_ops_when_the_index_is_off(monkeypatch):
+    monkeypatch.setattr(evidenceindex, "EVIDENCE_INDEX_ENABLED", False)
+    evidenceindex.ingest([_article(9, "moon")], "newsdata")
+    assert evidenceindex.lookup("moon") == []
+    assert not evidenceindex.sufficient([])
@@ -0,0 +1,180 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import deadline
+import factcheck_llm
+from factcheck_llm import build_prompt, count_tokens
+
+
+def _article(i, snippet_words=200):
+    return {"title": f"Article {i}", "source": "wire", "url": f"https://news.example/{i}",
+            "snippet": " ".join(f"word{i}_{j}" for j in range(snippet_words))}
+
+
+def test_prompt_keeps_every_article_that_fits():
+    articles = [_article(i, 10) for i in range(3)]
+    messages, used, estimated = build_prompt("Moon is cheese", articles, budget=3000)
+    assert used == articles
+    assert [m["role"] for m in messages] == ["system", "user"]
+    assert all(a["url"] in messages[1]["content"] for a in articles)
+    assert estimated == sum(count_tokens(m["content"]) for m in messages)
+
+
+def test_prompt_is_cut_to_the_token_budget_best_articles_first():
+    articles = [_article(i) for i in range(6)]
+    messages, used, estimated = build_prompt("Moon is cheese", articles, budget=1000)
+    assert estimated <= 1000
+    assert 0 < len(used) < len(articles)
+    assert used == articles[:len(used)]
+    assert "…" in messages[1]["content"]  # the article that overflowed was trimmed, not dropped
+    assert articles[len(used)]["url"] not in messages[1]["content"]
+
+
+def test_prompt_with_no_room_for_a_snippet_drops_the_articles():
+    messages, used, estimated = build_prompt("Moon is cheese", [_article(0)], budget=10)
+    assert used == []
+    assert "news.example" not in messages[1]["content"]
+
+
+# -- model calls -------------------------------------------------------
+def _reply(classification="Supported", finish_reason="stop", **extra):
+    content = json.dumps(dict(classification=classification, rationale="Two articles agree.",
+                              citations=[{"title": "t", "source": "s", "url": "u"}], **extra))
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason=finish_reason)],
+        usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20),
+    )
+
+
+class _Client:
+    """OpenAI client stand-in that answers each chat.completions.create with the next reply."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        return self.replies.pop(0)
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """factcheck_llm configured against a fake client; `llm(*replies)` returns the client."""
+    monkeypatch.setattr(factcheck_llm, "AZURE_OPENAI_ENDPOINT", "https://aoai.example")
+    monkeypatch.setattr(factcheck_llm, "AZURE_OPENAI_API_KEY", "test")
+
+    def install(*replies):
+        client = _Client(*replies)
+        monkeypatch.setattr(factcheck_llm, "get_openai_client", lambda: client)
+        return client
+    return install
+
+
+def test_classifier_requests_schema_constrained_json(llm):
+    client = llm(_reply("Contradicted"))
+    result = factcheck_llm.classify_with_citations("Moon is cheese", [_article(0, 10), _article(1, 10)])
+    assert result["classification"] == "Contradicted"
+    assert result["usage"]["prompt_tokens"] == 100
+    kwargs = client.calls[0]
+    assert kwargs["response_format"]["json_schema"]["strict"] is True
+    assert kwargs["max_completion_tokens"] == factcheck_llm.LLM_MAX_COMPLETION_TOKENS
+
+
+# -- cascade -----------------------------------------------------------
+def test_too_few_articles_are_answered_by_the_rules_without_a_model_call(llm):
+    client = llm()
+    result = factcheck_llm.classify_with_citations("Moon is cheese", [_article(0, 10)])
+    assert result["classification"] == "Unclear" and result["tier"] == "rules"
+    assert "only 1 relevant article found" in result["rationale"]
+    assert [c["url"] for c in result["citations"]] == ["https://news.example/0"]
+    assert client.calls == []
+
+
+def test_confident_fast_tier_answer_stands(llm, monkeypatch):
+    monkeypatch.setattr(factcheck_llm, "AZURE_OPENAI_FAST_DEPLOYMENT", "fast")
+    client = llm(_reply("Supported", confidence=0.95))
+    result = factcheck_llm.classify_with_citations("Moon is cheese", [_article(0, 10), _article(1, 10)])
+    assert (result["tier"], result["classification"], result["confidence"]) == ("fast", "Supported", 0.95)
+    assert [c["model"] for c in client.calls] == ["fast"]
+    assert client.calls[0]["messages"][0]["content"].endswith(factcheck_llm.CONFIDENCE_PROMPT)
+
+
+def test_low_confidence_escalates_to_the_full_model(llm, monkeypatch):
+    monkeypatch.setattr(factcheck_llm, "AZURE_OPENAI_FAST_DEPLOYMENT", "fast")
+    client = llm(_reply("Supported", confidence=0.4), _reply("Contradicted"))
+    result = factcheck_llm.classify_with_citations("Moon is cheese", [_article(0, 10), _article(1, 10)])
+    assert (result["tier"], result["classification"]) == ("full", "Contradicted")
+    assert [c["model"] for c in client.calls] == ["fast", factcheck_llm.AZURE_OPENAI_DEPLOYMENT]
+    assert result["usage"]["prompt_tokens"] == 200  # both calls are paid for
+
+
+def test_without_a_fast_deployment_only_the_full_model_is_called(llm, monkeypatch):
+    monkeypatch.setattr(factcheck_llm, "AZURE_OPENAI_FAST_DEPLOYMENT", None)
+    client = llm(_reply("Supported"))
+    assert factcheck_llm.classify_with_citations("Moon is cheese", [_article(0, 10), _article(1, 10)])["tier"] == "full"
+    assert len(client.calls) == 1
+
+
+def test_reply_cut_off_by_the_token_cap_is_retried_once(llm):
+    client = llm(_reply(finish_reason="length"), _reply("Contradicted"))
+    result = factcheck_llm.classify_with_citations("Moon is cheese", [_article(0, 10), _article(1, 10)])
+    assert result["classification"] == "Contradicted" and "degraded_reasons" not in result
+    retry = client.calls[1]
+    assert retry["max_completion_tokens"] == factcheck_llm.LLM_RETRY_COMPLETION_TOKENS
+    assert retry.get("reasoning_effort") in (None, "minimal")
+
+
+def test_reply_still_cut_off_after_the_retry_is_marked_degraded(llm):
+    llm(_reply(finish_reason="length"), _reply(finish_reason="length"))
+    result = factcheck_llm.classify_with_citations("Moon is cheese", [_article(0, 10), _article(1, 10)])
+    assert result["degraded_reasons"] == ["classifier reply cut off at the token cap"]
+
+
+def test_rules_verdict_blames_an_incomplete_search_not_coverage(llm):
+    llm()
+    with deadline.scope(10):
+        deadline.degrade("newsdata: retrieval cut short")
+        result = factcheck_llm.classify_with_citations("Moon is cheese", [])
+    assert result["tier"] == "rules"
+    assert result["rationale"].startswith("The evidence search did not complete (newsdata: retrieval cut short)")
+
+
+# -- streaming ---------------------------------------------------------
+def _chunks(*deltas, pause=0.0):
+    """A chat.completions stream: one chunk per delta, `pause` seconds after the first."""
+    class Stream:
+        closed = False
+
+        def __iter__(self):
+            for i, delta in enumerate(deltas):
+                if i:
+                    time.sleep(pause)
+                yield SimpleNamespace(usage=None, choices=[
+                    SimpleNamespace(delta=SimpleNamespace(content=delta), finish_reason=None)])
+
+        def close(self):
+            self.closed = True
+    return Stream()
+
+
+def test_streamed_call_timeout_is_cut_to_the_request_deadline(llm):
+    client = llm(_chunks('{"classification": "Supported", "rationale": "Agreed."', ', "citations": []}'))
+    with deadline.scope(10):
+        events = list(factcheck_llm.stream_classify_with_citations("Moon is cheese", [_article(0, 10), _article(1, 10)]))
+    assert client.calls[0]["timeout"] <= 10 - deadline.RESPONSE_RESERVE_SEC
+    assert events[0] == ("classification", "Supported")
+    assert events[-1][1]["classification"] == "Supported"
+
+
+def test_stream_still_running_at_the_deadline_ends_in_the_deadline_verdict(llm):
+    stream = _chunks('{"classification": "Supported", "rationale": "Agr', 'eed."}', pause=0.8)
+    llm(stream)
+    with deadline.scope(1.2) as degraded:
+        events = list(factcheck_llm.stream_classify_with_citations("Moon is cheese", [_article(0, 10), _article(1, 10)]))
+    assert events[-1][0] == "result" and events[-1][1]["tier"] == "deadline"
+    assert stream.closed and degraded == ["classification cut off"]
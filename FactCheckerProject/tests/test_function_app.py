@@ -0,0 +1,32 @@
+import contextvars
+
+import deadline
+import function_app
+
+
+def test_stream_body_keeps_its_deadline_across_chunks(monkeypatch):
+    seen = []
+
+    def classify(query, articles):
+        for event in ("classification", "rationale"):
+            seen.append(deadline.remaining())
+            yield event, "x"
+        seen.append(deadline.remaining())
+        yield "result", {"classification": "Unclear"}
+
+    monkeypatch.setattr(function_app, "_cache_lookup", lambda *a: None)
+    monkeypatch.setattr(function_app, "_bing_articles", lambda q: [])
+    monkeypatch.setattr(function_app, "_store_unless_degraded", lambda provider, q, frm, to, data: data)
+    monkeypatch.setattr("factcheck_llm.stream_classify_with_citations", classify)
+
+    events = function_app._in_one_context(function_app._stream_events("moon", "bing", "", "", 30))
+    # StreamingResponse pulls each chunk on a worker thread in a fresh copy of the context
+    chunks = []
+    while True:
+        try:
+            chunks.append(contextvars.copy_context().run(next, events))
+        except StopIteration:
+            break
+    assert [c.split("\n")[0] for c in chunks] == [
+        "event: citations", "event: classification", "event: rationale", "event: result"]
+    assert len(seen) == 3 and all(left is not None and 0 < left <= 30 for left in seen)
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+from hedge import retrieve_hedged, retrieve_hedged_async
+
+
+STORIES = [
+    ("NASA denies moon cheese claim", "Lunar samples are rock and dust."),
+    ("Moon cheese rumour spreads online", "A viral post says astronauts found cheese."),
+    ("Fact check: the moon and cheese", "Scientists explain where the myth comes from."),
+]
+
+
+def _articles(name, n):
+    return [{"title": title, "snippet": snippet, "url": f"https://{name}.example/{i}"}
+            for i, (title, snippet) in enumerate(STORIES[:n])]
+
+
+def _retriever(name, n, seconds=0.0, calls=None):
+    def fn(query):
+        if calls is not None:
+            calls.append(name)
+        time.sleep(seconds)
+        return _articles(name, n)
+    return name, fn
+
+
+def test_first_sufficient_path_wins_and_the_slow_one_is_ignored():
+    t0 = time.monotonic()
+    articles, meta = retrieve_hedged("moon cheese", [_retriever("slow", 3, 1.0), _retriever("fast", 3)], delay=0)
+    assert time.monotonic() - t0 < 0.5
+    assert meta == {"evidence_sources": ["fast"], "ignored": ["slow"]}
+    assert {a["url"].split("/")[2] for a in articles} == {"fast.example"}
+
+
+def test_backup_path_is_not_started_when_the_first_answers_within_the_delay():
+    calls = []
+    articles, meta = retrieve_hedged(
+        "moon cheese", [_retriever("bing", 3, calls=calls), _retriever("newsdata", 3, calls=calls)], delay=1.0)
+    assert calls == ["bing"]
+    assert meta == {"evidence_sources": ["bing"], "ignored": ["newsdata"]}
+
+
+def test_short_path_starts_the_next_one_immediately():
+    calls = []
+    t0 = time.monotonic()
+    _, meta = retrieve_hedged(
+        "moon cheese", [_retriever("bing", 1, calls=calls), _retriever("newsdata", 3, calls=calls)], delay=5.0)
+    assert time.monotonic() - t0 < 1.0
+    assert calls == ["bing", "newsdata"] and meta["evidence_sources"] == ["newsdata"]
+
+
+def test_largest_set_is_used_when_no_path_is_sufficient():
+    def broken(query):
+        raise RuntimeError("agent run failed")
+    articles, meta = retrieve_hedged("moon cheese", [("bing", broken), _retriever("newsdata", 1)], delay=0)
+    assert meta["evidence_sources"] == ["newsdata"] and len(articles) == 1
+
+
+def test_merge_ranks_the_union_deduped_by_url():
+    dup = ("copy", lambda q: _articles("fast", 2))
+    articles, meta = retrieve_hedged("moon cheese", [_retriever("fast", 2), dup], delay=0, merge=True)
+    assert sorted(meta["evidence_sources"]) == ["copy", "fast"]
+    assert sorted(a["url"] for a in articles) == ["https://fast.example/0", "https://fast.example/1"]
+
+
+def test_async_race_cancels_the_losing_path():
+    cancelled = []
+
+    async def slow(query):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    async def fast(query):
+        return _articles("fast", 3)
+
+    async def main():
+        _, meta = await retrieve_hedged_async("moon cheese", [("slow", slow), ("fast", fast)], delay=0)
+        await asyncio.sleep(0)  # let the cancellation land
+        return meta
+
+    assert asyncio.run(main()) == {"evidence_sources": ["fast"], "ignored": ["slow"]}
+    assert cancelled == ["slow"]
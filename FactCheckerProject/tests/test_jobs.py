@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+import jobs
+
+
+@pytest.fixture(autouse=True)
+def memory_backend(monkeypatch):
+    monkeypatch.setattr(jobs, "_store", jobs.MemoryJobStore())
+    monkeypatch.setattr(jobs, "_queue", jobs.MemoryJobQueue(workers=2))
+
+
+def _wait_for_status(job_id, status, timeout=2.0):
+    t0 = time.monotonic()
+    while (job := jobs.get_job(job_id))["status"] != status:
+        assert time.monotonic() - t0 < timeout, f"job is {job['status']}, expected {status}"
+        time.sleep(0.01)
+    return job
+
+
+def test_submitted_job_is_queued_then_processed():
+    started = threading.Event()
+    release = threading.Event()
+
+    def process(message):
+        jobs.start_job(message["id"])
+        started.set()
+        release.wait(2)
+        jobs.finish_job(message["id"], {"results": [{"query": c} for c in message["claims"]]})
+
+    job = jobs.submit_job(["moon is cheese"], "bing", "2024-01-01", "2024-01-31", process)
+    assert job["status"] == "queued"
+    assert started.wait(2) and jobs.get_job(job["id"])["status"] == "running"
+    release.set()
+    done = _wait_for_status(job["id"], "done")
+    assert done["result"] == {"results": [{"query": "moon is cheese"}]}
+    assert (done["provider"], done["from"], done["to"]) == ("bing", "2024-01-01", "2024-01-31")
+
+
+def test_local_job_that_raises_is_marked_failed():
+    def process(message):
+        raise RuntimeError("provider down")
+
+    job = jobs.submit_job(["moon"], "newsdata", "", "", process)
+    assert _wait_for_status(job["id"], "failed")["error"] == "provider down"
+
+
+def test_oversized_jobs_are_rejected(monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_MAX_CLAIMS", 1)
+    with pytest.raises(ValueError):
+        jobs.submit_job(["a", "b"], "bing", "", "", lambda m: None)
+
+
+def test_unknown_job_is_none():
+    assert jobs.get_job("missing") is None
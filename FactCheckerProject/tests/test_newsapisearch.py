@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+import evidenceindex
+import newsapisearch
+from newsapisearch import _Candidates, _iter_pages, fetch_newsdata_citations
+
+
+def _items(page, n, relevant=True):
+    word = "moon" if relevant else "cricket"
+    return [{"title": f"{word} story {page}-{i}", "snippet": "", "source": "s",
+             "url": f"https://news.example/{page}/{i}"} for i in range(n)]
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    """
+    Serve NewsData pages from `pages.set({token: (items, next_token)})`
+    (the first page has token None) and record the requested tokens.
+    """
+    class Pages:
+        def __init__(self):
+            self.book, self.requested = {}, []
+            self.fetched = threading.Condition()
+
+        def set(self, book):
+            self.book = book
+
+        def fetch(self, params, sdk_client, max_retries, backoff):
+            with self.fetched:
+                self.requested.append(params.get("page"))
+                self.fetched.notify_all()
+            return self.book[params.get("page")]
+
+        def wait_for(self, n, timeout=2.0):
+            with self.fetched:
+                return self.fetched.wait_for(lambda: len(self.requested) >= n, timeout=timeout)
+
+    served = Pages()
+    monkeypatch.setattr(newsapisearch, "_fetch_page", served.fetch)
+    monkeypatch.setattr(evidenceindex, "EVIDENCE_INDEX_ENABLED", False)
+    return served
+
+
+def _fetch(**kwargs):
+    return fetch_newsdata_citations("moon", api_key="test", use_sdk=False, **kwargs)
+
+
+def test_paging_stops_once_enough_relevant_items_are_in(pages):
+    pages.set({None: (_items(0, 3), "p2"), "p2": (_items(1, 3), "p3"), "p3": (_items(2, 3), None)})
+    citations = _fetch(page_limit=3, min_candidates=3)
+    assert pages.requested == [None]
+    assert citations and all("/0/" in c["url"] for c in citations)
+
+
+def test_next_page_token_and_filters_are_sent(pages, monkeypatch):
+    sent = []
+    monkeypatch.setattr(newsapisearch, "_fetch_page",
+                        lambda params, *a: sent.append(dict(params)) or pages.book[params.get("page")])
+    pages.set({None: (_items(0, 1), "p2"), "p2": (_items(1, 1), None)})
+    _fetch(page_limit=3, min_candidates=8, from_date="2024-05-01T10:00:00Z", to_date="May 3 2024")
+    assert [p.get("page") for p in sent] == [None, "p2"]
+    assert sent[0]["q"] == "moon" and sent[0]["from_date"] == "2024-05-01" and sent[0]["to_date"] == "2024-05-03"
+
+
+def test_irrelevant_and_duplicate_items_do_not_count():
+    candidates = _Candidates("moon", 3)
+    candidates.add(_items(0, 2) + _items(0, 2) + _items(1, 5, relevant=False) + [{"title": "moon, no url"}])
+    assert (len(candidates.items), candidates.relevant, candidates.enough) == (7, 2, False)
+
+
+def test_short_page_prefetches_the_next_one_before_it_is_consumed(pages):
+    pages.set({None: (_items(0, 2), "p2"), "p2": (_items(1, 2), None)})
+    it = _iter_pages({"q": "moon"}, None, 3, 0, 0, _Candidates("moon", 8))
+    next(it)
+    assert pages.wait_for(2) and pages.requested == [None, "p2"]
+
+
+def test_page_that_may_be_enough_is_consumed_before_the_next_request(pages):
+    pages.set({None: (_items(0, 8), "p2"), "p2": (_items(1, 8), None)})
+    it = _iter_pages({"q": "moon"}, None, 3, 0, 0, _Candidates("moon", 8))
+    next(it)
+    assert not pages.wait_for(2, timeout=0.2)
+    assert next(it)[0]["url"] == "https://news.example/1/0"
+    assert pages.requested == [None, "p2"]
+
+
+def test_enough_local_index_hits_skip_newsdata(pages, monkeypatch):
+    hits = _items("index", evidenceindex.EVIDENCE_INDEX_MIN_HITS)
+    monkeypatch.setattr(evidenceindex, "lookup", lambda query, frm=None, to=None: hits)
+    citations = _fetch(page_limit=3)
+    assert citations and all("/index/" in c["url"] for c in citations)
+    assert pages.requested == []
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from ranking import BM25Scorer, TfidfScorer, rank_evidence, tokenize
+
+
+def _article(title, snippet="", url=None, **extra):
+    return dict(title=title, snippet=snippet, url=url or f"https://example.com/{title[:20]}", **extra)
+
+
+ARTICLES = [
+    _article("Cricket scores from the weekend", "Mumbai beat Chennai by six wickets."),
+    _article("NASA denies moon cheese claim", "NASA says the moon is rock, not cheese."),
+    _article("Monsoon arrives early in Kerala", "Rainfall is above normal this June."),
+    _article("Moon landing anniversary", "The moon mission marked fifty years."),
+]
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("The Moon is made of CHEESE!") == ["moon", "made", "cheese"]
+
+
+@pytest.mark.parametrize("scorer", [BM25Scorer(), TfidfScorer()])
+def test_scorers_prefer_documents_sharing_more_query_terms(scorer):
+    docs = ["moon cheese nasa", "moon landing", "monsoon rain"]
+    scores = scorer.score("nasa moon cheese", docs)
+    assert scores.shape == (3,)
+    assert scores[0] > scores[1] > scores[2] == 0
+
+
+@pytest.mark.parametrize("scorer", [BM25Scorer(), TfidfScorer()])
+def test_scorers_handle_empty_queries_and_candidate_sets(scorer):
+    assert scorer.score("the of", ["moon"]).tolist() == [0.0]
+    assert scorer.score("moon", []).shape == (0,)
+
+
+def test_rank_evidence_puts_the_best_match_first_and_keeps_k():
+    ranked = rank_evidence("NASA moon cheese", ARTICLES, k=2)
+    assert [a["title"] for a in ranked] == ["NASA denies moon cheese claim", "Moon landing anniversary"]
+    assert rank_evidence("NASA moon cheese", []) == []
+
+
+def test_ties_keep_arrival_order():
+    tied = [_article("Budget speech", url="https://a/1"), _article("Budget speech today", url="https://a/2")]
+
+    class Flat:
+        def score(self, query, docs):
+            return np.ones(len(docs))
+
+    ranked = rank_evidence("budget", tied, scorer=Flat(), collapse_threshold=1.01)
+    assert [a["url"] for a in ranked] == ["https://a/1", "https://a/2"]
+
+
+def test_trusted_sources_are_boosted():
+    plain = _article("Moon cheese claim checked", url="https://blog.example/1")
+    trusted = _article("Moon cheese claim checked again", url="https://agency.example/1", trusted=True)
+    ranked = rank_evidence("moon cheese claim", [plain, trusted], collapse_threshold=1.01)
+    assert ranked[0] is trusted
+
+
+def test_near_duplicate_wire_copies_collapse_to_one():
+    wire = "NASA says the moon is made of rock and dust, not cheese, in a statement on Monday."
+    copies = [
+        _article("NASA: the moon is not cheese", wire, url="https://paper-a/1"),
+        _article("NASA: the moon is not cheese", wire, url="https://paper-b/1"),
+        _article("Moon cheese myth explained", "Why people think the moon is cheese.", url="https://c/1"),
+    ]
+    ranked = rank_evidence("NASA moon cheese", copies, k=4)
+    assert [a["url"] for a in ranked] == ["https://paper-a/1", "https://c/1"]
@@ -0,0 +1,157 @@
+import time
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import deadline
+from ratelimit import CircuitBreaker, CircuitOpenError, ProviderGuard, RateLimited, TokenBucket
+
+
+def _response(status, headers=None):
+    def raise_for_status():
+        if status >= 400:
+            raise requests.HTTPError(f"{status}")
+    return SimpleNamespace(status_code=status, headers=headers or {}, raise_for_status=raise_for_status)
+
+
+def _replies(*statuses):
+    """send() for ProviderGuard.request that answers with `statuses` in turn."""
+    pending = list(statuses)
+    def send():
+        return _response(pending.pop(0))
+    return send
+
+
+def test_bucket_allows_a_burst_then_fails_fast():
+    bucket = TokenBucket(rate_per_sec=0.001, capacity=3)
+    assert all(bucket.acquire(0) for _ in range(3))
+    assert not bucket.acquire(0.01)
+
+
+def test_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate_per_sec=50, capacity=1)
+    assert bucket.acquire(0)
+    assert bucket.acquire(0.1)
+
+
+def test_paused_bucket_admits_nothing():
+    bucket = TokenBucket(rate_per_sec=1000, capacity=5)
+    bucket.pause(5)
+    assert not bucket.acquire(0.01)
+
+
+def test_breaker_opens_after_threshold_and_probes_after_reset():
+    breaker = CircuitBreaker(threshold=2, reset_sec=0.05)
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == "closed"
+    breaker.record_failure()
+    assert not breaker.allow() and breaker.state == "open"
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == "half-open"
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker(threshold=1, reset_sec=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+
+def test_request_retries_server_errors():
+    guard = ProviderGuard("test", rate_per_min=6000, burst=10)
+    r = guard.request(_replies(503, 200), max_retries=2, backoff=0.01)
+    assert r.status_code == 200
+    assert guard.counters["retries"] == 1 and guard.counters["failures"] == 1
+    assert guard.breaker.state == "closed"
+
+
+def test_request_raises_client_errors_without_retrying():
+    guard = ProviderGuard("test", rate_per_min=6000, burst=10)
+    with pytest.raises(requests.HTTPError):
+        guard.request(_replies(404), backoff=0.01)
+    assert guard.counters["retries"] == 0 and guard.counters["failures"] == 0
+
+
+def test_429_pauses_the_shared_bucket():
+    guard = ProviderGuard("test", rate_per_min=6000, burst=10)
+    send = lambda: _response(429, {"Retry-After": "30"})
+    with pytest.raises(RateLimited):
+        guard.request(send, max_retries=0)
+    assert guard.counters["throttled"] == 1
+    assert not guard.bucket.acquire(0.01)
+
+
+def test_open_circuit_rejects_calls():
+    guard = ProviderGuard("test", rate_per_min=6000, burst=10)
+    guard.breaker = CircuitBreaker(threshold=1, reset_sec=60)
+    with pytest.raises(requests.HTTPError):
+        guard.request(_replies(500), max_retries=0)
+    with pytest.raises(CircuitOpenError):
+        guard.request(_replies(200))
+    assert guard.counters["open_circuit"] == 1
+
+
+def test_running_out_of_request_time_is_not_a_provider_failure():
+    guard = ProviderGuard("test", rate_per_min=6000, burst=10)
+    def send():
+        raise deadline.DeadlineExceeded("0.1s left")
+    with pytest.raises(deadline.DeadlineExceeded):
+        guard.request(send)
+    assert guard.counters["failures"] == 0
+
+
+def test_retry_that_would_overrun_the_deadline_is_skipped():
+    guard = ProviderGuard("test", rate_per_min=6000, burst=10)
+    with deadline.scope(1.5) as degraded:
+        with pytest.raises(requests.HTTPError):
+            guard.request(_replies(503, 200), max_retries=2, backoff=2.0)
+    assert guard.counters["retries"] == 0
+    assert degraded == ["test: retry skipped"]
+
+
+def _due_for_a_probe(guard):
+    guard.breaker = CircuitBreaker(threshold=1, reset_sec=0.01)
+    guard.breaker.record_failure()
+    time.sleep(0.02)
+    return guard
+
+
+def test_rate_limited_call_does_not_take_the_probe():
+    guard = _due_for_a_probe(ProviderGuard("test", rate_per_min=6000, burst=1))
+    guard.bucket.pause(5)
+    with pytest.raises(RateLimited):
+        guard.request(_replies(200), max_wait=0.01)
+    assert guard.breaker.state == "open" and guard.breaker.allow()
+
+
+def test_probe_that_runs_out_of_request_time_is_handed_back():
+    guard = _due_for_a_probe(ProviderGuard("test", rate_per_min=6000, burst=10))
+    def send():
+        raise deadline.DeadlineExceeded("0.1s left")
+    with pytest.raises(deadline.DeadlineExceeded):
+        guard.request(send)
+    assert guard.breaker.state == "open"
+    assert guard.request(_replies(200)).status_code == 200
+    assert guard.breaker.state == "closed"
+
+
+def test_cancelled_probe_is_handed_back():
+    guard = _due_for_a_probe(ProviderGuard("test", rate_per_min=6000, burst=10))
+
+    async def main():
+        task = asyncio.create_task(guard.call_async(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        assert guard.breaker.state == "half-open"
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert guard.breaker.state == "open" and guard.breaker.allow()
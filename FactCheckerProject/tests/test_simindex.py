@@ -0,0 +1,65 @@
+import pytest
+
+from simindex import SimHashIndex, claims_agree, shingles, similarity, simhash
+
+
+def test_simhash_ignores_case_and_punctuation():
+    assert simhash("The moon is made of cheese") == simhash("the MOON is made of cheese!")
+
+
+def test_shingles_keep_word_order():
+    assert shingles("india beat pakistan") != shingles("pakistan beat india")
+
+
+@pytest.mark.parametrize("a, b", [
+    ("India beat Pakistan in the final", "Pakistan beat India in the final"),
+    ("Russia attacked Ukraine", "Ukraine attacked Russia"),
+    ("moon cheese nasa", "NASA cheese moon"),
+])
+def test_reordered_claims_do_not_match(a, b):
+    assert similarity(simhash(a), simhash(b)) < 0.9
+    assert not claims_agree(a, b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Petrol costs Rs 5 more", "Petrol costs Rs 8 more"),
+    ("Sensex fell 500 points today", "Sensex fell 800 points today"),
+    ("The moon is made of cheese", "The moon is not made of cheese"),
+    ("The moon is made of cheese", "The moon isn't made of cheese"),
+])
+def test_claims_with_other_numbers_or_negations_disagree(a, b):
+    assert not claims_agree(a, b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("The moon is made of cheese", "the moon is made of cheese!"),
+    ("NASA says the moon is made of cheese", "NASA says that the moon is made of cheese"),
+    ("Sensex fell 500 points today", "Sensex fell 500 points on Monday"),
+])
+def test_rewordings_of_the_same_claim_agree(a, b):
+    assert claims_agree(a, b)
+
+
+def test_index_returns_the_closest_match_within_scope():
+    index = SimHashIndex()
+    sig = simhash("NASA says the moon is made of cheese")
+    index.add(sig, "bing|a|b")
+    assert index.query(sig, "bing|a|b") == (sig, 1.0)
+    assert index.query(sig, "newsdata|a|b") is None
+    assert index.query(sig ^ 0b11, "bing|a|b") == (sig, 1.0 - 2 / 64)
+
+
+def test_index_rejects_matches_below_the_threshold():
+    index = SimHashIndex()
+    sig = simhash("NASA says the moon is made of cheese")
+    index.add(sig, "s")
+    assert index.query(sig ^ 0b111, "s", threshold=0.99) is None
+
+
+def test_index_starts_a_new_generation_when_full():
+    index = SimHashIndex(max_items=2)
+    for sig in (1, 2, 3):
+        index.add(sig, "s")
+    assert len(index) == 1
+    assert index.query(1, "s", threshold=1.0) is None
+    assert index.query(3, "s", threshold=1.0) == (3, 1.0)
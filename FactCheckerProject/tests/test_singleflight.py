@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import deadline
+from singleflight import SingleFlight
+
+
+def _slow(result, calls, seconds=0.1):
+    def fn():
+        calls.append(1)
+        time.sleep(seconds)
+        return result
+    return fn
+
+
+def test_concurrent_calls_share_one_run():
+    flights, calls = SingleFlight(wait=5), []
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        outs = list(pool.map(lambda _: flights.do("k", _slow("v", calls)), range(5)))
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in outs) == [False, True, True, True, True]
+    assert all(result == "v" for result, _ in outs)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_different_keys_run_separately():
+    flights, calls = SingleFlight(wait=5), []
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(lambda k: flights.do(k, _slow(k, calls)), ["a", "b"]))
+    assert len(calls) == 2
+
+
+def test_leader_error_is_raised_in_waiters():
+    flights = SingleFlight(wait=5)
+    started = threading.Event()
+
+    def boom():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("provider down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flights.do, "k", boom)
+        started.wait()
+        waiter = pool.submit(flights.do, "k", lambda: "never")
+        for f in (leader, waiter):
+            with pytest.raises(ValueError):
+                f.result()
+    assert flights.stats()["shared_errors"] == 1
+
+
+def test_waiter_runs_on_its_own_after_waiting_too_long():
+    flights, calls = SingleFlight(wait=0.05), []
+    started = threading.Event()
+
+    def leader_fn():
+        started.set()
+        time.sleep(0.3)
+        return "leader"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flights.do, "k", leader_fn)
+        started.wait()
+        assert flights.do("k", _slow("own", calls, 0)) == ("own", False)
+        assert leader.result() == ("leader", False)
+    assert flights.stats()["timeouts"] == 1
+
+
+def test_waiter_wait_is_bounded_by_its_request_deadline():
+    flights = SingleFlight(wait=30)
+    started = threading.Event()
+
+    def leader_fn():
+        started.set()
+        time.sleep(0.5)
+        return "leader"
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pool.submit(flights.do, "k", leader_fn)
+        started.wait()
+        with deadline.scope(deadline.RESPONSE_RESERVE_SEC + 0.05):
+            t0 = time.monotonic()
+            assert flights.do("k", lambda: "own") == ("own", False)
+            assert time.monotonic() - t0 < 0.3
+
+
+def test_async_calls_coalesce_and_cancelled_leader_hands_over():
+    async def main():
+        flights, calls = SingleFlight(wait=5), []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return "v"
+
+        outs = await asyncio.gather(*(flights.do_async("k", fn) for _ in range(4)))
+        assert len(calls) == 1 and [r for r, _ in outs] == ["v"] * 4
+
+        leader = asyncio.ensure_future(flights.do_async("c", fn))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(flights.do_async("c", fn))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await waiter == ("v", False)
+        assert len(calls) == 3
+
+    asyncio.run(main())